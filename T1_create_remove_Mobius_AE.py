@@ -5,8 +5,6 @@ import sys
 import uuid
 from typing import Any, Dict, Optional, List
 
-import requests
-
 DEFAULT_BASE = os.getenv("MOBIUS_BASE_URL", "http://192.168.0.58:7579/Mobius").rstrip("/")
 DEFAULT_ORIGIN = os.getenv("MOBIUS_ORIGIN", "CAdmin")
 RVI = os.getenv("ONEM2M_RVI", "3")
@@ -37,8 +35,27 @@ def content_headers(ty: Optional[int] = None) -> Dict[str, str]:
     return {"Content-Type": "application/json"}
 
 
-# AE 생성
-def post_ae(base: str, origin: str, rn: str, api: str, rr: bool, poa: Optional[List[str]] = None, timeout: float = DEFAULT_TIMEOUT) -> None:
+# -------------------- 요청 (결과 dict 반환, 출력/종료 없음) --------------------
+# http: requests.Session (batch 모드 커넥션 풀) 또는 None (requests 모듈 직접 사용)
+def _http(http=None):
+    if http is not None:
+        return http
+    import requests  # 지연 import: --help/인자 오류 시 로드하지 않음
+    return requests
+
+
+def _result(cmd: str, rn: str, resp) -> Dict[str, Any]:
+    body: Any = None
+    if resp.content:
+        try:
+            body = resp.json()
+        except Exception:
+            body = resp.text
+    return {"cmd": cmd, "rn": rn, "status": resp.status_code, "body": body}
+
+
+def create_ae(base: str, origin: str, rn: str, api: str, rr: bool, poa: Optional[List[str]] = None,
+              timeout: float = DEFAULT_TIMEOUT, *, http=None) -> Dict[str, Any]:
     url = f"{base}?ty=2"
     body = {
         "m2m:ae": {
@@ -49,81 +66,80 @@ def post_ae(base: str, origin: str, rn: str, api: str, rr: bool, poa: Optional[L
         }
     }
     hdr = {**base_headers(origin, include_accept=True, include_rvi=True), **content_headers(ty=2)}
-    resp = requests.post(url, headers=hdr, json=body, timeout=timeout)
+    res = _result("create", rn, _http(http).post(url, headers=hdr, json=body, timeout=timeout))
+    # 이미 있으면 성공으로 본다 (기존 CLI도 exit 0)
+    res["exists"] = res["status"] == 409
+    res["ok"] = res["status"] in (200, 201, 409)
+    return res
 
-    if resp.status_code in (200, 201):
-        print(f"[OK] AE created: rn={rn}")
-        try:
-            print(pretty(resp.json()))
-        except Exception:
-            print(resp.text)
-    elif resp.status_code == 409:
+
+def fetch_ae(base: str, origin: str, rn: str, timeout: float = DEFAULT_TIMEOUT, *, http=None) -> Dict[str, Any]:
+    url = f"{base}/{rn}"
+    hdr = base_headers(origin, include_accept=True, include_rvi=True)
+    res = _result("get", rn, _http(http).get(url, headers=hdr, timeout=timeout))
+    res["ok"] = 200 <= res["status"] < 400
+    return res
+
+
+def remove_ae(base: str, origin: str, rn: str, timeout: float = DEFAULT_TIMEOUT, *, http=None) -> Dict[str, Any]:
+    url = f"{base}/{rn}"
+    delete_hdr = base_headers(origin, include_accept=True, include_rvi=False)
+    res = _result("delete", rn, _http(http).delete(url, headers=delete_hdr, timeout=timeout))
+    res["ok"] = res["status"] in (200, 202, 204)
+    return res
+
+
+def print_body(body: Any) -> None:
+    if body is None:
+        return
+    print(body if isinstance(body, str) else pretty(body))
+
+
+# AE 생성
+def post_ae(base: str, origin: str, rn: str, api: str, rr: bool, poa: Optional[List[str]] = None, timeout: float = DEFAULT_TIMEOUT) -> None:
+    res = create_ae(base, origin, rn, api, rr, poa, timeout)
+
+    if res["exists"]:
         print(f"[WARN] AE already exists: rn={rn}")
-        try:
-            print(pretty(resp.json()))
-        except Exception:
-            print(resp.text)
+        print_body(res["body"])
         sys.exit(0)
+    elif res["ok"]:
+        print(f"[OK] AE created: rn={rn}")
+        print_body(res["body"])
     else:
-        print(f"[ERR] create AE failed: {resp.status_code}")
-        try:
-            print(pretty(resp.json()))
-        except Exception:
-            print(resp.text)
+        print(f"[ERR] create AE failed: {res['status']}")
+        print_body(res["body"])
         sys.exit(1)
 
 
 # AE 조회
 def get_ae(base: str, origin: str, rn: str, timeout: float = DEFAULT_TIMEOUT) -> None:
-    url = f"{base}/{rn}"
-    hdr = base_headers(origin, include_accept=True, include_rvi=True)
-    resp = requests.get(url, headers=hdr, timeout=timeout)
+    res = fetch_ae(base, origin, rn, timeout)
 
-    if resp.ok:
+    if res["ok"]:
         print(f"[OK] AE fetched: rn={rn}")
-        try:
-            print(pretty(resp.json()))
-        except Exception:
-            print(resp.text)
+        print_body(res["body"])
     else:
-        print(f"[ERR] get AE failed: {resp.status_code}")
-        try:
-            print(pretty(resp.json()))
-        except Exception:
-            print(resp.text)
+        print(f"[ERR] get AE failed: {res['status']}")
+        print_body(res["body"])
         sys.exit(1)
 
 
 # AE 삭제
 def delete_ae(base: str, origin: str, rn: str, timeout: float = DEFAULT_TIMEOUT) -> None:
-    url = f"{base}/{rn}"
-    delete_hdr = base_headers(origin, include_accept=True, include_rvi=False)
-    resp = requests.delete(url, headers=delete_hdr, timeout=timeout)
+    res = remove_ae(base, origin, rn, timeout)
 
-    if resp.status_code in (200, 202, 204):
+    if res["ok"]:
         print(f"[OK] AE deleted: rn={rn}")
-        if resp.content:
-            try:
-                print(pretty(resp.json()))
-            except Exception:
-                print(resp.text)
+        print_body(res["body"])
     else:
-        print(f"[ERR] delete AE failed: {resp.status_code}")
-        try:
-            print(pretty(resp.json()))
-        except Exception:
-            print(resp.text)
+        print(f"[ERR] delete AE failed: {res['status']}")
+        print_body(res["body"])
         sys.exit(1)
 
 
-def main() -> None:
-    ap = argparse.ArgumentParser(description="Mobius(oneM2M) AE create/get/delete")
-    ap.add_argument("--base-url", default=DEFAULT_BASE, help=f"Mobius base URL (default: {DEFAULT_BASE})")
-    ap.add_argument("--origin", default=DEFAULT_ORIGIN, help=f"X-M2M-Origin (default: {DEFAULT_ORIGIN})")
-    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help=f"HTTP timeout seconds (default: {DEFAULT_TIMEOUT})")
-
-    sub = ap.add_subparsers(dest="cmd", required=True)
-
+# -------------------- 배치/데몬 모드 --------------------
+def add_cmd_parsers(sub) -> None:
     ap_create = sub.add_parser("create", help="Create AE")
     ap_create.add_argument("--rn", required=True, help="AE resourceName (rn)")
     ap_create.add_argument("--api", default="app.fire.detection", help="AE app-ID (api)")
@@ -136,13 +152,149 @@ def main() -> None:
     ap_del = sub.add_parser("delete", help="Delete AE")
     ap_del.add_argument("--rn", required=True)
 
+
+def parse_batch_line(line: str, line_parser: argparse.ArgumentParser) -> Dict[str, Any]:
+    """
+    NDJSON: {"cmd": "create", "rn": "X", "api": "...", "rr": true, "poa": [...], "id": ...}
+    또는 한 줄 CLI 형식: create --rn X --api ...
+    """
+    if line.startswith("{"):
+        spec = json.loads(line)
+        if not isinstance(spec, dict):
+            raise ValueError("NDJSON line must be an object")
+    else:
+        import shlex
+        try:
+            ns = line_parser.parse_args(shlex.split(line))
+        except SystemExit:
+            raise ValueError(f"invalid command: {line}")
+        spec = vars(ns)
+    cmd = spec.get("cmd")
+    if cmd not in ("create", "get", "delete") or not spec.get("rn"):
+        raise ValueError("need cmd (create|get|delete) and rn")
+    rr = spec.get("rr", True)
+    spec["rr"] = rr if isinstance(rr, bool) else str(rr).lower() == "true"
+    poa = spec.get("poa") or []
+    spec["poa"] = [p.strip() for p in poa.split(",") if p.strip()] if isinstance(poa, str) else list(poa)
+    spec.setdefault("api", "app.fire.detection")
+    return spec
+
+
+def run_spec(spec: Dict[str, Any], base: str, origin: str, timeout: float, http) -> Dict[str, Any]:
+    cmd, rn = spec["cmd"], spec["rn"]
+    if cmd == "create":
+        return create_ae(base, origin, rn, spec["api"], spec["rr"], spec["poa"], timeout, http=http)
+    if cmd == "get":
+        return fetch_ae(base, origin, rn, timeout, http=http)
+    return remove_ae(base, origin, rn, timeout, http=http)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    명령 스트림(파일 또는 stdin)을 한 프로세스에서 처리. 명령마다 결과 JSON 한 줄을
+    완료 순서대로 출력(seq로 입력 순서 확인). 개별 명령 실패로 중단하지 않는다.
+    같은 rn 의 명령은 rn 해시로 고른 워커 하나가 입력 순서대로 실행하므로(create → delete → create)
+    결과 상태가 순차 실행과 같다. rn 이 다른 명령끼리만 병렬.
+    반환: 모두 성공이면 0, 하나라도 실패면 1.
+    """
+    import threading, time, zlib
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    base = args.base_url.rstrip("/")
+    conc = max(1, args.concurrency)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=conc)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    line_parser = argparse.ArgumentParser(prog="batch-line", add_help=False)
+    add_cmd_parsers(line_parser.add_subparsers(dest="cmd", required=True))
+
+    src = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8")
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    out_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(conc)  # 입력을 동시 실행 수만큼만 앞서 읽는다
+    failed = 0
+
+    def emit(rec: Dict[str, Any]) -> None:
+        nonlocal failed
+        if not args.include_body:
+            rec.pop("body", None)
+        with out_lock:
+            if not rec.get("ok"):
+                failed += 1
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+
+    def work(seq: int, spec: Dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        try:
+            rec = run_spec(spec, base, args.origin, args.timeout, session)
+        except Exception as e:
+            rec = {"cmd": spec.get("cmd"), "rn": spec.get("rn"), "ok": False, "status": 0, "error": str(e)}
+        finally:
+            slots.release()
+        rec["seq"] = seq
+        if "id" in spec:
+            rec["id"] = spec["id"]
+        rec["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        emit(rec)
+
+    # rn 별 고정 워커 (단일 스레드 실행기 = 입력 순서 유지)
+    pools = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"t1-batch{i}") for i in range(conc)]
+    try:
+        seq = 0
+        for raw in src:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            seq += 1
+            try:
+                spec = parse_batch_line(line, line_parser)
+            except Exception as e:
+                emit({"seq": seq, "ok": False, "status": 0, "error": str(e), "line": line})
+                continue
+            slots.acquire()
+            pools[zlib.crc32(str(spec["rn"]).encode("utf-8")) % conc].submit(work, seq, spec)
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True)
+        session.close()
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"[BATCH] commands={seq} failed={failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Mobius(oneM2M) AE create/get/delete")
+    ap.add_argument("--base-url", default=DEFAULT_BASE, help=f"Mobius base URL (default: {DEFAULT_BASE})")
+    ap.add_argument("--origin", default=DEFAULT_ORIGIN, help=f"X-M2M-Origin (default: {DEFAULT_ORIGIN})")
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help=f"HTTP timeout seconds (default: {DEFAULT_TIMEOUT})")
+
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    add_cmd_parsers(sub)
+
+    ap_batch = sub.add_parser("batch", help="Run many commands (NDJSON or CLI lines) in one process")
+    ap_batch.add_argument("--file", default="-", help="command file (default: stdin)")
+    ap_batch.add_argument("--out", default="-", help="result NDJSON file (default: stdout)")
+    ap_batch.add_argument("--concurrency", type=int, default=4, help="parallel requests over pooled connections (commands for the same rn stay in input order)")
+    ap_batch.add_argument("--include-body", action="store_true", help="include response body in result records")
+
     args = ap.parse_args()
 
     base = args.base_url.rstrip("/")
     origin = args.origin
     timeout = args.timeout
 
-    if args.cmd == "create":
+    if args.cmd == "batch":
+        sys.exit(run_batch(args))
+
+    elif args.cmd == "create":
         rn = args.rn
         api = args.api
         rr = args.rr.lower() == "true"
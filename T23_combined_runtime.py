@@ -0,0 +1,197 @@
+"""
+T2(이상 감지) + T3(카메라 스트리밍) 통합 런타임.
+
+한 프로세스에서 MQTT 연결 1개와 Mobius HTTP 커넥션 풀 1개를 함께 쓴다.
+- T2가 출동을 결정하면 이벤트 버스로 T3 Streamer를 바로 시작 (Mobius 왕복 없음)
+- Ctrl CIN은 기록용으로 비동기 전송 (--transport-ctrl http|mqtt)
+- Mobius가 되돌려 보내는 Ctrl NOTIFY(에코)는 T3에서 sid 기준으로 무시.
+  다른 곳에서 쓴 Ctrl CIN은 기존처럼 NOTIFY로 스트리밍을 시작한다.
+
+인자는 T2/T3 인자를 모두 받는다 (같은 이름은 하나로 합쳐짐).
+--state-backend/--lanes/--lane-report-sec 는 T2와 같이 동작하고, 단일 프로세스 전용이라
+--workers/--share-group, 그리고 아직 통합 런타임에 없는 --snapshot-file/--catchup-sec 는 거부한다.
+예)
+  python T23_combined_runtime.py --broker 127.0.0.1 --cse-id Mobius2 --origin-mqtt SZlK9SDKWNx \
+      --media-root ./robot --media-base-url http://192.168.0.58:8000/robot
+"""
+import argparse, logging, os, signal, sys, time
+from typing import List, Optional
+
+from paho.mqtt import client as mqtt
+
+import T2_anomaly_detection as t2
+import T3_robot_control as t3
+from common import logutil, onem2m_mqtt, profiler, shared_state
+from common.eventbus import EventBus
+from common.onem2m_client import Onem2mClient
+
+log = logging.getLogger("t23")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    # T3 기본값(cse-id/origin-mqtt 등)이 우선하도록 T3를 뒤에 둔다
+    ap = argparse.ArgumentParser(description="Combined T2+T3 runtime (in-process dispatch)",
+                                 parents=[t2.build_arg_parser(), t3.build_arg_parser()],
+                                 conflict_handler="resolve")
+    ap.add_argument("--echo-ttl", type=float, default=30.0,
+                    help="로컬 트리거 후 Ctrl NOTIFY 에코를 무시할 시간(초)")
+    return ap
+
+
+class CombinedRuntime:
+    """
+    AnomalyDetector → (bus "dispatch") → CtrlListener.trigger_local → Streamer.
+    on_message는 Ctrl 경로가 payload에 있으면 T3, 아니면 T2로 보낸다.
+    """
+
+    def __init__(self, args: argparse.Namespace, *, trace=None, t2_metrics=None, t3_metrics=None,
+                 client: Optional[Onem2mClient] = None, transport=None,
+                 state: Optional[shared_state.StateStore] = None):
+        self.args = args
+        # 공유 HTTP 풀: 라벨 GET + Ctrl CIN + Cam CIN (Ctrl 비동기 전송분 1개 여유)
+        self.client = client or Onem2mClient(args.base_url, args.origin, timeout=args.timeout,
+                                             rvi=t2.DEFAULT_RVI, max_inflight=args.cam_inflight + 1)
+        cam_client = transport if (transport is not None and args.transport_cam == "mqtt") else self.client
+        ctrl_client = transport if (transport is not None and args.transport_ctrl == "mqtt") else self.client
+
+        sensors = t2.build_sensor_registry(args)
+        # 집계 CIN 일괄 전송은 따로 (공유 풀의 max_inflight 를 Cam/Ctrl 전송이 쓰도록)
+        self.rollup_client = Onem2mClient(args.base_url, args.origin, timeout=args.timeout,
+                                          rvi=t2.DEFAULT_RVI) if args.rollup_windows else None
+        self.bus = EventBus()
+        self.streamer = t3.build_streamer(args, trace=trace, metrics=t3_metrics, client=cam_client)
+        self.listener = t3.CtrlListener(args, self.streamer, trace=trace, metrics=t3_metrics,
+                                        echo_ttl=args.echo_ttl, sensors=t3.build_sensor_registry(args))
+        self.detector = t2.AnomalyDetector(args, t2.load_ori_map(args.sensor_map), trace=trace,
+                                           metrics=t2_metrics, ctrl_transport=ctrl_client,
+                                           label_client=self.client, sensors=sensors, state=state,
+                                           dispatcher=t2.build_dispatcher(args),
+                                           rollup=t2.build_rollup(args, self.rollup_client, sensors=sensors,
+                                                                  metrics=t2_metrics)
+                                           if self.rollup_client is not None else None,
+                                           on_decide=lambda cmd, ref: self.bus.publish("dispatch", cmd, ref))
+        self.bus.subscribe("dispatch", self.listener.trigger_local)
+
+    def on_message(self, client, userdata, msg):
+        # T3 사전 필터와 같은 기준 (sur 의 앞 '/' 없음, JSON '\/' 이스케이프도 인식)
+        if self.listener.mentions_ctrl(msg.payload):
+            self.listener.on_message(client, userdata, msg)
+        else:
+            self.detector.on_message(client, userdata, msg)
+
+    def close(self) -> None:
+        self.detector.close()
+        self.streamer.stop()
+        self.client.close()
+        if self.rollup_client is not None:
+            self.rollup_client.close()
+
+
+def check_args(ap: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """T2/T3 에서 물려받았지만 통합 런타임이 지원하지 않는 인자는 조용히 무시하지 않고 거부"""
+    if args.workers > 1 or args.share_group:
+        ap.error("--workers/--share-group are T2-only (run T2_anomaly_detection.py for a cluster)")
+    if args.snapshot_file:
+        ap.error("--snapshot-file is not supported by the combined runtime")
+    if args.catchup_sec > 0:
+        ap.error("--catchup-sec is not supported by the combined runtime")
+
+
+def main():
+    ap = build_arg_parser()
+    args = ap.parse_args()
+    check_args(ap, args)
+
+    topics: List[str]
+    if args.topics.strip():
+        topics = [t.strip() for t in args.topics.split(",") if t.strip()]
+    else:
+        topics = [
+            f"/oneM2M/req/{args.cse_id}/{args.origin_mqtt}/json",
+            f"/oneM2M/req/{args.origin_mqtt}/{args.cse_id}/json",
+        ]
+
+    # t2/t3 로거를 같은 설정으로 (큐 리스너는 로거별 1개)
+    listeners = [logutil.setup_from_args(name, args) for name in ("t23", "t2", "t3")]
+    profiler.install("t23", args,
+                     on_start=lambda sec: log.info("[PROFILE] sampling for %.0fs", sec),
+                     on_done=lambda stem: log.info("[PROFILE] wrote %s.*", stem))
+
+    t2_metrics = t3_metrics = None
+    if args.metrics_port:
+        from common import metrics as metrics_mod
+        reg2, reg3 = metrics_mod.Registry("t2"), metrics_mod.Registry("t3")
+        t2_metrics, t3_metrics = t2.DetectorMetrics(reg2), t3.ListenerMetrics(reg3)
+        metrics_mod.serve([reg2, reg3], args.metrics_port)
+        log.info("[METRICS] http://0.0.0.0:%s/metrics", args.metrics_port)
+
+    # MQTT 클라이언트: v5 우선, 실패 시 v3 폴백
+    use_v5 = True
+    try:
+        from paho.mqtt.enums import CallbackAPIVersion
+        cli = mqtt.Client(client_id=f"t23-runtime-{os.getpid()}", protocol=mqtt.MQTTv5,
+                          callback_api_version=CallbackAPIVersion.VERSION2)
+    except Exception:
+        use_v5 = False
+        cli = mqtt.Client(client_id=f"t23-runtime-{os.getpid()}", protocol=mqtt.MQTTv311)
+
+    transport = None
+    if "mqtt" in (args.transport_ctrl, args.transport_cam):
+        transport = onem2m_mqtt.from_args(cli, args)
+    state = shared_state.open_store(args)
+    rt = CombinedRuntime(args, t2_metrics=t2_metrics, t3_metrics=t3_metrics, transport=transport, state=state)
+
+    def subscribe_all(client):
+        for t in topics:
+            client.subscribe(t, qos=args.qos)
+            log.info("[SUB] %s", t)
+        if transport is not None:
+            transport.subscribe()
+            log.info("[SUB] %s (oneM2M over mqtt)", transport.resp_topic)
+
+    def on_connect_v5(client, userdata, flags, reason_code, properties):
+        if not reason_code.is_failure:
+            log.info("[MQTT] connected %s:%s", args.broker, args.port)
+            subscribe_all(client)
+        else:
+            log.error("[ERR] connect failed rc=%s", reason_code)
+
+    def on_connect_v3(client, userdata, flags, rc):
+        if rc == 0:
+            log.info("[MQTT] connected %s:%s", args.broker, args.port)
+            subscribe_all(client)
+        else:
+            log.error("[ERR] connect failed rc=%s", rc)
+
+    cli.on_connect = on_connect_v5 if use_v5 else on_connect_v3
+    cli.on_message = rt.on_message
+    cli.connect(args.broker, args.port, keepalive=30)
+    cli.loop_start()
+
+    def _stop(*_):
+        try:
+            rt.close()
+            cli.loop_stop()
+            cli.disconnect()
+            state.close()
+        finally:
+            for lst in listeners:
+                logutil.shutdown(lst)
+            sys.exit(0)
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    try:
+        next_report = time.monotonic() + args.lane_report_sec
+        while True:
+            time.sleep(0.5)
+            if rt.detector.lanes is not None and args.lane_report_sec > 0 and time.monotonic() >= next_report:
+                rt.detector.lane_report()
+                next_report += args.lane_report_sec
+    except KeyboardInterrupt:
+        _stop()
+
+
+if __name__ == "__main__":
+    main()
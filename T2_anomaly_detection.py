@@ -1,9 +1,17 @@
-import argparse, csv, json, os, re, signal, sys, time, uuid
+import argparse, csv, json, logging, os, re, signal, socket, struct, subprocess, sys, threading, time, uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Tuple, Optional, List
+from typing import Any, Callable, Dict, Tuple, Optional, List
 import paho.mqtt.client as mqtt
 import requests
 
+from common import lanes as lanes_mod
+from common import catchup, dedup, dispatch, logutil, onem2m_mqtt, profiler, rollup, sensor_registry, shared_state, snapshot
+from common.logutil import event
+from common.onem2m_client import CinResult, Onem2mClient
+
+T_START = time.perf_counter()  # [READY] 기준 시각. import(paho/requests 등) 비용은 제외 — 인터프리터 기동 포함 시간은 외부에서 측정
+log = logging.getLogger("t2")
+
 # 환경 기본값 설정
 DEFAULT_BASE = os.getenv("MOBIUS_BASE_URL", "http://192.168.0.58:7579/Mobius").rstrip("/")
 DEFAULT_ORIGIN = os.getenv("MOBIUS_ORIGIN", "CAdmin")
@@ -53,6 +61,26 @@ def content_headers(ty: Optional[int] = None) -> Dict[str, str]:
 
 
 # -------------------- Mobius: CIN 생성 (로봇 명령) --------------------
+def ctrl_con(x: float, y: float, oz: float, ow: float, sid: Optional[str] = None) -> Dict[str, Any]:
+    con_obj: Dict[str, Any] = {
+        "position": {"x": float(x), "y": float(y), "z": 0.0},
+        "orientation": {"z": float(oz), "w": float(ow)},
+    }
+    if sid:
+        con_obj["sid"] = sid
+    return con_obj
+
+
+def ctrl_result_msg(ae: str, robot_cnt: str, ctrl_cnt: str, res: CinResult) -> Tuple[bool, str]:
+    """post_cin_pose 와 같은 형태의 결과 문자열 (비동기 전송용, status는 HTTP status 또는 MQTT rsc)"""
+    ok, status, text = res
+    if ok:
+        return True, f"[OK] CIN created to {ae}/{robot_cnt}/{ctrl_cnt}\n{text}"
+    if status == 0:
+        return False, f"[ERR] request failed: {text}"
+    return False, f"[ERR] create CIN failed: {status}\n{text}"
+
+
 def post_cin_pose(
     base: str,
     origin: str,
@@ -69,12 +97,7 @@ def post_cin_pose(
     stringify_con: bool = True
 ) -> Tuple[bool, str]:
     url = f"{base}/{ae}/{robot_cnt}/{ctrl_cnt}?ty=4"
-    con_obj = {
-        "position": {"x": float(x), "y": float(y), "z": 0.0},
-        "orientation": {"z": float(oz), "w": float(ow)},
-    }
-    if sid:
-        con_obj["sid"] = sid
+    con_obj = ctrl_con(x, y, oz, ow, sid)
 
     body = {"m2m:cin": {"cnf": "application/json",
                         "con": json.dumps(con_obj, ensure_ascii=False) if stringify_con else con_obj}}
@@ -94,10 +117,11 @@ def post_cin_pose(
             return False, f"[ERR] create CIN failed: {resp.status_code}\n{resp.text}"
 
 # -------------------- 라벨 GET & 파싱 --------------------
-def get_cnt_labels(base: str, origin: str, resource_path: str, *, timeout: float) -> Optional[List[str]]:
+def get_cnt_labels(base: str, origin: str, resource_path: str, *, timeout: float,
+                   client: Optional[Onem2mClient] = None) -> Optional[List[str]]:
     """
     컨테이너 리소스 경로(resource_path 예: '/Meta-Sejong/Sensor1')의 lbl 배열을 GET으로 수집.
-    base는 .../Mobius 까지 포함.
+    base는 .../Mobius 까지 포함. client를 주면 그 커넥션 풀로 요청.
     """
     # base에 이미 /Mobius 포함이므로 sur 시작에 '/Mobius'가 있으면 제거
     if resource_path.startswith("/"):
@@ -112,19 +136,22 @@ def get_cnt_labels(base: str, origin: str, resource_path: str, *, timeout: float
     hdrs = base_headers(origin, include_accept=True, include_rvi=True)
 
     try:
-        resp = requests.get(url, headers=hdrs, timeout=timeout)
+        if client is not None:
+            resp = client.get(path)
+        else:
+            resp = requests.get(url, headers=hdrs, timeout=timeout)
     except Exception as e:
-        print(f"[WARN] GET {url} failed: {e}", file=sys.stderr)
+        log.warning("[WARN] GET %s failed: %s", url, e)
         return None
 
     if not resp.ok:
-        print(f"[WARN] GET {url} status={resp.status_code}", file=sys.stderr)
+        log.warning("[WARN] GET %s status=%s", url, resp.status_code)
         return None
 
     try:
         data = resp.json()
     except Exception:
-        print(f"[WARN] non-JSON response from {url}", file=sys.stderr)
+        log.warning("[WARN] non-JSON response from %s", url)
         return None
 
     # 일반적으로 컨테이너는 'm2m:cnt' 루트
@@ -138,7 +165,7 @@ def get_cnt_labels(base: str, origin: str, resource_path: str, *, timeout: float
         if isinstance(v, dict) and isinstance(v.get("lbl"), list):
             return v["lbl"]
 
-    print(f"[WARN] lbl not found in {url}", file=sys.stderr)
+    log.warning("[WARN] lbl not found in %s", url)
     return None
 
 LBL_PATTERNS = {
@@ -147,14 +174,19 @@ LBL_PATTERNS = {
     "oz":   re.compile(r"\boz\b\s*[:=]?\s*(-?\d+(?:\.\d+)?)", re.I),
     "ow":   re.compile(r"\bow\b\s*[:=]?\s*(-?\d+(?:\.\d+)?)", re.I),
     "sid":  re.compile(r"\bsid\b\s*[:=]\s*([A-Za-z0-9._\-]+)", re.I),
+    # 센서 자체 좌표 (x=/y=/z=). adjx 등과 겹치지 않도록 구분자 필수
+    "sx":   re.compile(r"^\s*x\s*[:=]\s*(-?\d+(?:\.\d+)?)", re.I),
+    "sy":   re.compile(r"^\s*y\s*[:=]\s*(-?\d+(?:\.\d+)?)", re.I),
+    "sz":   re.compile(r"^\s*z\s*[:=]\s*(-?\d+(?:\.\d+)?)", re.I),
 }
 
 def parse_pose_from_labels(lbl: List[str]) -> Dict[str, Optional[float]]:
     """
     lbl 문자열 리스트에서 adjx/adjy/oz/ow 값을 추출.
-    반환: {"x": float|None, "y": float|None, "oz": float|None, "ow": float|None}
+    반환: {"x": float|None, "y": float|None, "oz": float|None, "ow": float|None, "sid": str|None,
+           "sx"/"sy"/"sz": 센서 좌표 float|None (다중 로봇 출동용)}
     """
-    res = {"x": None, "y": None, "oz": None, "ow": None, "sid": None}
+    res = {"x": None, "y": None, "oz": None, "ow": None, "sid": None, "sx": None, "sy": None, "sz": None}
     if not isinstance(lbl, list):
         return res
     for item in lbl:
@@ -164,7 +196,7 @@ def parse_pose_from_labels(lbl: List[str]) -> Dict[str, Optional[float]]:
             m = pat.search(item)
             if not m:
                 continue
-            if key in ("adjx", "adjy", "oz", "ow"):
+            if key in ("adjx", "adjy", "oz", "ow", "sx", "sy", "sz"):
                 val = float(m.group(1))
                 if key == "adjx": res["x"] = val
                 elif key == "adjy": res["y"] = val
@@ -193,11 +225,12 @@ def derive_sensor_cnt_paths(ae: str, sur: Optional[str], sensor_no: int) -> List
     return out
 
 
-def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]:
+def parse_notification_shaped(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str], str]:
+    """parse_notification + 페이로드 형태(shape) 반환. shape: notify/sgn/create/cin/raw/unknown/invalid"""
     try:
         obj = json.loads(payload)
     except Exception:
-        return None, None, None
+        return None, None, None, "invalid"
 
     # A) oneM2M NOTIFY wrapper (최상위 pc)
     if isinstance(obj, dict) and isinstance(obj.get("pc"), dict) and "m2m:sgn" in obj["pc"]:
@@ -210,7 +243,7 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
             if isinstance(con, str):
                 try: con = json.loads(con)
                 except Exception: con = {"_raw": con}
-            return cin, con, sur
+            return cin, con, sur, "notify"
 
     # B) m2m:sgn directly
     if isinstance(obj, dict) and "m2m:sgn" in obj:
@@ -223,7 +256,7 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
             if isinstance(con, str):
                 try: con = json.loads(con)
                 except Exception: con = {"_raw": con}
-            return cin, con, sur
+            return cin, con, sur, "sgn"
     
     if isinstance(obj, dict) and obj.get("op") == 1 and isinstance(obj.get("pc"), dict):
         pc = obj["pc"]
@@ -235,7 +268,7 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
                 except Exception: con = {"_raw": con}
             # sur 대신 to 경로를 넘겨서 추후 센서번호 추출에 사용
             to_path = obj.get("to")
-            return cin, con, to_path
+            return cin, con, to_path, "create"
 
     # C) direct CIN
     if isinstance(obj, dict) and "m2m:cin" in obj:
@@ -244,13 +277,18 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
         if isinstance(con, str):
             try: con = json.loads(con)
             except Exception: con = {"_raw": con}
-        return cin, con, None
+        return cin, con, None, "cin"
 
     # D) raw body
     if isinstance(obj, dict) and any(k in obj for k in ("temp","temperature")) and "fire_alarm" in obj and "ts" in obj:
-        return None, obj, None
+        return None, obj, None, "raw"
 
-    return None, None, None
+    return None, None, None, "unknown"
+
+
+def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]:
+    cin, con, sur, _ = parse_notification_shaped(payload)
+    return cin, con, sur
 
 
 def extract_fields(con: Any) -> Optional[Tuple[float, int, str]]:
@@ -312,17 +350,75 @@ def guess_sensor_no(sur: Optional[str], con: Optional[Dict[str, Any]]) -> Option
     return None
 
 
-# --- 센서별 처리 핸들러(원하는 로직으로 바꿔 써) --------------------
-def handle_sensor1(temp: float, fire: int, ts: str, meta: Dict[str, Any]):
-    print(f"[S1] temp={temp} fire_alarm={fire} ts={ts} meta={meta}")
+def sensor_from_sur(sur: str) -> Optional[Tuple[int, Optional[str]]]:
+    """sur → (센서 번호, '/.../Sensor{n}' 경로). 레지스트리에 없는 sur 폴백용."""
+    n = guess_sensor_no(sur, None)
+    if n is None:
+        return None
+    m = re.search(r"(/[^ \t\n\r]+?/Sensor%s)(?:/|$)" % n, sur)
+    return n, (m.group(1) if m else None)
+
 
+def sensor_no_from_sid(sid: str) -> Optional[int]:
+    return guess_sensor_no(None, {"sid": sid})
 
-def handle_sensor2(temp: float, fire: int, ts: str, meta: Dict[str, Any]):
-    print(f"[S2] temp={temp} fire_alarm={fire} ts={ts} meta={meta}")
 
+def build_dispatcher(args: argparse.Namespace) -> Optional[dispatch.RobotDispatcher]:
+    """--robots 가 있으면 다중 로봇 출동기 구성 (없으면 None → --robot 하나로 전송)"""
+    if not args.robots:
+        return None
+    disp = dispatch.RobotDispatcher(cell=args.grid_cell, busy_sec=args.robot_busy_sec)
+    try:
+        dispatch.load_robots(disp, args.robots)
+    except Exception as e:
+        log.warning("[WARN] robots load failed: %s", e)
+        return None
+    return disp if len(disp.robots) else None
 
-def handle_sensor3(temp: float, fire: int, ts: str, meta: Dict[str, Any]):
-    print(f"[S3] temp={temp} fire_alarm={fire} ts={ts} meta={meta}")
+
+def build_rollup(args: argparse.Namespace, client: Onem2mClient, *, sensors: sensor_registry.SensorRegistry,
+                 metrics: Optional["DetectorMetrics"] = None) -> Optional[rollup.RollupAggregator]:
+    """--rollup-windows 가 있으면 센서별 집계기 구성. 전송은 client(커넥션 풀)로 일괄."""
+    windows = rollup.parse_windows(args.rollup_windows)
+    if not windows:
+        return None
+
+    def path_for(key: int, window: int) -> str:
+        rec = sensors.by_key.get(key)
+        sensor_no = rec.no if rec is not None else key
+        sensor_path = rec.path if rec is not None and rec.path else f"/{args.ae}/Sensor{sensor_no}"
+        return args.rollup_path.format(ae=args.ae, sensor=sensor_no, sensor_path=sensor_path, window=window)
+
+    def on_result(ok: int, err: int, sec: float) -> None:
+        if metrics:
+            metrics.http_seconds.observe(sec, "rollup_batch")
+            metrics.cin_posts.inc("rollup", "ok", amount=ok)
+            metrics.cin_posts.inc("rollup", "err", amount=err)
+        if err:
+            event(log, logging.WARNING, "[WARN] rollup CIN failed %s/%s", err, ok + err,
+                  rl_key="rollup", ok=ok, err=err)
+
+    return rollup.RollupAggregator(windows, path_for, client.post_cin_batch, flush_sec=args.rollup_flush_sec,
+                                   grace_sec=args.rollup_grace_sec, on_result=on_result)
+
+
+def build_sensor_registry(args: argparse.Namespace) -> sensor_registry.SensorRegistry:
+    """--sensor-spec / --sensor-discover 로 센서 라우팅 테이블 구성"""
+    reg = sensor_registry.SensorRegistry(sur_fallback=sensor_from_sur, sid_fallback=sensor_no_from_sid)
+    if args.sensor_spec:
+        try:
+            sensor_registry.load_spec(reg, args.sensor_spec)
+        except Exception as e:
+            log.warning("[WARN] sensor spec load failed: %s", e)
+    if getattr(args, "sensor_discover", False):
+        client = Onem2mClient(args.base_url, args.origin, timeout=args.timeout, rvi=DEFAULT_RVI)
+        try:
+            sensor_registry.discover(reg, client, args.ae)
+        except Exception as e:
+            log.warning("[WARN] sensor discovery failed: %s", e)
+        finally:
+            client.close()
+    return reg
 
 
 def append_csv(path: str, row: List[Any], header: List[str]):
@@ -334,11 +430,24 @@ def append_csv(path: str, row: List[Any], header: List[str]):
                 w.writerow(header)
             w.writerow(row)
     except Exception as e:
-        print(f"[WARN] CSV write failed: {e}", file=sys.stderr)
+        log.warning("[WARN] CSV write failed: %s", e)
 
 
-# -------------------- 메인 --------------------
-def main():
+def append_csv_rows(path: str, rows: List[List[Any]], header: List[str]):
+    """append_csv 묶음판 (파일을 한 번만 연다)"""
+    try:
+        exists = os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if not exists:
+                w.writerow(header)
+            w.writerows(rows)
+    except Exception as e:
+        log.warning("[WARN] CSV write failed: %s", e)
+
+
+# -------------------- 인자 / 설정 --------------------
+def build_arg_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser()
     # MQTT
     ap.add_argument("--broker", default=os.getenv("MQTT_BROKER", "127.0.0.1"))
@@ -366,8 +475,662 @@ def main():
                     help="라벨 재조회 주기(초). 0이면 매 이벤트마다 GET.")
     ap.add_argument("--cooldown-sec", type=float, default=10.0,
                     help="센서별 CIN 전송 쿨다운(초).")
+    ap.add_argument("--anomaly-temp", type=float, default=50.0,
+                    help="이 온도 이상이면 화재 알람이 아니어도 high 레인으로 (--lanes). 0이면 알람만.")
+    sensor_registry.add_registry_args(ap, discover_flag=True)
+
+    # 중복 NOTIFY 제거 (표준/역순 두 토픽 + QoS 1 재전송)
+    dedup.add_dedup_args(ap)
+
+    # 다중 로봇 출동 (센서 좌표 기준 최근접 가용 로봇)
+    dispatch.add_dispatch_args(ap)
+
+    # 전송 경로 (Ctrl CIN: http|mqtt)
+    onem2m_mqtt.add_transport_args(ap, "ctrl")
+
+    # 클러스터 (MQTT v5 공유 구독 + 공유 상태)
+    ap.add_argument("--share-group", default=os.getenv("MQTT_SHARE_GROUP", ""),
+                    help="지정 시 $share/<group>/<topic> 으로 구독해 같은 그룹 워커끼리 메시지 분산 (MQTT v5)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="이 호스트에서 띄울 워커 프로세스 수. 2 이상이면 --share-group 과 --state-backend file 필요.")
+    # run_workers 가 워커마다 넘기는 값 (직접 쓰지 않음)
+    ap.add_argument("--worker-index", type=int, default=0, help=argparse.SUPPRESS)
+    ap.add_argument("--cluster-start", type=float, default=0.0, help=argparse.SUPPRESS)
+    shared_state.add_state_args(ap)
+
+    # 센서별 구간 집계 CIN
+    rollup.add_rollup_args(ap)
+
+    # 우선순위 레인 (알람 우선, 일반 측정값은 묶음/샘플링/버림)
+    lanes_mod.add_lane_args(ap)
+
+    # 시작/재접속 시 놓친 측정값 따라잡기
+    catchup.add_catchup_args(ap)
+
+    # 재시작 시 라벨/쿨다운/센서/로봇 상태 복구
+    snapshot.add_snapshot_args(ap, "T2_SNAPSHOT_FILE")
+
+    # 관측
+    logutil.add_log_args(ap)
+    profiler.add_profile_args(ap)
+    ap.add_argument("--metrics-port", type=int, default=int(os.getenv("METRICS_PORT", "0")),
+                    help="Prometheus /metrics 포트. 0이면 비활성.")
+    return ap
+
+
+def load_ori_map(path: str) -> Dict[int, Dict[str, float]]:
+    """orientation 기본값 로드 (x,y는 lbl에서 읽음)"""
+    ori_map: Dict[int, Dict[str, float]] = dict(SENSOR_MAP_DEFAULT)
+    if not path:
+        return ori_map
+    try:
+        if path.lower().endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                for k, v in data.items():
+                    sid = int(k)
+                    oz = float(v.get("oz", ori_map.get(sid, {}).get("oz", OZ_DEFAULT)))
+                    ow = float(v.get("ow", ori_map.get(sid, {}).get("ow", OW_DEFAULT)))
+                    ori_map[sid] = {"oz": oz, "ow": ow}
+            elif isinstance(data, list):
+                for row in data:
+                    sid = int(row["sensor"])
+                    oz = float(row.get("oz", ori_map.get(sid, {}).get("oz", OZ_DEFAULT)))
+                    ow = float(row.get("ow", ori_map.get(sid, {}).get("ow", OW_DEFAULT)))
+                    ori_map[sid] = {"oz": oz, "ow": ow}
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    sid = int(row["sensor"])
+                    oz = float(row.get("oz", ori_map.get(sid, {}).get("oz", OZ_DEFAULT)))
+                    ow = float(row.get("ow", ori_map.get(sid, {}).get("ow", OW_DEFAULT)))
+                    ori_map[sid] = {"oz": oz, "ow": ow}
+    except Exception as e:
+        log.warning("[WARN] sensor_map load failed: %s", e)
+    return ori_map
+
+
+# -------------------- 메트릭 --------------------
+class DetectorMetrics:
+    """T2 메트릭 묶음 (--metrics-port 지정 시에만 생성)"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.messages = registry.counter("messages_total", "Messages received", ("topic", "shape"))
+        self.parse_failures = registry.counter("parse_failures_total", "Messages without temp/fire_alarm", ("topic",))
+        self.alarms = registry.counter("alarms_total", "fire_alarm=1 readings", ("sensor",))
+        self.cooldown_skips = registry.counter("cooldown_skips_total", "Alarms skipped by cooldown", ("sensor",))
+        self.cin_posts = registry.counter("cin_posts_total", "CIN POST results", ("op", "result"))
+        self.on_message_seconds = registry.histogram("on_message_seconds", "on_message duration")
+        self.duplicates = registry.counter("duplicates_total", "Duplicate notifications dropped", ("topic",))
+        self.http_seconds = registry.histogram("http_seconds", "Mobius HTTP latency", ("op",))
+        self.lane_shed = registry.counter("lane_shed_total", "Messages shed by priority lane", ("lane", "reason"))
+        self.lane_seconds = registry.histogram("lane_seconds", "Receive to processed latency per lane", ("lane",))
+        self.robot_assign = registry.counter("robot_assign_total", "Robot assignments", ("robot", "free"))
+        self.assign_seconds = registry.histogram("assign_seconds", "Nearest robot lookup duration",
+                                                 buckets=(1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3))
+        self.catchup_cins = registry.counter("catchup_cins_total", "CINs fetched by catch-up", ("result",))
+        self.ready_seconds = registry.gauge("ready_seconds", "Seconds from end of module imports to first subscription")
+
+
+# -------------------- 스냅샷 레코드 --------------------
+_POSE_KEYS = ("x", "y", "oz", "ow", "sx", "sy", "sz")
+_SNAP_NO = struct.Struct("<i")
+_SNAP_LABEL = struct.Struct("<qd7d")        # 센서 key, 라벨 조회 시각, _POSE_KEYS (None=NaN) + sid 문자열
+_SNAP_COOLDOWN = struct.Struct("<qd")       # 센서 key, last_sent_at
+_SNAP_ROBOT = struct.Struct("<ddd")         # 로봇 이름 문자열 + x, y, 남은 busy 초
+_NAN = float("nan")
+
+
+# -------------------- 메시지 처리기 --------------------
+class _CatchupRef:
+    """따라잡기 CIN 의 msg 자리 (로그/trace 용 topic 만)"""
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.payload = b""
+
+
+class AnomalyDetector:
+    """
+    센서 NOTIFY → (화재 시) 라벨 좌표 조회 → Ctrl CIN 전송.
+    - trace(stage, ref): 단계별 타임스탬프 훅. stage는 recv/parse/label/ctrl_ack,
+      ref는 처리 중인 msg. None이면 호출하지 않음.
+    - on_dispatch(cmd, ref): Ctrl CIN 전송 성공 시 호출. cmd는 sensor/sid/x/y/oz/ow.
+    - metrics: DetectorMetrics. None이면 계측하지 않음.
+    - ctrl_transport: post_cin_async 를 가진 전송(Onem2mMqttTransport 또는 Onem2mClient).
+      지정하면 Ctrl CIN을 비동기로 보내고 결과는 콜백에서 처리한다(paho 스레드를 막지 않음).
+    - on_decide(cmd, ref): Ctrl CIN 전송 직전(출동 결정 시점)에 호출. 통합 런타임에서 사용.
+    - label_client: 라벨 GET에 쓸 Onem2mClient (커넥션 풀 공유). None이면 requests 직접 호출.
+    - sensors: SensorRegistry. sur/sid/topic → 센서 조회. None이면 빈 레지스트리(정규식 폴백 + 학습).
+      레코드에 lbl이 있으면 라벨 캐시를 미리 채운다.
+    - state: 쿨다운/라벨 저장소(shared_state.StateStore). None이면 프로세스 내 LocalStore.
+      쿨다운은 출동 결정 시 try_acquire 로 원자적으로 잡고, 라벨 없음/전송 실패 시 release.
+    - dispatcher: dispatch.RobotDispatcher. 지정하면 알람마다 가장 가까운 가용 로봇을 골라
+      그 로봇의 Ctrl 로 전송하고 cmd["robot"]에 기록. None이면 --robot 하나로 전송.
+    - rollup: rollup.RollupAggregator. 지정하면 센서를 찾은 측정값마다 창별 집계를 갱신
+      (레인에서 버려지는 값도 집계에는 포함).
+    - args.dedup_ttl_sec > 0 이면 같은 NOTIFY(ri/rqi, --dedup-hash 면 내용)를 파싱 전에 버린다 (common.dedup).
+    - args.catchup_sec > 0 이면 처리한 CIN 의 ct/ri 를 센서별 커서(common.catchup.Cursor)에 남기고,
+      catch_up() 이 그 이후 CIN 을 조회해 같은 파이프라인(process_batch)으로 처리한다.
+    - snapshot_sections()/restore(): 재시작용 상태(센서/라벨/쿨다운/로봇) 바이너리 스냅샷 (common.snapshot).
+    - args.lanes 가 켜져 있으면 on_message 는 파싱/분류(ingest, classify)만 하고
+      high/low 레인(common.lanes.PriorityLanes)에 넘긴다. 꺼져 있으면 기존처럼 handle 에서 동기 처리.
+    """
 
+    def __init__(self, args: argparse.Namespace, ori_map: Dict[int, Dict[str, float]], *,
+                 trace: Optional[Callable[[str, Any], None]] = None,
+                 on_dispatch: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+                 metrics: Optional[DetectorMetrics] = None,
+                 ctrl_transport=None,
+                 on_decide: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+                 label_client: Optional[Onem2mClient] = None,
+                 sensors: Optional[sensor_registry.SensorRegistry] = None,
+                 state: Optional[shared_state.StateStore] = None,
+                 dispatcher: Optional[dispatch.RobotDispatcher] = None,
+                 rollup: Optional[rollup.RollupAggregator] = None):
+        self.args = args
+        self.dispatcher = dispatcher
+        self.rollup = rollup
+        self.ori_map = ori_map
+        self.trace = trace
+        self.on_dispatch = on_dispatch
+        self.metrics = metrics
+        self.ctrl_transport = ctrl_transport
+        self.on_decide = on_decide
+        self.label_client = label_client
+        transport = getattr(ctrl_transport, "transport", "http")
+        self.ctrl_op = "ctrl_post" if transport == "http" else f"ctrl_post_{transport}"
+        # 라벨 캐시(센서별 (last_fetch_ts, pose_from_lbl)) + 전송 쿨다운
+        self.state = state or shared_state.LocalStore()
+        self.sensors = sensors or sensor_registry.SensorRegistry(sur_fallback=sensor_from_sur,
+                                                                 sid_fallback=sensor_no_from_sid)
+        now = time.time()
+        for rec in self.sensors.records:
+            if rec.lbl:
+                pose = parse_pose_from_labels(rec.lbl)
+                if self.state.get_label(rec.key) is None:
+                    self.state.put_label(rec.key, now, pose)
+                if dispatcher is not None:
+                    dispatcher.update_sensor(rec.key, pose)
+        self.dedup = dedup.from_args(args)
+        self.cursor = catchup.Cursor() if getattr(args, "catchup_sec", 0) > 0 else None
+        self.lanes: Optional[lanes_mod.PriorityLanes] = None
+        if getattr(args, "lanes", False):
+            self.lanes = lanes_mod.PriorityLanes(
+                self.process, self.process_batch,
+                high_max=args.high_max, low_max=args.low_max,
+                low_batch=args.low_batch, low_sample=args.low_sample,
+                on_shed=(lambda lane, reason, n: metrics.lane_shed.inc(lane, reason, amount=n)) if metrics else None,
+                on_latency=(lambda lane, sec: metrics.lane_seconds.observe(sec, lane)) if metrics else None,
+                on_error=lambda lane, e: log.error("[ERR] %s lane: %s", lane, e, exc_info=e))
+
+    def lane_report(self) -> None:
+        """[LANES] 레인별 대기 개수/처리 수/버린 수/지연(ms)"""
+        if self.lanes is None:
+            return
+        for lane, st in self.lanes.stats().items():
+            event(log, logging.INFO,
+                  "[LANES] %s depth=%s accepted=%s processed=%s shed_full=%s shed_sampled=%s over_max=%s "
+                  "p50=%sms p99=%sms",
+                  lane, st["depth"], st["accepted"], st["processed"], st["shed_full"], st["shed_sampled"],
+                  st["over_max"], st["p50_ms"], st["p99_ms"], lane=lane, **st)
+
+    def dedup_report(self) -> None:
+        """[DEDUP] 토픽별 수신/중복 수와 중복 비율"""
+        if self.dedup is None:
+            return
+        for topic, st in self.dedup.stats().items():
+            event(log, logging.INFO, "[DEDUP] %s seen=%s dup=%s rate=%s", topic, st["seen"], st["dup"], st["rate"],
+                  topic=topic, **st)
+
+    def close(self) -> None:
+        """레인에 남은 메시지를 처리하고 마지막 [LANES] 보고, 진행 중 집계 창 전송"""
+        if self.lanes is not None and not self.lanes.closed:
+            self.lanes.close()
+            self.lane_report()
+        if self.rollup is not None:
+            self.rollup.close()
+
+    def lookup_sensor(self, sur: Optional[str], con: Any, topic: Optional[str]) -> Optional[sensor_registry.SensorRecord]:
+        """guess_sensor_no 와 같은 우선순위(sur → con.sid) + 구독 토픽"""
+        reg = self.sensors
+        rec = reg.from_sur(sur) if isinstance(sur, str) else None
+        if rec is None and isinstance(con, dict):
+            sid = con.get("sid") or con.get("SID")
+            if isinstance(sid, str):
+                rec = reg.from_sid(sid)
+        return rec or reg.from_topic(topic)
+
+    def resolve_pose(self, sensor_no: int, sur: Optional[str], now: float,
+                     rec: Optional[sensor_registry.SensorRecord] = None) -> Optional[Dict[str, Optional[float]]]:
+        """라벨 캐시 확인/갱신. 라벨을 못 찾으면 None. 캐시는 센서 레코드 key(경로 기준) 단위."""
+        args = self.args
+        if rec is None and sur:
+            rec = self.sensors.from_sur(sur)
+        key = rec.key if rec is not None else sensor_no
+        cached = self.state.get_label(key)
+        if cached and args.label_cache_sec > 0 and now - cached[0] < args.label_cache_sec:
+            if self.dispatcher is not None and key not in self.dispatcher.sensor_pos:
+                self.dispatcher.update_sensor(key, cached[1])
+            return cached[1]
+
+        # 센서 CNT 경로 후보
+        paths = rec.cnt_paths(args.ae) if rec is not None else derive_sensor_cnt_paths(args.ae, sur, sensor_no)
+        lbl_vals: Optional[List[str]] = None
+        m = self.metrics
+        for p in paths:
+            t0 = time.perf_counter() if m else 0.0
+            lbl_vals = get_cnt_labels(args.base_url, args.origin, p, timeout=args.timeout,
+                                      client=self.label_client)
+            if m:
+                m.http_seconds.observe(time.perf_counter() - t0, "label_get")
+            if lbl_vals:
+                break
+        if not lbl_vals:
+            return None
+        pose_from_lbl = parse_pose_from_labels(lbl_vals)
+        self.state.put_label(key, now, pose_from_lbl)
+        if self.dispatcher is not None:
+            self.dispatcher.update_sensor(key, pose_from_lbl)
+        return pose_from_lbl
+
+    def on_message(self, client, userdata, msg):
+        m = self.metrics
+        t0 = time.perf_counter() if (m or self.lanes) else 0.0
+        try:
+            if self.lanes is None:
+                self.handle(msg)
+            else:
+                item = self.ingest(msg)
+                if item is not None:
+                    self.lanes.submit(self.classify(item), item, t0)
+        finally:
+            if m:
+                m.on_message_seconds.observe(time.perf_counter() - t0)
+
+    def handle(self, msg):
+        item = self.ingest(msg)
+        if item is not None:
+            self.process(item)
+
+    def ingest(self, msg) -> Optional[Tuple[Any, Any, Optional[str], Optional[sensor_registry.SensorRecord], Tuple[float, int, str]]]:
+        """중복 제거 + 파싱 + 센서 조회. 중복이거나 측정값이 없으면 None."""
+        trace = self.trace
+        m = self.metrics
+        if self.dedup is not None and self.dedup.is_dup(msg.topic, msg.payload):
+            if m:
+                m.duplicates.inc(msg.topic)
+            event(log, logging.DEBUG, "[SKIP] duplicate topic=%s", msg.topic, rl_key=f"dup:{msg.topic}",
+                  topic=msg.topic)
+            return None
+        if trace:
+            trace("recv", msg)
+
+        payload = msg.payload.decode("utf-8", errors="replace")
+        cin, con, sur, shape = parse_notification_shaped(payload)
+        triplet = extract_fields(con) if con is not None else None
+        rec = self.lookup_sensor(sur, con, msg.topic)
+        if trace:
+            trace("parse", msg)
+        if m:
+            m.messages.inc(msg.topic, shape)
+
+        if not triplet:
+            if m:
+                m.parse_failures.inc(msg.topic)
+            event(log, logging.INFO, "[RAW] topic=%s payload=%s", msg.topic, payload,
+                  rl_key=f"raw:{msg.topic}", topic=msg.topic, shape=shape)
+            return None
+        if rec is not None:
+            # 따라잡기와 겹친 CIN(같은 ri)은 먼저 잡은 쪽만 처리
+            if self.cursor is not None and isinstance(cin, dict) and not self.cursor.claim(
+                    rec.key, cin.get("ct"), cin.get("ri"), rec.path):
+                event(log, logging.DEBUG, "[SKIP] already caught up ri=%s", cin.get("ri"),
+                      rl_key=f"caught:{rec.key}", sensor=rec.no, path=rec.path)
+                return None
+            if self.rollup is not None:
+                self.rollup.add(rec.key, triplet[0], triplet[1], sid=rec.sid, no=rec.no)
+        return msg, con, sur, rec, triplet
+
+    def catch_up(self, client: Onem2mClient, *, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        센서별 커서 이후(없으면 --catchup-sec 전부터) 생성된 CIN 을 조회해 process_batch 로 처리.
+        대상은 레지스트리 센서 + 커서에 남은 센서. 조회 구간은 crb=지금 으로 고정해 페이지가 밀리지 않게 한다.
+        라이브와 겹친 CIN 은 커서의 claim(센서별 최근 ri)으로 한쪽만 처리한다 (dedup 설정과 무관).
+        now 는 조회 상한(crb) 기준 시각. 클러스터 시작 시에는 워커 기동 시각을 넘긴다.
+        rollup 은 수신 시각 기준 창이라 따라잡은 값은 넣지 않는다.
+        """
+        args = self.args
+        cur = self.cursor
+        if cur is None:
+            return {}
+        now = time.time() if now is None else now
+        floor = catchup.ct_of(now - args.catchup_sec)
+        crb = catchup.ct_of(now + 1)
+        # 커서/조회 결과는 센서 레코드 key(경로 기준) 단위
+        recs: Dict[int, sensor_registry.SensorRecord] = {r.key: r for r in self.sensors.records}
+        for key in list(cur.by_sensor):
+            if key not in recs:
+                rec = self.sensors_from_saved(key, (cur.get(key) or {}).get("path"))
+                if rec is not None:
+                    recs[key] = rec
+        targets: List[Tuple[int, str, str]] = []
+        for key, rec in sorted(recs.items()):
+            last = cur.get(key)
+            cra = max(floor, (last or {}).get("ct") or floor)
+            targets.append((key, f"{rec.cnt_paths(args.ae)[0]}/{args.catchup_cnt}", cra))
+
+        m = self.metrics
+        t0 = time.perf_counter()
+        results = catchup.fetch_all(client, targets, crb, page=args.catchup_page, limit=args.catchup_max,
+                                    concurrency=args.catchup_concurrency)
+        if m:
+            m.http_seconds.observe(time.perf_counter() - t0, "catchup_get")
+        stats = {"sensors": len(targets), "fetched": 0, "processed": 0, "dup": 0, "errors": 0}
+        items = []
+        for key, data_path, _ in targets:
+            cins = results.get(key)
+            rec = recs[key]
+            if isinstance(cins, Exception) or cins is None:
+                stats["errors"] += 1
+                event(log, logging.WARNING, "[WARN] catch-up %s failed: %s", data_path, cins,
+                      rl_key=f"catchup:{key}", sensor=rec.no, path=rec.path)
+                continue
+            ref = _CatchupRef(f"catchup:{data_path}")
+            for cin in cins:
+                stats["fetched"] += 1
+                con = cin.get("con")
+                if isinstance(con, str):
+                    try: con = json.loads(con)
+                    except Exception: con = {"_raw": con}
+                triplet = extract_fields(con) if con is not None else None
+                if not triplet:
+                    continue
+                ri = cin.get("ri")
+                if not cur.claim(key, cin.get("ct"), str(ri) if ri else None, rec.path):
+                    stats["dup"] += 1
+                    continue
+                items.append((ref, con, data_path, rec, triplet))
+        if items:
+            self.process_batch(items)
+        stats["processed"] = len(items)
+        if m:
+            m.catchup_cins.inc("processed", amount=stats["processed"])
+            m.catchup_cins.inc("dup", amount=stats["dup"])
+        return stats
+
+    def sensors_from_saved(self, key: int, path: Optional[str]) -> Optional[sensor_registry.SensorRecord]:
+        """저장된 key/경로(커서 파일 등)로 레코드 찾기. 경로의 SensorN 으로 번호를 복원해 등록."""
+        rec = self.sensors.by_key.get(key)
+        if rec is not None:
+            return rec
+        if path:
+            m = re.search(r"/Sensor(\d+)$", path)
+            if m:
+                return self.sensors.add(int(m.group(1)), path=path)
+            return None
+        return self.sensors.add(key)
+
+    def snapshot_sections(self) -> Dict[bytes, bytes]:
+        """
+        스냅샷 섹션: 학습/등록된 센서(SENS), 출동 로봇 위치/busy(ROBO),
+        LocalStore 이면 라벨 캐시(LBLS)와 쿨다운(COOL). file 백엔드는 그 파일 자체가 남아 있어 제외.
+        """
+        out: Dict[bytes, bytes] = {}
+        out[b"SENS"] = b"".join(_SNAP_NO.pack(r.no) + snapshot.pack_str(r.sid) + snapshot.pack_str(r.path)
+                                for r in list(self.sensors.records))
+        if self.dispatcher is not None:
+            out[b"ROBO"] = b"".join(snapshot.pack_str(r) + _SNAP_ROBOT.pack(x, y, left)
+                                    for r, x, y, left in self.dispatcher.export())
+        st = self.state
+        if isinstance(st, shared_state.LocalStore):
+            out[b"LBLS"] = b"".join(
+                _SNAP_LABEL.pack(no, ts, *(_NAN if pose.get(k) is None else float(pose[k]) for k in _POSE_KEYS))
+                + snapshot.pack_str(pose.get("sid"))
+                for no, (ts, pose) in dict(st.label_cache).items())
+            out[b"COOL"] = snapshot.pack_rows(_SNAP_COOLDOWN, dict(st.last_sent_at).items())
+        return out
+
+    def restore(self, snap: snapshot.Snapshot, *, now: Optional[float] = None) -> Dict[str, int]:
+        """snapshot_sections() 결과 반영. 이미 있는 센서/더 새 라벨은 그대로 두고, 끝난 쿨다운은 버린다."""
+        now = time.time() if now is None else now
+        sec = snap.sections
+        res = {"sensors": 0, "labels": 0, "cooldowns": 0, "robots": 0}
+        reg = self.sensors
+        r = snapshot.Reader(sec.get(b"SENS", b""))
+        while r.more():
+            (no,) = r.take(_SNAP_NO)
+            sid, path = r.text() or None, r.text() or None
+            if (path and path in reg.by_path) or (not path and no in reg.by_key):
+                continue
+            reg.add(no, sid=sid, path=path)
+            res["sensors"] += 1
+        if self.dispatcher is not None:
+            rows = []
+            r = snapshot.Reader(sec.get(b"ROBO", b""))
+            while r.more():
+                robot = r.text()
+                rows.append((robot,) + r.take(_SNAP_ROBOT))
+            res["robots"] = self.dispatcher.restore(rows, elapsed=max(0.0, snap.age(now)))
+        st = self.state
+        if isinstance(st, shared_state.LocalStore):
+            r = snapshot.Reader(sec.get(b"LBLS", b""))
+            while r.more():
+                no, ts, *vals = r.take(_SNAP_LABEL)
+                pose: Dict[str, Any] = {k: (None if v != v else v) for k, v in zip(_POSE_KEYS, vals)}
+                pose["sid"] = r.text() or None
+                cur = st.get_label(no)
+                if cur is not None and cur[0] >= ts:
+                    continue
+                st.put_label(no, ts, pose)
+                if self.dispatcher is not None:
+                    self.dispatcher.update_sensor(no, pose)
+                res["labels"] += 1
+            cooldown = self.args.cooldown_sec
+            for no, last in snapshot.unpack_rows(_SNAP_COOLDOWN, sec.get(b"COOL", b"")):
+                if now - last < cooldown and last > st.last_sent_at.get(no, 0.0):
+                    st.last_sent_at[no] = last
+                    res["cooldowns"] += 1
+        return res
+
+    def classify(self, item) -> str:
+        """화재 알람 또는 --anomaly-temp 이상이면 high, 나머지는 low"""
+        temp, fire_alarm, _ = item[4]
+        if fire_alarm == 1:
+            return lanes_mod.HIGH
+        hot = self.args.anomaly_temp
+        return lanes_mod.HIGH if (hot > 0 and temp >= hot) else lanes_mod.LOW
+
+    def process_batch(self, items) -> None:
+        """
+        low 레인 묶음 처리: 로그는 건별, CSV는 파일별로 한 번에 기록.
+        high 레인은 건별로 바로 쓰므로(process) 같은 센서 CSV/로그라도 알람 행이 앞서 받은 일반 행보다
+        먼저 기록될 수 있다. 행 순서는 시각순이 아니며 시각순이 필요하면 ts 열로 정렬해서 읽는다.
+        """
+        rows: Dict[str, List[List[Any]]] = {}
+        for item in items:
+            self.process(item, csv_rows=rows)
+        for path, batch in rows.items():
+            append_csv_rows(path, batch, ["ts", "temp", "fire_alarm"])
+
+    def process(self, item, *, csv_rows: Optional[Dict[str, List[List[Any]]]] = None):
+        args = self.args
+        trace = self.trace
+        m = self.metrics
+        msg, con, sur, rec, triplet = item
+        sensor_no = rec.no if rec is not None else None
+        # 쿨다운/라벨/출동 상태는 경로 기준 key (리전이 다른 같은 번호 센서를 구분)
+        skey = rec.key if rec is not None else sensor_no
+
+        temp, fire_alarm, ts = triplet
+        if sensor_no in (1, 2, 3):
+            event(log, logging.INFO, "[S%s] temp=%s fire_alarm=%s ts=%s topic=%s sur=%s",
+                  sensor_no, temp, fire_alarm, ts, msg.topic, sur,
+                  sensor=sensor_no, temp=temp, fire_alarm=fire_alarm, ts=ts, topic=msg.topic, sur=sur)
+            if args.csv_dir:
+                path = os.path.join(args.csv_dir, f"sensor{sensor_no}.csv")
+                if csv_rows is not None:
+                    csv_rows.setdefault(path, []).append([ts, temp, fire_alarm])
+                else:
+                    append_csv(path, [ts, temp, fire_alarm], ["ts", "temp", "fire_alarm"])
+        else:
+            event(log, logging.INFO, "[DATA] topic=%s temp=%s fire_alarm=%s ts=%s sensor=? sur=%s",
+                  msg.topic, temp, fire_alarm, ts, sur,
+                  temp=temp, fire_alarm=fire_alarm, ts=ts, topic=msg.topic, sur=sur)
+
+        # -------------------- 화재 감지 시: 라벨로 좌표 읽어와 CIN 전송 --------------------
+        if fire_alarm != 1 or sensor_no is None:
+            return
+        if m:
+            m.alarms.inc(sensor_no)
+
+        now = time.time()
+        # 여러 워커가 같은 저장소를 쓰면 쿨다운 창마다 한 곳만 통과
+        if not self.state.try_acquire(skey, now, args.cooldown_sec):
+            if m:
+                m.cooldown_skips.inc(sensor_no)
+            event(log, logging.INFO, "[SKIP] sensor %s: cooldown %ss", sensor_no, args.cooldown_sec,
+                  rl_key=f"skip:{skey}", sensor=sensor_no, path=rec.path)
+            return
+
+        # 1) 라벨 캐시 확인/갱신
+        pose_from_lbl = self.resolve_pose(sensor_no, sur, now, rec)
+        if pose_from_lbl is None:
+            self.state.release(skey, now)
+            event(log, logging.WARNING, "[WARN] labels not found for Sensor%s; skip.", sensor_no,
+                  rl_key=f"nolbl:{skey}", sensor=sensor_no, path=rec.path)
+            return
+        if trace:
+            trace("label", msg)
+
+        # 2) 좌표/자세 결정: x,y는 lbl에서 필수; oz,ow는 lbl 있으면 사용, 없으면 ori_map/default
+        x = pose_from_lbl.get("x")
+        y = pose_from_lbl.get("y")
+        if x is None or y is None:
+            self.state.release(skey, now)
+            event(log, logging.WARNING, "[WARN] Sensor%s lbl missing adjx/adjy; skip.", sensor_no,
+                  rl_key=f"noxy:{skey}", sensor=sensor_no, path=rec.path)
+            return
+
+        oz = pose_from_lbl.get("oz")
+        ow = pose_from_lbl.get("ow")
+        if oz is None or ow is None:
+            odef = self.ori_map.get(sensor_no, {"oz": OZ_DEFAULT, "ow": OW_DEFAULT})
+            oz = odef["oz"]; ow = odef["ow"]
+
+        sid_from_lbl = pose_from_lbl.get("sid")
+        sid_from_con = con.get("sid") if isinstance(con, dict) else None
+        sid_from_cmd = sid_from_lbl or sid_from_con or f"S{sensor_no}"
+
+        # 3) 출동 로봇: 다중 로봇이면 알람 위치에서 가장 가까운 가용 로봇
+        robot = args.robot
+        assigned = None
+        if self.dispatcher is not None:
+            ta = time.perf_counter()
+            assigned = self.dispatcher.assign(skey, (x, y))
+            if m:
+                m.assign_seconds.observe(time.perf_counter() - ta)
+            if assigned is not None:
+                robot = assigned[0]
+                if m:
+                    m.robot_assign.inc(robot, "1" if assigned[2] else "0")
+                if not assigned[2]:
+                    event(log, logging.WARNING, "[WARN] no free robot for Sensor%s; reassigning %s",
+                          sensor_no, robot, rl_key=f"busy:{robot}", sensor=sensor_no, robot=robot)
+
+        cmd = {"sensor": sensor_no, "key": skey, "sid": sid_from_cmd, "x": x, "y": y, "oz": oz, "ow": ow,
+               "robot": robot}
+        if self.on_decide:
+            self.on_decide(cmd, msg)
+        t0 = time.perf_counter()
+        if self.ctrl_transport is not None:
+            # 쿨다운은 위에서 잡혀 있어 응답 대기 중 같은 센서 알람은 중복 전송되지 않는다
+            fut = self.ctrl_transport.post_cin_async(f"/{args.ae}/{robot}/{args.ctrl}",
+                                                     ctrl_con(x, y, oz, ow, sid_from_cmd))
+            fut.add_done_callback(lambda f: self._ctrl_done(
+                *ctrl_result_msg(args.ae, robot, args.ctrl, f.result()),
+                cmd=cmd, now=now, t0=t0, op=self.ctrl_op, ref=msg, assigned=assigned))
+            return
+
+        ok, detail = post_cin_pose(
+            base=args.base_url.rstrip("/"),
+            origin=args.origin,
+            ae=args.ae,
+            robot_cnt=robot,
+            ctrl_cnt=args.ctrl,
+            x=x, y=y, oz=oz, ow=ow,
+            sid=sid_from_cmd,
+            timeout=args.timeout,
+            stringify_con=True
+        )
+        self._ctrl_done(ok, detail, cmd=cmd, now=now, t0=t0, op="ctrl_post", ref=msg, assigned=assigned)
+
+    def _ctrl_done(self, ok: bool, detail: str, *, cmd: Dict[str, Any], now: float,
+                   t0: float, op: str, ref: Any, assigned=None) -> None:
+        """Ctrl CIN 결과 처리 (동기 HTTP는 handle 안에서, 비동기는 완료 콜백에서 호출)"""
+        m = self.metrics
+        sensor_no = cmd["sensor"]
+        if m:
+            m.http_seconds.observe(time.perf_counter() - t0, op)
+            m.cin_posts.inc("ctrl", "ok" if ok else "err")
+        # 응답 본문은 DEBUG에서만
+        head, _, body = detail.partition("\n")
+        event(log, logging.INFO if ok else logging.ERROR, head, sensor=sensor_no, sid=cmd["sid"],
+              robot=cmd["robot"], ok=ok)
+        if body:
+            event(log, logging.DEBUG if ok else logging.ERROR, body, sensor=sensor_no)
+        if not ok:
+            self.state.release(cmd["key"], now)
+            if assigned is not None:
+                self.dispatcher.cancel(assigned[0], assigned[1])
+            return
+        if self.trace:
+            self.trace("ctrl_ack", ref)
+        if self.on_dispatch:
+            self.on_dispatch(cmd, ref)
+
+
+# -------------------- 메인 --------------------
+def run_workers(args: argparse.Namespace) -> int:
+    """--workers N: 같은 인자로 워커 N개를 띄우고 종료 시그널을 전달한다."""
+    if not args.share_group or args.state_backend == "local":
+        log.error("[ERR] --workers > 1 needs --share-group and a shared --state-backend (file).")
+        return 1
+    procs = []
+    started = time.time()
+    for i in range(args.workers):
+        argv = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + [
+            "--workers", "1", "--worker-index", str(i), "--cluster-start", repr(started)]
+        if args.metrics_port:
+            argv += ["--metrics-port", str(args.metrics_port + i)]
+        procs.append(subprocess.Popen(argv))
+    log.info("[CLUSTER] started %s workers group=%s state=%s", len(procs), args.share_group, args.state_file)
+
+    def _forward(signum, _frame):
+        for p in procs:
+            if p.poll() is None:
+                p.send_signal(signum)
+
+    signal.signal(signal.SIGINT, _forward)
+    signal.signal(signal.SIGTERM, _forward)
+    return max((p.wait() for p in procs), default=0)
+
+
+def main():
+    ap = build_arg_parser()
     args = ap.parse_args()
+    if args.robots and (args.workers > 1 or args.share_group):
+        # 로봇 busy/위치는 프로세스 안에만 있어 워커끼리 같은 로봇을 동시에 보낼 수 있다
+        ap.error("--robots cannot be combined with --workers > 1 or --share-group")
+    log_listener = logutil.setup_from_args("t2", args)
+    if args.workers > 1:
+        rc = run_workers(args)
+        logutil.shutdown(log_listener)
+        sys.exit(rc)
 
     # MQTT 토픽 설정
     if args.topics.strip():
@@ -379,136 +1142,138 @@ def main():
             f"/oneM2M/req/{args.origin_mqtt}/{args.cse_id}/json",
         ]
     else:
-        print("[ERR] Provide --topics or (--cse-id AND --origin-mqtt).", file=sys.stderr)
+        log.error("[ERR] Provide --topics or (--cse-id AND --origin-mqtt).")
+        logutil.shutdown(log_listener)
         sys.exit(1)
-
-    # orientation 기본값 로드 (x,y는 lbl에서 읽음)
-    ori_map: Dict[int, Dict[str, float]] = dict(SENSOR_MAP_DEFAULT)
-    if args.sensor_map:
+    if args.share_group:
+        topics = [f"$share/{args.share_group}/{t}" for t in topics]
+
+    profiler.install("t2", args,
+                     on_start=lambda sec: log.info("[PROFILE] sampling for %.0fs", sec),
+                     on_done=lambda stem: log.info("[PROFILE] wrote %s.*", stem))
+
+    metrics: Optional[DetectorMetrics] = None
+    if args.metrics_port:
+        from common import metrics as metrics_mod
+        registry = metrics_mod.Registry("t2")
+        metrics = DetectorMetrics(registry)
+        metrics_mod.serve(registry, args.metrics_port)
+        log.info("[METRICS] http://0.0.0.0:%s/metrics", args.metrics_port)
+
+    if args.share_group:
+        # 공유 구독은 MQTT v5. 노드가 여러 대일 수 있어 client_id 에 호스트명 포함
+        from paho.mqtt.enums import CallbackAPIVersion
+        cli = mqtt.Client(client_id=f"onem2m-subscriber-{socket.gethostname()}-{os.getpid()}",
+                          protocol=mqtt.MQTTv5, callback_api_version=CallbackAPIVersion.VERSION2)
+    else:
+        cli = mqtt.Client(client_id=f"onem2m-subscriber-{os.getpid()}")
+    state = shared_state.open_store(args)
+    ctrl_transport = onem2m_mqtt.from_args(cli, args) if args.transport_ctrl == "mqtt" else None
+    sensors = build_sensor_registry(args)
+    if sensors.records:
+        log.info("[SENSORS] %s registered", len(sensors.records))
+    dispatcher = build_dispatcher(args)
+    if dispatcher is not None:
+        log.info("[DISPATCH] %s robots", len(dispatcher.robots))
+    rollup_client = None
+    agg = None
+    if args.rollup_windows:
+        rollup_client = Onem2mClient(args.base_url, args.origin, timeout=args.timeout, rvi=DEFAULT_RVI)
+        agg = build_rollup(args, rollup_client, sensors=sensors, metrics=metrics)
+        if agg is not None:
+            log.info("[ROLLUP] windows=%s path=%s", ",".join(map(str, agg.windows)), args.rollup_path)
+    detector = AnomalyDetector(args, load_ori_map(args.sensor_map), metrics=metrics,
+                               ctrl_transport=ctrl_transport, sensors=sensors, state=state,
+                               dispatcher=dispatcher, rollup=agg)
+
+    # 스냅샷 복구는 catch-up 전에 (따라잡은 알람도 복구된 쿨다운/라벨을 쓰도록)
+    if args.snapshot_file:
+        t0 = time.perf_counter()
+        snap, why = snapshot.read(args.snapshot_file, b"T2", max_age=args.snapshot_max_age)
+        if snap is not None:
+            st = detector.restore(snap)
+            log.info("[SNAPSHOT] restored sensors=%s labels=%s cooldowns=%s robots=%s age=%.0fs size=%sB in %.1fms",
+                     st["sensors"], st["labels"], st["cooldowns"], st["robots"], snap.age(), snap.size,
+                     (time.perf_counter() - t0) * 1000)
+        elif why != "missing":
+            log.warning("[WARN] snapshot %s not restored: %s", args.snapshot_file, why)
+
+    def save_snapshot() -> None:
         try:
-            if args.sensor_map.lower().endswith(".json"):
-                with open(args.sensor_map, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, dict):
-                    for k, v in data.items():
-                        sid = int(k)
-                        oz = float(v.get("oz", ori_map.get(sid, {}).get("oz", OZ_DEFAULT)))
-                        ow = float(v.get("ow", ori_map.get(sid, {}).get("ow", OW_DEFAULT)))
-                        ori_map[sid] = {"oz": oz, "ow": ow}
-                elif isinstance(data, list):
-                    for row in data:
-                        sid = int(row["sensor"])
-                        oz = float(row.get("oz", ori_map.get(sid, {}).get("oz", OZ_DEFAULT)))
-                        ow = float(row.get("ow", ori_map.get(sid, {}).get("ow", OW_DEFAULT)))
-                        ori_map[sid] = {"oz": oz, "ow": ow}
-            else:
-                with open(args.sensor_map, "r", encoding="utf-8") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        sid = int(row["sensor"])
-                        oz = float(row.get("oz", ori_map.get(sid, {}).get("oz", OZ_DEFAULT)))
-                        ow = float(row.get("ow", ori_map.get(sid, {}).get("ow", OW_DEFAULT)))
-                        ori_map[sid] = {"oz": oz, "ow": ow}
+            snapshot.write(args.snapshot_file, b"T2", detector.snapshot_sections())
         except Exception as e:
-            print(f"[WARN] sensor_map load failed: {e}", file=sys.stderr)
+            log.warning("[WARN] snapshot write failed: %s", e)
 
-    # 캐시: 센서별 (last_fetch_ts, pose_from_lbl)
-    label_cache: Dict[int, Tuple[float, Dict[str, Optional[float]]]] = {}
-    # 전송 쿨다운
-    last_sent_at: Dict[int, float] = {}
+    catchup_client = None
+    catchup_busy = threading.Lock()
+    # 클러스터면 워커별 커서 파일 (같은 파일을 여러 프로세스가 덮어쓰지 않게)
+    cursor_file = catchup.worker_state_path(args.catchup_state, args.worker_index) if args.share_group \
+        else args.catchup_state
 
-    cli = mqtt.Client(client_id=f"onem2m-subscriber-{os.getpid()}")
+    def save_cursor() -> None:
+        try:
+            detector.cursor.save(cursor_file)
+        except Exception as e:
+            log.warning("[WARN] catch-up cursor save failed: %s", e)
+
+    def run_catchup(when: str) -> None:
+        """[CATCHUP] 놓친 CIN 처리 (재접속 때는 별도 스레드에서 호출, 이미 도는 중이면 건너뜀)"""
+        if not catchup_busy.acquire(blocking=False):
+            return
+        try:
+            t0 = time.perf_counter()
+            st = detector.catch_up(catchup_client, now=args.cluster_start or None)
+            log.info("[CATCHUP] %s sensors=%s fetched=%s processed=%s dup=%s errors=%s in %.2fs", when,
+                     st["sensors"], st["fetched"], st["processed"], st["dup"], st["errors"], time.perf_counter() - t0)
+            save_cursor()
+        except Exception as e:
+            log.error("[ERR] catch-up (%s): %s", when, e)
+        finally:
+            catchup_busy.release()
+
+    if detector.cursor is not None:
+        # 클러스터: 워커 0 만 (모든 워커 커서를 합쳐서) 시작 시 한 번 조회. 나머지 워커는 라이브만.
+        if not args.share_group or args.worker_index == 0:
+            catchup_client = Onem2mClient(args.base_url, args.origin, timeout=args.timeout, rvi=DEFAULT_RVI)
+            paths = catchup.worker_state_paths(args.catchup_state) if args.share_group else []
+            for path in paths or [args.catchup_state]:
+                try:
+                    n = detector.cursor.load(path)
+                    if n:
+                        log.info("[CATCHUP] cursor %s sensors from %s", n, path)
+                except Exception as e:
+                    log.warning("[WARN] catch-up cursor load failed (%s): %s", path, e)
+            # 라이브 구독 전에 한 번 (여기서 끝난 뒤에 접속)
+            run_catchup("startup")
+
+    ready: List[float] = []
 
     def on_connect(client, userdata, flags, rc):
         if rc == 0:
-            print(f"[MQTT] connected to {args.broker}:{args.port}")
+            log.info("[MQTT] connected to %s:%s", args.broker, args.port)
             for t in topics:
                 client.subscribe(t, qos=args.qos)
-                print(f"[SUB] {t}")
+                log.info("[SUB] %s", t)
+            if ctrl_transport is not None:
+                ctrl_transport.subscribe()
+                log.info("[SUB] %s (ctrl over mqtt)", ctrl_transport.resp_topic)
+            if not ready:
+                ready.append(time.perf_counter() - T_START)
+                log.info("[READY] t2 in %.3fs", ready[0])
+                if metrics:
+                    metrics.ready_seconds.set(ready[0])
+            if catchup_client is not None and not args.share_group:
+                # 시작 catch-up 이후~구독 사이, 또는 끊긴 동안의 CIN. paho 스레드를 막지 않게 별도 스레드로.
+                # (공유 구독이면 끊긴 동안 다른 워커가 받으므로 건너뜀)
+                threading.Thread(target=run_catchup, args=("connect",), name="catchup", daemon=True).start()
         else:
-            print(f"[ERR] connect rc={rc}", file=sys.stderr)
-
-    def on_message(client, userdata, msg):
-        payload = msg.payload.decode("utf-8", errors="replace")
-        cin, con, sur = parse_notification(payload)
-        triplet = extract_fields(con) if con is not None else None
-        sensor_no = guess_sensor_no(sur, con)
+            log.error("[ERR] connect rc=%s", rc)
 
-        if triplet:
-            temp, fire_alarm, ts = triplet
-            meta = {"topic": msg.topic, "sur": sur}
-
-            if sensor_no in (1, 2, 3):
-                print(f"[S{sensor_no}] temp={temp} fire_alarm={fire_alarm} ts={ts} meta={meta}")
-                if args.csv_dir:
-                    append_csv(os.path.join(args.csv_dir, f"sensor{sensor_no}.csv"),
-                               [ts, temp, fire_alarm], ["ts", "temp", "fire_alarm"])
-            else:
-                print(f"[DATA] topic={msg.topic} temp={temp} fire_alarm={fire_alarm} ts={ts} sensor=? sur={sur}")
-
-            # -------------------- 화재 감지 시: 라벨로 좌표 읽어와 CIN 전송 --------------------
-            if fire_alarm == 1 and sensor_no is not None:
-                now = time.time()
-                if now - last_sent_at.get(sensor_no, 0.0) < args.cooldown_sec:
-                    print(f"[SKIP] sensor {sensor_no}: cooldown {args.cooldown_sec}s")
-                    return
-
-                # 1) 라벨 캐시 확인/갱신
-                pose_from_lbl: Dict[str, Optional[float]]
-                cached = label_cache.get(sensor_no)
-                if (not cached) or (args.label_cache_sec <= 0) or (now - cached[0] >= args.label_cache_sec):
-                    # 센서 CNT 경로 후보
-                    paths = derive_sensor_cnt_paths(args.ae, sur, sensor_no)
-                    lbl_vals: Optional[List[str]] = None
-                    for p in paths:
-                        lbl_vals = get_cnt_labels(args.base_url, args.origin, p, timeout=args.timeout)
-                        if lbl_vals:
-                            break
-                    if not lbl_vals:
-                        print(f"[WARN] labels not found for Sensor{sensor_no}; skip.", file=sys.stderr)
-                        return
-                    pose_from_lbl = parse_pose_from_labels(lbl_vals)
-                    label_cache[sensor_no] = (now, pose_from_lbl)
-                else:
-                    pose_from_lbl = cached[1]
-
-                # 2) 좌표/자세 결정: x,y는 lbl에서 필수; oz,ow는 lbl 있으면 사용, 없으면 ori_map/default
-                x = pose_from_lbl.get("x")
-                y = pose_from_lbl.get("y")
-                if x is None or y is None:
-                    print(f"[WARN] Sensor{sensor_no} lbl missing adjx/adjy; skip.", file=sys.stderr)
-                    return
-
-                oz = pose_from_lbl.get("oz")
-                ow = pose_from_lbl.get("ow")
-                if oz is None or ow is None:
-                    odef = ori_map.get(sensor_no, {"oz": OZ_DEFAULT, "ow": OW_DEFAULT})
-                    oz = odef["oz"]; ow = odef["ow"]
-
-                sid_from_lbl = pose_from_lbl.get("sid")
-                sid_from_con = con.get("sid") if isinstance(con, dict) else None
-                sid_from_cmd = sid_from_lbl or sid_from_con or (f"S{sensor_no}" if sensor_no is not None else None)
-
-                ok, detail = post_cin_pose(
-                    base=args.base_url.rstrip("/"),
-                    origin=args.origin,
-                    ae=args.ae,
-                    robot_cnt=args.robot,
-                    ctrl_cnt=args.ctrl,
-                    x=x, y=y, oz=oz, ow=ow,
-                    sid=sid_from_cmd,
-                    timeout=args.timeout,
-                    stringify_con=True
-                )
-                print(detail)
-                if ok:
-                    last_sent_at[sensor_no] = now
-
-        else:
-            print(f"[RAW] topic={msg.topic} payload={payload}")
+    def on_connect_v5(client, userdata, flags, reason_code, properties):
+        on_connect(client, userdata, flags, reason_code.value if reason_code.is_failure else 0)
 
-    cli.on_connect = on_connect
-    cli.on_message = on_message
+    cli.on_connect = on_connect_v5 if args.share_group else on_connect
+    cli.on_message = detector.on_message
 
     cli.connect(args.broker, args.port, keepalive=30)
     cli.loop_start()
@@ -517,15 +1282,39 @@ def main():
         try:
             cli.loop_stop()
             cli.disconnect()
+            detector.close()
+            detector.dedup_report()
+            state.close()
+            if rollup_client is not None:
+                rollup_client.close()
+            if detector.cursor is not None:
+                save_cursor()
+            if catchup_client is not None:
+                catchup_client.close()
+            if args.snapshot_file:
+                save_snapshot()
         finally:
+            logutil.shutdown(log_listener)
             sys.exit(0)
 
     signal.signal(signal.SIGINT, _stop)
     signal.signal(signal.SIGTERM, _stop)
 
     try:
+        next_report = time.monotonic() + args.lane_report_sec
+        next_save = time.monotonic() + 10.0
+        next_snapshot = time.monotonic() + args.snapshot_sec
         while True:
             time.sleep(1.0)
+            if detector.lanes is not None and args.lane_report_sec > 0 and time.monotonic() >= next_report:
+                detector.lane_report()
+                next_report += args.lane_report_sec
+            if detector.cursor is not None and detector.cursor.dirty and time.monotonic() >= next_save:
+                save_cursor()
+                next_save = time.monotonic() + 10.0
+            if args.snapshot_file and time.monotonic() >= next_snapshot:
+                save_snapshot()
+                next_snapshot = time.monotonic() + args.snapshot_sec
     except KeyboardInterrupt:
         _stop()
 
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
-import argparse, json, os, re, signal, sys, time, uuid, threading, glob
+import argparse, bisect, json, logging, os, re, signal, struct, sys, time, uuid, threading, glob
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Callable, Dict, Optional, List, Tuple
 from urllib.parse import quote as urlquote
 
 import requests
 from paho.mqtt import client as mqtt
 
+from common import dedup, logutil, onem2m_mqtt, profiler, sensor_registry, snapshot
+from common.onem2m_client import CinResult, Onem2mClient
+from common.logutil import event
+
+T_START = time.perf_counter()  # [READY] 기준 시각. import(paho/requests 등) 비용은 제외 — 인터프리터 기동 포함 시간은 외부에서 측정
+log = logging.getLogger("t3")
+
 # -------------------- 환경 기본값 --------------------
 DEFAULT_BASE = os.getenv("MOBIUS_BASE_URL", "http://192.168.0.58:7579/Mobius").rstrip("/")
 DEFAULT_ORIGIN = os.getenv("MOBIUS_ORIGIN", "CAdmin")
@@ -41,15 +48,16 @@ def content_headers(ty: Optional[int] = None) -> Dict[str, str]:
     return {"Content-Type": f"application/json;ty={ty}" if ty is not None else "application/json"}
 
 # -------------------- m2m:sgn 파서 --------------------
-def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]:
+def parse_notification_shaped(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str], str]:
     """
-    MQTT NOTIFY(op:5) -> (cin, con, sur)
+    MQTT NOTIFY(op:5) -> (cin, con, sur, shape)
     - con 이 문자열 JSON이면 디코딩
+    - shape: notify/sgn/cin/unknown/invalid
     """
     try:
         obj = json.loads(payload)
     except Exception:
-        return None, None, None
+        return None, None, None, "invalid"
 
     # op:5 래핑 (pc.m2m:sgn.*)
     if isinstance(obj, dict) and isinstance(obj.get("pc"), dict) and "m2m:sgn" in obj["pc"]:
@@ -64,7 +72,7 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
                     con = json.loads(con)
                 except Exception:
                     con = {"_raw": con}
-            return cin, con, sur
+            return cin, con, sur, "notify"
 
     # sgn 직접
     if isinstance(obj, dict) and "m2m:sgn" in obj:
@@ -79,7 +87,7 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
                     con = json.loads(con)
                 except Exception:
                     con = {"_raw": con}
-            return cin, con, sur
+            return cin, con, sur, "sgn"
 
     # direct CIN
     if isinstance(obj, dict) and "m2m:cin" in obj:
@@ -90,9 +98,13 @@ def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional
                 con = json.loads(con)
             except Exception:
                 con = {"_raw": con}
-        return cin, con, None
+        return cin, con, None, "cin"
 
-    return None, None, None
+    return None, None, None, "unknown"
+
+def parse_notification(payload: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]:
+    cin, con, sur, _ = parse_notification_shaped(payload)
+    return cin, con, sur
 
 # -------------------- 파일 정렬 & URL 매핑 --------------------
 TS_PATTERNS = [
@@ -129,18 +141,50 @@ def file_iso_ts(path: str) -> str:
         dt = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
     return dt.replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
-def list_sorted_images(dirpath: str) -> List[str]:
+def list_images_with_ts(dirpath: str) -> List[Tuple[float, str]]:
+    """(시각 epoch, 경로) 시각순. 시각은 파일명, 없으면 mtime."""
     files: List[str] = []
     for ext in IMG_EXTS:
         files.extend(glob.glob(os.path.join(dirpath, f"*{ext}")))
-    if not files: return []
-    def key(p):
+    out = []
+    for p in files:
         dt = parse_ts_from_name(p)
         if dt is None:
             dt = datetime.fromtimestamp(os.path.getmtime(p), tz=timezone.utc)
-        return dt.timestamp()
-    files.sort(key=key)
-    return files
+        out.append((dt.timestamp(), p))
+    out.sort(key=lambda t: t[0])
+    return out
+
+def list_sorted_images(dirpath: str) -> List[str]:
+    return [p for _, p in list_images_with_ts(dirpath)]
+
+
+_SNAP_DIR = struct.Struct("<qI")          # 디렉터리 경로 문자열 + mtime_ns, 파일 수 (이어서 파일명 문자열 + 시각)
+_SNAP_TS = struct.Struct("<d")
+_SNAP_CURSOR = struct.Struct("<iddid")    # sensor, be 시각, ego 시각, 보낸 프레임 수, 갱신 시각 + sid 문자열
+
+
+class FrameIndex:
+    """
+    프레임 디렉터리 하나의 정렬된 파일 목록 + 시각(epoch). 시작 프레임은 bisect 로 찾는다.
+    디렉터리 mtime(파일 추가/삭제 시 바뀜)이 같으면 재사용하고, 스냅샷에서 복구할 때도 mtime 으로 검증.
+    """
+    __slots__ = ("mtime_ns", "files", "ts", "packed")
+
+    def __init__(self, mtime_ns: int, files: List[str], ts: List[float]):
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.ts = ts
+        self.packed: Optional[bytes] = None  # 스냅샷 본문 (인덱스는 바뀌지 않고 새로 만들어지므로 한 번만)
+
+    @classmethod
+    def build(cls, dirpath: str, mtime_ns: int) -> "FrameIndex":
+        pairs = list_images_with_ts(dirpath)
+        return cls(mtime_ns, [p for _, p in pairs], [t for t, _ in pairs])
+
+    def find(self, ts: float) -> int:
+        """ts 이상인 첫 프레임. 모든 프레임이 ts 보다 앞이면 len (보낼 프레임 없음)"""
+        return bisect.bisect_left(self.ts, ts)
 
 def path_to_url(path: str, media_root: str, media_base_url: str) -> str:
     rel = os.path.relpath(path, media_root).replace(os.sep, "/")
@@ -148,11 +192,31 @@ def path_to_url(path: str, media_root: str, media_base_url: str) -> str:
     return media_base_url.rstrip("/") + "/" + "/".join(parts)
 
 # -------------------- Mobius: Cam에 URL CIN 올리기 --------------------
+def cam_cin_con(url: str, ts_iso: str, sid: str, sensor_no: int, view: str) -> Dict[str, Any]:
+    return {"url": url, "ts": ts_iso, "sid": sid, "sensor": sensor_no, "view": view}
+
+
+def cam_result_msg(cam: str, url: str, res: CinResult) -> Tuple[bool, str]:
+    ok, status, text = res
+    if ok:
+        return True, f"[OK] {cam} <- {os.path.basename(url)}"
+    if status == 0:
+        return False, f"[ERR] HTTP failed: {text}"
+    try:
+        return False, f"[ERR] {cam} status={status} {pretty(json.loads(text))}"
+    except Exception:
+        return False, f"[ERR] {cam} status={status} {text}"
+
+
 def post_cin_url(base: str, origin: str, ae: str, robot: str, cam: str,
                  url: str, ts_iso: str, sid: str, sensor_no: int, view: str,
-                 *, timeout: float = DEFAULT_TIMEOUT, stringify_con: bool = True) -> Tuple[bool, str]:
+                 *, timeout: float = DEFAULT_TIMEOUT, stringify_con: bool = True,
+                 client: Optional[Onem2mClient] = None) -> Tuple[bool, str]:
+    con_obj = cam_cin_con(url, ts_iso, sid, sensor_no, view)
+    if client is not None:
+        return cam_result_msg(cam, url, client.post_cin(f"/{ae}/{robot}/{cam}", con_obj,
+                                                        stringify=stringify_con))
     endpoint = f"{base}/{ae}/{robot}/{cam}?ty=4"
-    con_obj = {"url": url, "ts": ts_iso, "sid": sid, "sensor": sensor_no, "view": view}
     body = {"m2m:cin": {"cnf": "application/json",
                         "con": json.dumps(con_obj, ensure_ascii=False) if stringify_con else con_obj}}
     hdrs = {**base_headers(origin, include_accept=True, include_rvi=True), **content_headers(ty=4)}
@@ -160,24 +224,73 @@ def post_cin_url(base: str, origin: str, ae: str, robot: str, cam: str,
         resp = requests.post(endpoint, headers=hdrs, json=body, timeout=timeout)
     except Exception as e:
         return False, f"[ERR] HTTP failed: {e}"
-    if resp.status_code in (200, 201):
-        return True, f"[OK] {cam} <- {os.path.basename(url)}"
-    try:
-        return False, f"[ERR] {cam} status={resp.status_code} {pretty(resp.json())}"
-    except Exception:
-        return False, f"[ERR] {cam} status={resp.status_code} {resp.text}"
+    return cam_result_msg(cam, url, (resp.status_code in (200, 201), resp.status_code, resp.text))
+
+# -------------------- 메트릭 --------------------
+class ListenerMetrics:
+    """T3 메트릭 묶음 (--metrics-port 지정 시에만 생성)"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.messages = registry.counter("messages_total", "Messages received", ("topic", "shape"))
+        self.parse_failures = registry.counter("parse_failures_total", "Messages that are not NOTIFY/CIN", ("topic",))
+        self.triggers = registry.counter("triggers_total", "Ctrl CIN triggers", ("sensor",))
+        self.cin_posts = registry.counter("cin_posts_total", "CIN POST results", ("op", "result"))
+        self.frames = registry.counter("frames_streamed_total", "Frames streamed (both cams posted)")
+        self.on_message_seconds = registry.histogram("on_message_seconds", "on_message duration")
+        self.duplicates = registry.counter("duplicates_total", "Duplicate notifications dropped", ("topic",))
+        self.prefiltered = registry.counter("prefiltered_total", "Messages skipped by the byte prefilter", ("topic",))
+        self.ready_seconds = registry.gauge("ready_seconds", "Seconds from end of module imports to first subscription")
+        self.http_seconds = registry.histogram("http_seconds", "Mobius HTTP latency", ("op",))
+        self.queue_wait_seconds = registry.histogram("queue_wait_seconds", "Wait before work starts", ("queue",))
+        self.frame_lateness_seconds = registry.histogram("stream_frame_lateness_seconds",
+                                                         "Frame post time minus its 1s schedule slot")
+        self.stream_fps = registry.gauge("stream_effective_fps", "Effective frames/sec of the last stream")
+
 
 # -------------------- 스트리머 --------------------
 class Streamer:
+    """
+    Ctrl 트리거 시 Cam1/Cam2 컨테이너에 프레임 URL CIN을 1초 간격으로 업로드.
+    - 한 프레임의 Cam1/Cam2 CIN은 client.post_cin_batch로 함께 전송 (컨테이너별 순서는 유지)
+      (client는 Onem2mClient(HTTP) 또는 Onem2mMqttTransport. 전송은 이 스레드에서 블로킹)
+    - catchup_batch > 1 이고 Ctrl ct가 현재보다 N초 뒤처져 있으면, 밀린 N프레임은
+      대기 없이 catchup_batch 프레임씩 묶어 전송한 뒤 1초 간격으로 복귀
+    trace(stage, ref): 첫 프레임의 cam1_ack/cam2_ack 시점 훅 (ref는 start()에 넘긴 값)
+    metrics: ListenerMetrics. None이면 계측하지 않음.
+    index: 디렉터리별 FrameIndex 캐시. cursor: 진행 중 스트림 위치
+    (sensor, sid, 다음 be/ego 프레임 시각, 보낸 프레임 수, 갱신 시각). 끝까지 보내면 None.
+    둘 다 snapshot_sections()/restore() 로 재시작 후 이어받는다.
+    """
     def __init__(self, *, base, origin, ae, robot, cam1, cam2,
-                 media_root, media_base_url, frames, timeout):
+                 media_root, media_base_url, frames, timeout, trace=None, metrics=None,
+                 client=None, catchup_batch: int = 0):
         self.base = base; self.origin = origin; self.ae = ae; self.robot = robot
         self.cam1 = cam1; self.cam2 = cam2
         self.media_root = media_root; self.media_base_url = media_base_url
         self.frames = frames; self.timeout = timeout
+        self.trace = trace
+        self.metrics = metrics
+        self.client = client or Onem2mClient(base, origin, timeout=timeout, rvi=DEFAULT_RVI, max_inflight=2)
+        self.catchup_batch = catchup_batch
+        # http_seconds op 라벨. HTTP는 기존 이름 유지, MQTT는 접미사로 구분해 비교
+        transport = getattr(self.client, "transport", "http")
+        self.post_op = "cam_post" if transport == "http" else f"cam_post_{transport}"
         self._thread: Optional[threading.Thread] = None
         self._stop_evt = threading.Event()
         self._lock = threading.Lock()
+        self.index: Dict[str, FrameIndex] = {}
+        self.cursor: Optional[Tuple[int, str, float, float, int, float]] = None
+
+    def frame_index(self, dirpath: str) -> FrameIndex:
+        try:
+            mtime_ns = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            return FrameIndex(0, [], [])
+        idx = self.index.get(dirpath)
+        if idx is None or idx.mtime_ns != mtime_ns:
+            idx = self.index[dirpath] = FrameIndex.build(dirpath, mtime_ns)
+        return idx
 
     def stop(self):
         with self._lock:
@@ -187,61 +300,374 @@ class Streamer:
             self._thread = None
             self._stop_evt = threading.Event()
 
-    def start(self, sensor_no: int, sid: str, start_ct_iso: Optional[str]):
+    def warm(self) -> int:
+        """media_root 아래 센서별 프레임 디렉터리 인덱스를 미리 만든다 (스냅샷에서 복구된 것은 stat 만)"""
+        dirs = sorted(glob.glob(os.path.join(self.media_root, "sensor*", "birdeye_view")) +
+                      glob.glob(os.path.join(self.media_root, "sensor*", "egocentric_view")))
+        return sum(len(self.frame_index(d).files) for d in dirs)
+
+    def snapshot_sections(self) -> Dict[bytes, bytes]:
+        """스냅샷 섹션: 프레임 인덱스(FIDX), 진행 중 스트림 위치(STRM)"""
+        parts: List[bytes] = []
+        for d, ix in list(self.index.items()):
+            if ix.packed is None:
+                ix.packed = snapshot.pack_str(d) + _SNAP_DIR.pack(ix.mtime_ns, len(ix.files)) + b"".join(
+                    snapshot.pack_str(os.path.basename(f)) + _SNAP_TS.pack(t) for f, t in zip(ix.files, ix.ts))
+            parts.append(ix.packed)
+        out = {b"FIDX": b"".join(parts)}
+        cur = self.cursor
+        if cur is not None:
+            sensor_no, sid, be_ts, ego_ts, k, t = cur
+            out[b"STRM"] = _SNAP_CURSOR.pack(sensor_no, be_ts, ego_ts, k, t) + snapshot.pack_str(sid)
+        return out
+
+    def restore(self, snap: snapshot.Snapshot) -> Dict[str, int]:
+        """snapshot_sections() 결과 반영. mtime 이 바뀐 디렉터리 인덱스는 버린다(다음 사용 시 재구성)."""
+        res = {"indexes": 0, "frames": 0, "stale": 0, "cursor": 0}
+        r = snapshot.Reader(snap.sections.get(b"FIDX", b""))
+        while r.more():
+            d = r.text()
+            mtime_ns, n = r.take(_SNAP_DIR)
+            files: List[str] = []
+            ts: List[float] = []
+            for _ in range(n):
+                files.append(os.path.join(d, r.text()))
+                ts.append(r.take(_SNAP_TS)[0])
+            try:
+                fresh = os.stat(d).st_mtime_ns == mtime_ns
+            except OSError:
+                fresh = False
+            if not fresh:
+                res["stale"] += 1
+                continue
+            self.index[d] = FrameIndex(mtime_ns, files, ts)
+            res["indexes"] += 1
+            res["frames"] += n
+        body = snap.sections.get(b"STRM")
+        if body:
+            r = snapshot.Reader(body)
+            sensor_no, be_ts, ego_ts, k, t = r.take(_SNAP_CURSOR)
+            self.cursor = (sensor_no, r.text(), be_ts, ego_ts, k, t)
+            res["cursor"] = 1
+        return res
+
+    def resume(self, now: Optional[float] = None) -> bool:
+        """복구한 cursor 의 스트림이 재시작이 없었다면 아직 진행 중이었을 경우(남은 프레임 수 초 이내)만 이어서 전송"""
+        cur = self.cursor
+        if cur is None:
+            return False
+        sensor_no, sid, be_ts, ego_ts, k, t = cur
+        now = time.time() if now is None else now
+        if k >= self.frames or now - t > self.frames - k:
+            self.cursor = None
+            return False
+        self.start(sensor_no=sensor_no, sid=sid, start_ct_iso=None, resume=(be_ts, ego_ts, k))
+        return True
+
+    def start(self, sensor_no: int, sid: str, start_ct_iso: Optional[str], ref: Any = None,
+              resume: Optional[Tuple[float, float, int]] = None):
+        """resume=(be 시각, ego 시각, 보낸 프레임 수): 스냅샷의 cursor 위치부터 남은 프레임만 전송"""
         self.stop()
-        self._thread = threading.Thread(target=self._run, args=(sensor_no, sid, start_ct_iso), daemon=True)
+        self.cursor = None
+        self._thread = threading.Thread(target=self._run,
+                                        args=(sensor_no, sid, start_ct_iso, self._stop_evt, ref,
+                                              time.perf_counter(), resume),
+                                        daemon=True)
         self._thread.start()
 
-    def _run(self, sensor_no: int, sid: str, start_ct_iso: Optional[str]):
-        be_dir = os.path.join(self.media_root, f"sensor{sensor_no}", "birdeye_view")
-        ego_dir = os.path.join(self.media_root, f"sensor{sensor_no}", "egocentric_view")
-
-        be_files = list_sorted_images(be_dir)
-        ego_files = list_sorted_images(ego_dir)
+    def _run(self, sensor_no: int, sid: str, start_ct_iso: Optional[str],
+             stop_evt: threading.Event, ref: Any = None, queued_at: float = 0.0,
+             resume: Optional[Tuple[float, float, int]] = None):
+        m = self.metrics
+        if m:
+            m.queue_wait_seconds.observe(time.perf_counter() - queued_at, "stream_start")
+        be_ix = self.frame_index(os.path.join(self.media_root, f"sensor{sensor_no}", "birdeye_view"))
+        ego_ix = self.frame_index(os.path.join(self.media_root, f"sensor{sensor_no}", "egocentric_view"))
+
+        be_files = be_ix.files
+        ego_files = ego_ix.files
         if not be_files or not ego_files:
-            print(f"[WARN] images missing for sensor{sensor_no}: be={len(be_files)} ego={len(ego_files)}")
+            log.warning("[WARN] images missing for sensor%s: be=%s ego=%s", sensor_no, len(be_files), len(ego_files))
             return
 
         be_idx = 0; ego_idx = 0
-        if start_ct_iso:
+        behind = 0
+        k0 = 0
+        if resume is not None:
+            be_idx, ego_idx, k0 = be_ix.find(resume[0]), ego_ix.find(resume[1]), resume[2]
+        elif start_ct_iso:
             try:
                 ct = datetime.strptime(start_ct_iso, "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
             except Exception:
                 ct = datetime.now(timezone.utc)
-            def find_start(files):
-                for i, p in enumerate(files):
-                    dt = parse_ts_from_name(p)
-                    if dt and dt >= ct:
-                        return i
-                return 0
-            be_idx = find_start(be_files); ego_idx = find_start(ego_files)
-
-        print(f"[STREAM] sensor{sensor_no} sid={sid} start be={be_idx}/{len(be_files)} "
-              f"ego={ego_idx}/{len(ego_files)} frames={self.frames}")
-
-        for k in range(self.frames):
-            if self._stop_evt.is_set():
-                print("[STREAM] stopped"); return
-            if be_idx >= len(be_files) or ego_idx >= len(ego_files):
-                print("[STREAM] reached end of files"); return
-
-            be_path = be_files[be_idx]; ego_path = ego_files[ego_idx]
-            be_ts = file_iso_ts(be_path); ego_ts = file_iso_ts(ego_path)
-            be_url = path_to_url(be_path, self.media_root, self.media_base_url)
-            ego_url = path_to_url(ego_path, self.media_root, self.media_base_url)
-
-            ok1, m1 = post_cin_url(self.base, self.origin, self.ae, self.robot, self.cam1,
-                                   be_url, be_ts, sid, sensor_no, "birdeye",
-                                   timeout=self.timeout, stringify_con=True)
-            ok2, m2 = post_cin_url(self.base, self.origin, self.ae, self.robot, self.cam2,
-                                   ego_url, ego_ts, sid, sensor_no, "egocentric",
-                                   timeout=self.timeout, stringify_con=True)
-            print(m1); print(m2)
-            be_idx += 1; ego_idx += 1
-            time.sleep(1.0)
+            be_idx = be_ix.find(ct.timestamp()); ego_idx = ego_ix.find(ct.timestamp())
+            # 새 트리거는 ct 이후 프레임이 없으면 처음부터 (이어받기는 끝난 스트림이라 그대로 종료)
+            if be_idx >= len(be_files): be_idx = 0
+            if ego_idx >= len(ego_files): ego_idx = 0
+            if self.catchup_batch > 1:
+                # 1초에 1프레임 기준으로 밀린 프레임 수
+                lag = (datetime.now(timezone.utc) - ct).total_seconds()
+                behind = min(self.frames, int(lag)) if lag >= 1 else 0
+
+        event(log, logging.INFO, "[STREAM] sensor%s sid=%s %s be=%s/%s ego=%s/%s frames=%s catchup=%s",
+              sensor_no, sid, "resume" if resume else "start", be_idx, len(be_files), ego_idx, len(ego_files),
+              self.frames - k0, behind, sensor=sensor_no, sid=sid)
+
+        trace = self.trace
+        cam1_path = f"/{self.ae}/{self.robot}/{self.cam1}"
+        cam2_path = f"/{self.ae}/{self.robot}/{self.cam2}"
+        t_first = time.perf_counter()
+        k = k0
+        try:
+            while k < self.frames:
+                if stop_evt.is_set():
+                    log.info("[STREAM] stopped"); return
+                if be_idx >= len(be_files) or ego_idx >= len(ego_files):
+                    self.cursor = None
+                    log.info("[STREAM] reached end of files"); return
+
+                catching_up = k < behind
+                n = min(self.catchup_batch, behind - k) if catching_up else 1
+                n = max(1, min(n, self.frames - k, len(be_files) - be_idx, len(ego_files) - ego_idx))
+
+                items: List[Tuple[str, Dict[str, Any]]] = []
+                urls: List[str] = []
+                for j in range(n):
+                    be_path = be_files[be_idx + j]; ego_path = ego_files[ego_idx + j]
+                    be_url = path_to_url(be_path, self.media_root, self.media_base_url)
+                    ego_url = path_to_url(ego_path, self.media_root, self.media_base_url)
+                    items.append((cam1_path, cam_cin_con(be_url, file_iso_ts(be_path), sid, sensor_no, "birdeye")))
+                    items.append((cam2_path, cam_cin_con(ego_url, file_iso_ts(ego_path), sid, sensor_no, "egocentric")))
+                    urls += [be_url, ego_url]
+
+                t0 = time.perf_counter()
+                if m:
+                    for j in range(n):
+                        m.frame_lateness_seconds.observe(max(0.0, t0 - (t_first + k + j)))
+                results = self.client.post_cin_batch(items)
+                t1 = time.perf_counter()
+                if m:
+                    # 한 번의 일괄 전송(Cam1/Cam2 × n프레임) 지연
+                    m.http_seconds.observe(t1 - t0, self.post_op)
+
+                for j in range(n):
+                    ok1, m1 = cam_result_msg(self.cam1, urls[2 * j], results[2 * j])
+                    ok2, m2 = cam_result_msg(self.cam2, urls[2 * j + 1], results[2 * j + 1])
+                    if m:
+                        for op, ok in (("cam1", ok1), ("cam2", ok2)):
+                            m.cin_posts.inc(op, "ok" if ok else "err")
+                        if ok1 and ok2:
+                            m.frames.inc()
+                    if trace and k + j == 0:
+                        if ok1:
+                            trace("cam1_ack", ref)
+                        if ok2:
+                            trace("cam2_ack", ref)
+                    event(log, logging.INFO if ok1 else logging.ERROR, m1, cam=self.cam1, frame=k + j, ok=ok1)
+                    event(log, logging.INFO if ok2 else logging.ERROR, m2, cam=self.cam2, frame=k + j, ok=ok2)
+
+                be_idx += n; ego_idx += n; k += n
+                if k >= self.frames or be_idx >= len(be_files) or ego_idx >= len(ego_files):
+                    self.cursor = None
+                else:
+                    self.cursor = (sensor_no, sid, be_ix.ts[be_idx], ego_ix.ts[ego_idx], k, time.time())
+                if catching_up or k >= self.frames:
+                    continue
+                # stop() 요청 시 바로 깨어나도록 sleep 대신 이벤트 대기
+                if stop_evt.wait(1.0):
+                    log.info("[STREAM] stopped"); return
+        finally:
+            elapsed = time.perf_counter() - t_first
+            fps = (k - k0) / elapsed if elapsed > 0 else 0.0
+            event(log, logging.INFO, "[STREAM] sensor%s frames=%s elapsed=%.2fs fps=%.2f",
+                  sensor_no, k, elapsed, fps, sensor=sensor_no, frames=k, fps=round(fps, 3))
+            if m:
+                m.stream_fps.set(fps)
+
+
+# -------------------- Ctrl NOTIFY 처리기 --------------------
+def extract_sensor_no_from_sid(sid: str) -> Optional[int]:
+    if not isinstance(sid, str):
+        return None
+    m = re.search(r'(\d+)', sid)  # C-S3 / S3 / S-3
+    return int(m.group(1)) if m else None
+
+
+def build_sensor_registry(args: argparse.Namespace) -> sensor_registry.SensorRegistry:
+    """--sensor-spec 로 sid → 센서 테이블 구성 (없는 sid는 정규식 폴백 후 학습)"""
+    reg = sensor_registry.SensorRegistry(sid_fallback=extract_sensor_no_from_sid)
+    if args.sensor_spec:
+        try:
+            sensor_registry.load_spec(reg, args.sensor_spec)
+        except Exception as e:
+            log.warning("[WARN] sensor spec load failed: %s", e)
+    return reg
 
-# -------------------- 메인 --------------------
-def main():
+
+class CtrlListener:
+    """
+    Ctrl 컨테이너 NOTIFY → Streamer.start.
+    trace(stage, ref): recv/t3_trigger 시점 훅 (ref는 msg, Streamer에도 그대로 전달)
+    metrics: ListenerMetrics. None이면 계측하지 않음.
+    trigger_local(cmd, ref): 같은 프로세스의 T2가 직접 호출하는 경로. 이때 쓴 Ctrl CIN이
+    echo_ttl 초 안에 NOTIFY로 되돌아오면 sid 기준으로 1건씩 무시한다.
+    cmd["robot"] 이 이 프로세스의 --robot 과 다르면(다중 로봇 출동) 스트리밍도 echo 기록도 하지 않는다.
+    sensors: sid → 센서 조회용 SensorRegistry. None이면 빈 레지스트리(정규식 폴백 + 학습).
+    중복 NOTIFY(--dedup-ttl-sec)는 파싱 전에 버린다.
+    prefilter: 원본 바이트에 Ctrl 경로(또는 JSON 이스케이프된 '\/' 형태)가 없으면 디코딩 없이 버린다.
+    filtered/parsed 는 버린 수/파싱한 수 (--no-prefilter 면 filtered 는 0).
+    """
+    def __init__(self, args: argparse.Namespace, streamer: Streamer, *,
+                 trace: Optional[Callable[[str, Any], None]] = None,
+                 metrics: Optional[ListenerMetrics] = None,
+                 echo_ttl: float = 30.0,
+                 sensors: Optional[sensor_registry.SensorRegistry] = None):
+        self.args = args
+        self.streamer = streamer
+        self.trace = trace
+        self.metrics = metrics
+        self.need = f"/{args.ae}/{args.robot}/{args.ctrl}"
+        self.echo_ttl = echo_ttl
+        self.sensors = sensors or sensor_registry.SensorRegistry(sid_fallback=extract_sensor_no_from_sid)
+        # sid -> 아직 돌아오지 않은 로컬 트리거 시각들
+        self._echo: Dict[str, List[float]] = {}
+        self._echo_lock = threading.Lock()
+        self.echo_skipped = 0
+        self.dedup = dedup.from_args(args)
+        # sur(NOTIFY) 또는 to(op:1)에 들어 있는 Ctrl 경로 바이트. sur가 AE부터 시작할 수도 있어 앞 '/'는 뺀다
+        self.prefilter = not getattr(args, "no_prefilter", False)
+        need = self.need.lstrip("/")
+        self._need_b = need.encode("utf-8")
+        self._need_esc = need.replace("/", "\\/").encode("utf-8")
+        self.filtered = 0
+        self.parsed = 0
+
+    def mentions_ctrl(self, raw: bytes) -> bool:
+        """원본 바이트에 Ctrl 경로(그대로 또는 '\\/' 이스케이프)가 있는지"""
+        return self._need_b in raw or self._need_esc in raw
+
+    def trigger_local(self, cmd: Dict[str, Any], ref: Any = None):
+        robot = cmd.get("robot")
+        if robot and robot != self.args.robot:
+            event(log, logging.DEBUG, "[SKIP] local trigger for robot=%s (this is %s)", robot, self.args.robot,
+                  rl_key=f"robot:{robot}", robot=robot)
+            return
+        sid = str(cmd["sid"])
+        sensor_no = cmd.get("sensor")
+        if sensor_no is None:
+            rec = self.sensors.from_sid(sid)
+            sensor_no = rec.no if rec is not None else None
+        if sensor_no is None:
+            return
+        now = time.monotonic()
+        with self._echo_lock:
+            pend = [t for t in self._echo.get(sid, ()) if now - t < self.echo_ttl]
+            pend.append(now)
+            self._echo[sid] = pend
+        # Mobius ct 와 같은 형식(UTC)으로 시작 프레임 위치를 맞춘다
+        ct = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        event(log, logging.INFO, "[TRIGGER] local sid=%s sensor=%s ct=%s", sid, sensor_no, ct,
+              sid=sid, sensor=sensor_no, ct=ct, local=True)
+        if self.trace:
+            self.trace("t3_trigger", ref)
+        if self.metrics:
+            self.metrics.triggers.inc(sensor_no)
+        self.streamer.start(sensor_no=sensor_no, sid=sid, start_ct_iso=ct, ref=ref)
+
+    def _consume_echo(self, sid: str) -> bool:
+        if not self._echo:
+            return False
+        now = time.monotonic()
+        with self._echo_lock:
+            pend = [t for t in self._echo.get(sid, ()) if now - t < self.echo_ttl]
+            if not pend:
+                self._echo.pop(sid, None)
+                return False
+            pend.pop(0)
+            if pend:
+                self._echo[sid] = pend
+            else:
+                del self._echo[sid]
+            self.echo_skipped += 1
+        return True
+
+    def on_message(self, client, userdata, msg):
+        m = self.metrics
+        if m is None:
+            self.handle(msg)
+            return
+        t0 = time.perf_counter()
+        try:
+            self.handle(msg)
+        finally:
+            m.on_message_seconds.observe(time.perf_counter() - t0)
+
+    def handle(self, msg):
+        trace = self.trace
+        m = self.metrics
+        raw = msg.payload
+        if self.prefilter and not self.mentions_ctrl(raw):
+            self.filtered += 1
+            if m:
+                m.prefiltered.inc(msg.topic)
+            return
+        if self.dedup is not None and self.dedup.is_dup(msg.topic, msg.payload):
+            if m:
+                m.duplicates.inc(msg.topic)
+            event(log, logging.DEBUG, "[SKIP] duplicate topic=%s", msg.topic, rl_key=f"dup:{msg.topic}",
+                  topic=msg.topic)
+            return
+        if trace:
+            trace("t3_recv", msg)
+        payload = raw.decode("utf-8", errors="replace")
+        cin, con, sur, shape = parse_notification_shaped(payload)
+        self.parsed += 1
+        if m:
+            m.messages.inc(msg.topic, shape)
+
+        # NOTIFY(op:5) 에서만 처리되도록 필터링 (sgn 없으면 스킵)
+        if cin is None and con is None and sur is None:
+            if m:
+                m.parse_failures.inc(msg.topic)
+            # 디버깅 원하면 아래 주석 해제
+            # print(f"[RAW] {msg.topic} {payload}")
+            return
+
+        if not (sur and self.need in f"/{sur}".replace("//", "/")):
+            return
+
+        if not (isinstance(con, dict) and "sid" in con):
+            event(log, logging.INFO, "[SKIP] Ctrl without sid sur=%s con=%s", sur, con,
+                  rl_key="skip:nosid", sur=sur)
+            return
+
+        sid = str(con["sid"])
+        if self._consume_echo(sid):
+            event(log, logging.INFO, "[SKIP] echo of local trigger sid=%s", sid,
+                  rl_key=f"echo:{sid}", sid=sid)
+            return
+        rec = self.sensors.from_sid(sid)
+        sensor_no = rec.no if rec is not None else None
+        if sensor_no is None:
+            event(log, logging.WARNING, "[WARN] cannot extract sensor_no from sid='%s'", sid,
+                  rl_key=f"nosensor:{sid}", sid=sid)
+            return
+
+        ct = None
+        if isinstance(cin, dict) and isinstance(cin.get("ct"), str):
+            ct = cin["ct"]  # YYYYMMDDTHHMMSS
+
+        event(log, logging.INFO, "[TRIGGER] Ctrl CIN sid=%s sensor=%s ct=%s", sid, sensor_no, ct,
+              sid=sid, sensor=sensor_no, ct=ct)
+        if trace:
+            trace("t3_trigger", msg)
+        if m:
+            m.triggers.inc(sensor_no)
+        self.streamer.start(sensor_no=sensor_no, sid=sid, start_ct_iso=ct, ref=msg)
+
+
+# -------------------- 인자 --------------------
+def build_arg_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="Stream Cam URLs to Cam1/Cam2 when Ctrl CIN arrives (NOTIFY op:5)")
     # MQTT
     ap.add_argument("--broker", default=os.getenv("MQTT_BROKER", "127.0.0.1"))
@@ -265,8 +691,44 @@ def main():
     ap.add_argument("--media-root", default=DEFAULT_MEDIA_ROOT)
     ap.add_argument("--media-base-url", default=DEFAULT_MEDIA_BASE_URL)
     ap.add_argument("--frames", type=int, default=10)
+    ap.add_argument("--cam-inflight", type=int, default=2,
+                    help="Cam CIN 동시 전송 수(keep-alive 커넥션). 1이면 순차 전송.")
+    ap.add_argument("--catchup-batch", type=int, default=0,
+                    help="Ctrl ct 이후 밀린 프레임을 N개씩 묶어 즉시 전송. 0이면 끔.")
+    sensor_registry.add_registry_args(ap)
+    dedup.add_dedup_args(ap)
+    ap.add_argument("--no-prefilter", action="store_true",
+                    help="Ctrl 경로 바이트 사전 필터 끄기 (모든 메시지를 파싱)")
+
+    # 재시작 시 프레임 인덱스/진행 중 스트림 복구
+    snapshot.add_snapshot_args(ap, "T3_SNAPSHOT_FILE")
+
+    # 전송 경로 (Cam CIN: http|mqtt)
+    onem2m_mqtt.add_transport_args(ap, "cam")
+
+    # 관측
+    logutil.add_log_args(ap)
+    profiler.add_profile_args(ap)
+    ap.add_argument("--metrics-port", type=int, default=int(os.getenv("METRICS_PORT", "0")),
+                    help="Prometheus /metrics 포트. 0이면 비활성.")
+    return ap
+
+
+def build_streamer(args: argparse.Namespace, *, trace=None, metrics=None, client=None) -> Streamer:
+    if client is None:
+        client = Onem2mClient(args.base_url, args.origin, timeout=args.timeout, rvi=DEFAULT_RVI,
+                              max_inflight=args.cam_inflight)
+    return Streamer(base=args.base_url.rstrip("/"), origin=args.origin,
+                    ae=args.ae, robot=args.robot, cam1=args.cam1, cam2=args.cam2,
+                    media_root=os.path.abspath(args.media_root),
+                    media_base_url=args.media_base_url,
+                    frames=args.frames, timeout=args.timeout, trace=trace, metrics=metrics,
+                    client=client, catchup_batch=args.catchup_batch)
 
-    args = ap.parse_args()
+
+# -------------------- 메인 --------------------
+def main():
+    args = build_arg_parser().parse_args()
 
     # 구독 토픽: 표준/역순 모두 구독해서 환경 차이 흡수
     topics: List[str]
@@ -278,11 +740,18 @@ def main():
             f"/oneM2M/req/{args.origin_mqtt}/{args.cse_id}/json",
         ]
 
-    streamer = Streamer(base=args.base_url.rstrip("/"), origin=args.origin,
-                        ae=args.ae, robot=args.robot, cam1=args.cam1, cam2=args.cam2,
-                        media_root=os.path.abspath(args.media_root),
-                        media_base_url=args.media_base_url,
-                        frames=args.frames, timeout=args.timeout)
+    log_listener = logutil.setup_from_args("t3", args)
+    profiler.install("t3", args,
+                     on_start=lambda sec: log.info("[PROFILE] sampling for %.0fs", sec),
+                     on_done=lambda stem: log.info("[PROFILE] wrote %s.*", stem))
+
+    metrics: Optional[ListenerMetrics] = None
+    if args.metrics_port:
+        from common import metrics as metrics_mod
+        registry = metrics_mod.Registry("t3")
+        metrics = ListenerMetrics(registry)
+        metrics_mod.serve(registry, args.metrics_port)
+        log.info("[METRICS] http://0.0.0.0:%s/metrics", args.metrics_port)
 
     # MQTT 클라이언트: v5 우선, 실패 시 v3 폴백
     use_v5 = True
@@ -296,64 +765,66 @@ def main():
         cli = mqtt.Client(client_id=f"ctrl-listener-{os.getpid()}",
                           protocol=mqtt.MQTTv311)
 
+    cam_transport = onem2m_mqtt.from_args(cli, args) if args.transport_cam == "mqtt" else None
+    streamer = build_streamer(args, metrics=metrics, client=cam_transport)
+    listener = CtrlListener(args, streamer, metrics=metrics, sensors=build_sensor_registry(args))
+
+    if args.snapshot_file:
+        t0 = time.perf_counter()
+        snap, why = snapshot.read(args.snapshot_file, b"T3", max_age=args.snapshot_max_age)
+        if snap is not None:
+            st = streamer.restore(snap)
+            log.info("[SNAPSHOT] restored indexes=%s frames=%s stale=%s cursor=%s age=%.0fs size=%sB in %.1fms",
+                     st["indexes"], st["frames"], st["stale"], st["cursor"], snap.age(), snap.size,
+                     (time.perf_counter() - t0) * 1000)
+        elif why != "missing":
+            log.warning("[WARN] snapshot %s not restored: %s", args.snapshot_file, why)
+    t0 = time.perf_counter()
+    n = streamer.warm()
+    log.info("[INDEX] %s frames in %s dirs in %.1fms", n, len(streamer.index), (time.perf_counter() - t0) * 1000)
+
+    def save_snapshot() -> None:
+        try:
+            snapshot.write(args.snapshot_file, b"T3", streamer.snapshot_sections())
+        except Exception as e:
+            log.warning("[WARN] snapshot write failed: %s", e)
+
+    ready: List[float] = []
+
+    def subscribe_all(client):
+        for t in topics:
+            client.subscribe(t, qos=args.qos)
+            log.info("[SUB] %s", t)
+        if cam_transport is not None:
+            cam_transport.subscribe()
+            log.info("[SUB] %s (cam over mqtt)", cam_transport.resp_topic)
+        if not ready:
+            ready.append(time.perf_counter() - T_START)
+            log.info("[READY] t3 in %.3fs", ready[0])
+            if metrics:
+                metrics.ready_seconds.set(ready[0])
+            # 재시작 전에 돌던 스트림 이어서 (스트림 스레드에서 전송)
+            cur = streamer.cursor
+            if streamer.resume():
+                log.info("[SNAPSHOT] resumed stream sensor%s sid=%s from frame %s", cur[0], cur[1], cur[4])
+
     def on_connect_v5(client, userdata, flags, reason_code, properties):
         ok = (hasattr(reason_code, "is_failure") and not reason_code.is_failure) or (getattr(reason_code, "value", 1) == 0)
         code_num = getattr(reason_code, "value", reason_code)
         if ok:
-            print(f"[MQTT] connected {args.broker}:{args.port} rc={code_num}")
-            for t in topics:
-                client.subscribe(t, qos=args.qos)
-                print(f"[SUB] {t}")
+            log.info("[MQTT] connected %s:%s rc=%s", args.broker, args.port, code_num)
+            subscribe_all(client)
         else:
-            print(f"[ERR] connect failed rc={code_num} ({reason_code})")
+            log.error("[ERR] connect failed rc=%s (%s)", code_num, reason_code)
 
     def on_connect_v3(client, userdata, flags, rc):
         if rc == 0:
-            print(f"[MQTT] connected {args.broker}:{args.port} rc={rc}")
-            for t in topics:
-                client.subscribe(t, qos=args.qos)
-                print(f"[SUB] {t}")
+            log.info("[MQTT] connected %s:%s rc=%s", args.broker, args.port, rc)
+            subscribe_all(client)
         else:
-            print(f"[ERR] connect failed rc={rc}")
-
-    def extract_sensor_no_from_sid(sid: str) -> Optional[int]:
-        if not isinstance(sid, str):
-            return None
-        m = re.search(r'(\d+)', sid)  # C-S3 / S3 / S-3
-        return int(m.group(1)) if m else None
-
-    def on_message(client, userdata, msg):
-        payload = msg.payload.decode("utf-8", errors="replace")
-        cin, con, sur = parse_notification(payload)
-
-        # NOTIFY(op:5) 에서만 처리되도록 필터링 (sgn 없으면 스킵)
-        if cin is None and con is None and sur is None:
-            # 디버깅 원하면 아래 주석 해제
-            # print(f"[RAW] {msg.topic} {payload}")
-            return
-
-        need = f"/{args.ae}/{args.robot}/{args.ctrl}"
-        if not (sur and need in f"/{sur}".replace("//", "/")):
-            return
-
-        if not (isinstance(con, dict) and "sid" in con):
-            print(f"[SKIP] Ctrl without sid sur={sur} con={pretty(con)}")
-            return
-
-        sid = str(con["sid"])
-        sensor_no = extract_sensor_no_from_sid(sid)
-        if sensor_no is None:
-            print(f"[WARN] cannot extract sensor_no from sid='{sid}'")
-            return
-
-        ct = None
-        if isinstance(cin, dict) and isinstance(cin.get("ct"), str):
-            ct = cin["ct"]  # YYYYMMDDTHHMMSS
-
-        print(f"[TRIGGER] Ctrl CIN sid={sid} sensor={sensor_no} ct={ct}")
-        streamer.start(sensor_no=sensor_no, sid=sid, start_ct_iso=ct)
+            log.error("[ERR] connect failed rc=%s", rc)
 
-    cli.on_message = on_message
+    cli.on_message = listener.on_message
     if use_v5:
         cli.on_connect = on_connect_v5
     else:
@@ -364,18 +835,28 @@ def main():
 
     def _stop(*_):
         try:
+            if listener.dedup is not None:
+                for t, st in listener.dedup.stats().items():
+                    log.info("[DEDUP] %s seen=%s dup=%s rate=%s", t, st["seen"], st["dup"], st["rate"])
             streamer.stop()
+            if args.snapshot_file:
+                save_snapshot()
             cli.loop_stop()
             cli.disconnect()
         finally:
+            logutil.shutdown(log_listener)
             sys.exit(0)
 
     signal.signal(signal.SIGINT, _stop)
     signal.signal(signal.SIGTERM, _stop)
 
     try:
+        next_snapshot = time.monotonic() + args.snapshot_sec
         while True:
             time.sleep(0.5)
+            if args.snapshot_file and time.monotonic() >= next_snapshot:
+                save_snapshot()
+                next_snapshot = time.monotonic() + args.snapshot_sec
     except KeyboardInterrupt:
         _stop()
 
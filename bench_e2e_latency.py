@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+센서 CIN → Ctrl CIN → 첫 Cam CIN 종단 지연 벤치마크.
+
+T2(AnomalyDetector)와 T3(CtrlListener/Streamer)를 같은 프로세스에서 구동하고
+합성 센서 NOTIFY를 주입해 단계별 지연을 측정한다.
+- Mobius: --base-url 미지정 시 지연(--mobius-latency-ms)을 흉내내는 내장 가짜 CSE 사용
+- Mobius → T3 NOTIFY 팬아웃은 별도 스레드에서 Mobius 지연만큼 늦춰 전달
+- 결과: 스윕 포인트별 단계 p50/p95/p99 (ms) 를 JSON으로 출력
+
+예)
+  python bench_e2e_latency.py --sensors 3,30 --rates 10,100 --mobius-latency-ms 0,20 \
+      --duration 5 --out bench.json
+"""
+import argparse, contextlib, itertools, json, os, queue, sys, tempfile, threading, time, uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import T2_anomaly_detection as t2
+import T3_robot_control as t3
+
+# recv 기준 단계 순서: (이름, 시작 스탬프, 끝 스탬프)
+STAGES = [
+    ("queue",      "sched",      "recv"),
+    ("parse",      "recv",       "parse"),
+    ("label",      "parse",      "label"),
+    ("ctrl_ack",   "label",      "ctrl_ack"),
+    ("notify",     "ctrl_ack",   "t3_recv"),
+    ("t3_trigger", "t3_recv",    "t3_trigger"),
+    ("cam1_first", "t3_trigger", "cam1_ack"),
+    ("cam2_first", "t3_trigger", "cam2_ack"),
+    ("e2e_cam1",   "sched",      "cam1_ack"),
+    ("e2e_cam2",   "sched",      "cam2_ack"),
+]
+
+
+def percentile(sorted_vals: List[float], p: float) -> Optional[float]:
+    """nearest-rank 백분위수"""
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(p / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def summarize(events: List[Dict[str, float]]) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, a, b in STAGES:
+        vals = sorted((ev[b] - ev[a]) * 1000.0 for ev in events if a in ev and b in ev)
+        out[name] = {
+            "n": len(vals),
+            "p50_ms": percentile(vals, 50),
+            "p95_ms": percentile(vals, 95),
+            "p99_ms": percentile(vals, 99),
+        }
+    return out
+
+
+# -------------------- 가짜 Mobius --------------------
+class FakeMobius:
+    """
+    라벨 GET / CIN POST만 흉내내는 최소 CSE. 모든 응답 전에 latency_ms 만큼 지연.
+    """
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.posts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def _reply(self, code: int, obj: Any):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-M2M-RSC", "2001" if code == 201 else "2000")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                owner._delay()
+                path = self.path.split("?", 1)[0].rstrip("/")
+                name = path.rsplit("/", 1)[-1]
+                if name.startswith("Sensor") and name[6:].isdigit():
+                    n = int(name[6:])
+                    lbl = ["type=sensor", f"sid=B-S{n}", f"x={10.0 * n}", "y=10.0",
+                           f"adjx={10.0 * n}", "adjy=10.5"]
+                    self._reply(200, {"m2m:cnt": {"rn": name, "lbl": lbl}})
+                else:
+                    self._reply(404, {"m2m:dbg": "resource does not exist"})
+
+            def do_POST(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(n) if n else b""
+                owner._delay()
+                path = self.path.split("?", 1)[0].rstrip("/")
+                with owner._lock:
+                    owner.posts[path] = owner.posts.get(path, 0) + 1
+                try:
+                    cin = json.loads(raw).get("m2m:cin", {})
+                except Exception:
+                    cin = {}
+                now = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+                cin.update({"ri": str(uuid.uuid4()), "ct": now, "lt": now})
+                self._reply(201, {"m2m:cin": cin})
+
+        self._srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._srv.daemon_threads = True
+        self._thread = threading.Thread(target=self._srv.serve_forever, daemon=True)
+
+    def _delay(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._srv.server_address[1]}/Mobius"
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._srv.shutdown()
+        self._srv.server_close()
+
+
+# -------------------- 합성 메시지 --------------------
+class BenchMsg:
+    """paho MQTTMessage 대용 (topic/payload) + 측정 레코드"""
+    __slots__ = ("topic", "payload", "event")
+
+    def __init__(self, topic: str, payload: bytes, event: Dict[str, float]):
+        self.topic = topic; self.payload = payload; self.event = event
+
+
+def sensor_notify(ae: str, region: str, sensor_no: int, temp: float, fire: int) -> bytes:
+    con = {"temp": temp, "fire_alarm": fire,
+           "ts": datetime.now(timezone.utc).isoformat(), "sid": f"B-S{sensor_no}"}
+    obj = {"op": 5, "rqi": str(uuid.uuid4()), "pc": {"m2m:sgn": {
+        "sur": f"Mobius/{ae}/{region}/Sensor{sensor_no}/data/B-S{sensor_no}-sub",
+        "nev": {"net": 3, "rep": {"m2m:cin": {"cnf": "application/json", "con": json.dumps(con)}}},
+    }}}
+    return json.dumps(obj).encode("utf-8")
+
+
+def ctrl_notify(ae: str, robot: str, ctrl: str, cmd: Dict[str, Any]) -> bytes:
+    con = {"position": {"x": cmd["x"], "y": cmd["y"], "z": 0.0},
+           "orientation": {"z": cmd["oz"], "w": cmd["ow"]}, "sid": cmd["sid"]}
+    ct = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    obj = {"op": 5, "rqi": str(uuid.uuid4()), "pc": {"m2m:sgn": {
+        "sur": f"Mobius/{ae}/{robot}/{ctrl}/ctrl-sub",
+        "nev": {"net": 3, "rep": {"m2m:cin": {"con": json.dumps(con), "ct": ct}}},
+    }}}
+    return json.dumps(obj).encode("utf-8")
+
+
+def make_media(root: str, sensors: int) -> None:
+    """센서별 birdeye/egocentric 더미 프레임 (Streamer는 파일명 타임스탬프만 본다)"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M")
+    for n in range(1, sensors + 1):
+        for view in ("birdeye_view", "egocentric_view"):
+            d = os.path.join(root, f"sensor{n}", view)
+            os.makedirs(d, exist_ok=True)
+            for i in range(2):
+                open(os.path.join(d, f"{stamp}{i:02d}.png"), "wb").close()
+
+
+# -------------------- 한 스윕 포인트 실행 --------------------
+def run_point(opts: argparse.Namespace, base_url: str, media_root: str,
+              sensors: int, rate: float, fake: Optional[FakeMobius]) -> Dict[str, Any]:
+    ae, region, robot, ctrl = opts.ae, opts.region, opts.robot, opts.ctrl
+
+    def trace(stage: str, ref: Any) -> None:
+        ev = getattr(ref, "event", None)
+        if ev is not None and stage not in ev:
+            ev[stage] = time.perf_counter()
+
+    lane_argv = ["--lanes", "--csv-dir", opts.lanes_csv_dir] if opts.lanes else []
+    t2_args = t2.build_arg_parser().parse_args([
+        "--base-url", base_url, "--origin", opts.origin, "--ae", ae,
+        "--robot", robot, "--ctrl", ctrl, "--timeout", str(opts.timeout),
+        "--cooldown-sec", "0", "--label-cache-sec", str(opts.label_cache_sec),
+    ] + lane_argv)
+    t3_args = t3.build_arg_parser().parse_args([
+        "--base-url", base_url, "--origin", opts.origin, "--ae", ae,
+        "--robot", robot, "--ctrl", ctrl, "--timeout", str(opts.timeout),
+        "--media-root", media_root, "--media-base-url", "http://bench/robot", "--frames", "1",
+    ])
+
+    t2_metrics = t3_metrics = None
+    if opts.metrics:
+        from common import metrics as metrics_mod
+        t2_metrics = t2.DetectorMetrics(metrics_mod.Registry("t2"))
+        t3_metrics = t3.ListenerMetrics(metrics_mod.Registry("t3"))
+
+    rt = None
+    if opts.combined:
+        # 통합 런타임: T2가 버스로 Streamer를 바로 시작, Ctrl CIN 은 비동기 기록
+        import T23_combined_runtime as t23
+        rt_args = t23.build_arg_parser().parse_args([
+            "--base-url", base_url, "--origin", opts.origin, "--ae", ae,
+            "--robot", robot, "--ctrl", ctrl, "--timeout", str(opts.timeout),
+            "--cooldown-sec", "0", "--label-cache-sec", str(opts.label_cache_sec),
+            "--media-root", media_root, "--media-base-url", "http://bench/robot", "--frames", "1",
+        ] + lane_argv)
+        rt = t23.CombinedRuntime(rt_args, trace=trace, t2_metrics=t2_metrics, t3_metrics=t3_metrics)
+        streamer, listener = rt.streamer, rt.listener
+    else:
+        streamer = t3.build_streamer(t3_args, trace=trace, metrics=t3_metrics)
+        listener = t3.CtrlListener(t3_args, streamer, trace=trace, metrics=t3_metrics)
+
+    # Mobius → T3 NOTIFY 팬아웃 (별도 스레드)
+    fanout_q: "queue.Queue[Optional[BenchMsg]]" = queue.Queue()
+    fanout_delay = (fake.latency_ms / 1000.0) if fake else 0.0
+
+    def fanout():
+        while True:
+            m = fanout_q.get()
+            if m is None:
+                return
+            if fanout_delay > 0:
+                time.sleep(fanout_delay)
+            listener.on_message(None, None, m)
+
+    def on_dispatch(cmd: Dict[str, Any], ref: Any) -> None:
+        fanout_q.put(BenchMsg("/oneM2M/req/bench/t3/json", ctrl_notify(ae, robot, ctrl, cmd), ref.event))
+
+    if rt is not None:
+        # Mobius 에코 NOTIFY 도 그대로 흘려 T3 중복 제거를 함께 검증
+        detector = rt.detector
+        detector.on_dispatch = on_dispatch
+    else:
+        detector = t2.AnomalyDetector(t2_args, t2.load_ori_map(""), trace=trace, on_dispatch=on_dispatch,
+                                      metrics=t2_metrics)
+    fan_thread = threading.Thread(target=fanout, daemon=True)
+    fan_thread.start()
+
+    topic = "/oneM2M/req/bench/t2/json"
+    total = max(1, int(rate * opts.duration))
+    alarm_every = max(1, int(round(1.0 / opts.alarm_ratio))) if opts.alarm_ratio > 0 else 0
+    interval = 1.0 / rate
+    events: List[Dict[str, float]] = []
+    alarms: List[Dict[str, float]] = []
+
+    sink = open(os.devnull, "w") if not opts.verbose else None
+    redirect = contextlib.redirect_stdout(sink) if sink else contextlib.nullcontext()
+    with redirect:
+        # 라벨 캐시 워밍업: 측정과 분리하려면 --warm
+        if opts.warm:
+            for n in range(1, sensors + 1):
+                detector.resolve_pose(n, f"Mobius/{ae}/{region}/Sensor{n}/data", time.time())
+
+        t0 = time.perf_counter()
+        for i in range(total):
+            sched = t0 + i * interval
+            now = time.perf_counter()
+            if sched > now:
+                time.sleep(sched - now)
+            sensor_no = (i % sensors) + 1
+            is_alarm = bool(alarm_every) and (i % alarm_every == alarm_every - 1)
+            ev: Dict[str, float] = {"sched": sched}
+            temp = 65.0 if is_alarm else 27.0 + (i % 10) / 10.0
+            msg = BenchMsg(topic, sensor_notify(ae, region, sensor_no, temp, 1 if is_alarm else 0), ev)
+            detector.on_message(None, None, msg)
+            events.append(ev)
+            if is_alarm:
+                alarms.append(ev)
+        elapsed = time.perf_counter() - t0
+
+        # 남은 레인/팬아웃/스트림 완료 대기 (레인을 먼저 비워야 마지막 출동이 팬아웃에 들어간다)
+        detector.close()
+        fanout_q.put(None)
+        fan_thread.join(timeout=opts.drain_sec)
+        deadline = time.perf_counter() + opts.drain_sec
+        last = alarms[-1] if alarms else None
+        while last is not None and time.perf_counter() < deadline:
+            if "cam1_ack" in last and "cam2_ack" in last:
+                break
+            time.sleep(0.01)
+        streamer.stop()
+        if rt is not None:
+            rt.close()
+    if sink:
+        sink.close()
+
+    if rt is not None:
+        # 통합 모드의 t3_recv 는 에코 도착 시각이라 notify/t3_trigger 구간에서 뺀다
+        for ev in events:
+            ev.pop("t3_recv", None)
+    completed = sum(1 for ev in alarms if "cam1_ack" in ev and "cam2_ack" in ev)
+    return {
+        "sensors": sensors,
+        "rate": rate,
+        "mobius_latency_ms": fake.latency_ms if fake else None,
+        "sent": total,
+        "achieved_rate": round(total / elapsed, 2) if elapsed > 0 else None,
+        "alarms": len(alarms),
+        "dispatched": sum(1 for ev in alarms if "ctrl_ack" in ev),
+        "completed": completed,
+        # Streamer.start는 이전 스트림을 중단시키므로 첫 프레임 전에 대체된 알람 수
+        "preempted": len(alarms) - completed,
+        "echo_skipped": listener.echo_skipped,
+        "lanes": detector.lanes.stats() if detector.lanes is not None else None,
+        "stages": summarize(events),
+    }
+
+
+def fmt_ms(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:.2f}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="E2E latency benchmark: sensor CIN -> Ctrl CIN -> first Cam CIN")
+    ap.add_argument("--base-url", default="",
+                    help="실제 Mobius base URL. 비우면 내장 가짜 CSE 사용(지연 스윕 가능)")
+    ap.add_argument("--origin", default=t2.DEFAULT_ORIGIN)
+    ap.add_argument("--ae", default="Bench-AE")
+    ap.add_argument("--region", default="Bench-hall")
+    ap.add_argument("--robot", default="Robot1")
+    ap.add_argument("--ctrl", default="Ctrl")
+    ap.add_argument("--timeout", type=float, default=5.0)
+
+    ap.add_argument("--sensors", default="3", help="센서 수 스윕 (콤마 구분)")
+    ap.add_argument("--rates", default="10", help="전체 메시지율 msg/s 스윕 (콤마 구분)")
+    ap.add_argument("--mobius-latency-ms", default="0", help="가짜 CSE 응답 지연 스윕 (콤마 구분)")
+    ap.add_argument("--duration", type=float, default=5.0, help="스윕 포인트당 송신 시간(초)")
+    ap.add_argument("--alarm-ratio", type=float, default=0.05, help="fire_alarm=1 메시지 비율")
+    ap.add_argument("--label-cache-sec", type=float, default=30.0)
+    ap.add_argument("--warm", action="store_true", help="측정 전 라벨 캐시 채우기")
+    ap.add_argument("--drain-sec", type=float, default=5.0, help="종료 후 Cam ack 대기 한도(초)")
+    ap.add_argument("--verbose", action="store_true", help="T2/T3 stdout 출력 유지")
+    ap.add_argument("--metrics", action="store_true", help="T2/T3 메트릭 계측 활성화(오버헤드 비교용)")
+    ap.add_argument("--combined", action="store_true",
+                    help="통합 런타임(T23_combined_runtime)으로 측정: Ctrl NOTIFY 왕복 없이 Streamer 시작")
+    ap.add_argument("--lanes", action="store_true",
+                    help="T2 우선순위 레인 사용 (일반 측정값은 low 레인에서 CSV 묶음 기록)")
+    ap.add_argument("--out", default="", help="JSON 결과 파일 (미지정 시 stdout)")
+    args = ap.parse_args()
+
+    # T2/T3 로거는 기본적으로 WARNING 이상만 (stderr). --verbose면 전체 출력
+    if args.verbose:
+        from common import logutil
+        for name in ("t2", "t3"):
+            logutil.setup(name, level="DEBUG", async_=False, rate_sec=0)
+
+    sensors_list = [int(v) for v in args.sensors.split(",") if v.strip()]
+    rates = [float(v) for v in args.rates.split(",") if v.strip()]
+    lats = [float(v) for v in args.mobius_latency_ms.split(",") if v.strip()]
+    if args.base_url:
+        lats = [0.0]  # 실제 CSE 에서는 지연 스윕 불가
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="bench-media-") as media_root:
+        # 레인 모드는 low 레인의 CSV 기록까지 포함해 측정
+        args.lanes_csv_dir = os.path.join(media_root, "csv")
+        os.makedirs(args.lanes_csv_dir, exist_ok=True)
+        make_media(media_root, max(sensors_list))
+        fake: Optional[FakeMobius] = None
+        if not args.base_url:
+            fake = FakeMobius()
+            fake.start()
+        base_url = args.base_url.rstrip("/") if args.base_url else fake.base_url
+        try:
+            for sensors, rate, lat in itertools.product(sensors_list, rates, lats):
+                if fake:
+                    fake.latency_ms = lat
+                r = run_point(args, base_url, media_root, sensors, rate, fake)
+                results.append(r)
+                st = r["stages"]
+                print(f"[BENCH] sensors={sensors} rate={rate:g} mobius={lat:g}ms "
+                      f"sent={r['sent']} alarms={r['alarms']} completed={r['completed']} "
+                      f"parse p50/p99={fmt_ms(st['parse']['p50_ms'])}/{fmt_ms(st['parse']['p99_ms'])} "
+                      f"e2e_cam1 p50/p95/p99={fmt_ms(st['e2e_cam1']['p50_ms'])}/"
+                      f"{fmt_ms(st['e2e_cam1']['p95_ms'])}/{fmt_ms(st['e2e_cam1']['p99_ms'])}",
+                      file=sys.stderr)
+        finally:
+            if fake:
+                fake.close()
+
+    report = {
+        "bench": "e2e_latency",
+        "started_at": started_at,
+        "python": sys.version.split()[0],
+        "mobius": args.base_url or "fake",
+        "duration_sec": args.duration,
+        "alarm_ratio": args.alarm_ratio,
+        "metrics": args.metrics,
+        "combined": args.combined,
+        "lanes": args.lanes,
+        "points": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[OK] wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
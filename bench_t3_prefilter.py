@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+T3 바이트 사전 필터 벤치마크: 섞인 트래픽에서 CtrlListener.on_message 처리량 비교.
+
+센서(loadgen 의 5가지 형태) / Cam CIN NOTIFY / 다른 로봇 Ctrl / 이 로봇 Ctrl 을
+--ctrl-ratio 등의 비율로 미리 만들어 두고, 사전 필터 on/off 각각 같은 메시지를
+최대 속도로 넣어 메시지당 비용(p50/p99 µs)과 처리량(msg/s), 트리거 수를 비교한다.
+Streamer 는 호출 횟수만 세는 더미라 Mobius 없이 돈다.
+
+예)
+  python bench_t3_prefilter.py --messages 200000 --ctrl-ratio 0.001 --out prefilter.json
+"""
+import argparse, json, random, sys, time, uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import T3_robot_control as t3
+import loadgen_sensors as lg
+
+
+class BenchMsg:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic: str, payload: bytes):
+        self.topic = topic; self.payload = payload
+
+
+class CountingStreamer:
+    def __init__(self):
+        self.started = 0
+
+    def start(self, **_kw):
+        self.started += 1
+
+
+def notify(sur: str, con: Dict[str, Any]) -> bytes:
+    ct = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return json.dumps({"op": 5, "rqi": uuid.uuid4().hex, "pc": {"m2m:sgn": {
+        "sur": sur, "nev": {"net": 3, "rep": {"m2m:cin": {"ri": "4-" + uuid.uuid4().hex, "ct": ct,
+                                                          "con": json.dumps(con)}}}}}}).encode("utf-8")
+
+
+def make_traffic(opts: argparse.Namespace) -> List[BenchMsg]:
+    rng = random.Random(opts.seed)
+    lg_args = argparse.Namespace(ae=opts.ae, region="Bench-hall", origin_mqtt="bench")
+    topic = "/oneM2M/req/Mobius2/bench/json"
+    out: List[BenchMsg] = []
+    for i in range(opts.messages):
+        r = rng.random()
+        if r < opts.ctrl_ratio:
+            con = {"position": {"x": 10.0, "y": 10.5, "z": 0.0}, "orientation": {"z": 0.7, "w": 0.7}, "sid": "B-S1"}
+            out.append(BenchMsg(topic, notify(f"Mobius/{opts.ae}/{opts.robot}/{opts.ctrl}/ctrl-sub", con)))
+        elif r < opts.ctrl_ratio + opts.other_ctrl_ratio:
+            con = {"position": {"x": 1.0, "y": 1.0, "z": 0.0}, "orientation": {"z": 0.0, "w": 1.0}, "sid": "B-S2"}
+            out.append(BenchMsg(topic, notify(f"Mobius/{opts.ae}/Robot{rng.randint(2, 9)}/{opts.ctrl}/ctrl-sub", con)))
+        elif r < opts.ctrl_ratio + opts.other_ctrl_ratio + opts.cam_ratio:
+            cam = "Cam1" if i % 2 else "Cam2"
+            con = {"url": f"http://bench/robot/{cam.lower()}/{i:06d}.png", "sid": "B-S1"}
+            out.append(BenchMsg(topic, notify(f"Mobius/{opts.ae}/{opts.robot}/{cam}/{cam.lower()}-sub", con)))
+        else:
+            n = rng.randint(1, opts.sensors)
+            con = {"temp": round(rng.uniform(25, 30), 1), "fire_alarm": 0,
+                   "ts": datetime.now(timezone.utc).isoformat(), "sid": f"L-S{n}", "seq": i}
+            out.append(BenchMsg(topic, lg.build_payload(lg.SHAPES[i % len(lg.SHAPES)], lg_args, n, con)))
+    return out
+
+
+def run_mode(opts: argparse.Namespace, msgs: List[BenchMsg], prefilter: bool) -> Dict[str, Any]:
+    argv = ["--ae", opts.ae, "--robot", opts.robot, "--ctrl", opts.ctrl]
+    if not prefilter:
+        argv.append("--no-prefilter")
+    args = t3.build_arg_parser().parse_args(argv)
+    streamer = CountingStreamer()
+    listener = t3.CtrlListener(args, streamer)
+    per: List[float] = []
+    pc = time.perf_counter
+    t0 = pc()
+    for msg in msgs:
+        s = pc()
+        listener.on_message(None, None, msg)
+        per.append(pc() - s)
+    elapsed = pc() - t0
+    per.sort()
+
+    def pct(p: float) -> float:
+        return round(per[min(len(per) - 1, int(p / 100.0 * len(per)))] * 1e6, 2)
+
+    return {"prefilter": prefilter, "messages": len(msgs), "filtered": listener.filtered,
+            "parsed": listener.parsed, "triggers": streamer.started,
+            "msgs_per_sec": round(len(msgs) / elapsed, 1) if elapsed > 0 else None,
+            "per_msg_us": {"p50": pct(50), "p99": pct(99), "mean": round(elapsed / len(msgs) * 1e6, 2)}}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="T3 byte prefilter benchmark (mixed traffic)")
+    ap.add_argument("--messages", type=int, default=100000)
+    ap.add_argument("--sensors", type=int, default=1000, help="센서 번호 범위")
+    ap.add_argument("--ctrl-ratio", type=float, default=0.001, help="이 로봇 Ctrl NOTIFY 비율")
+    ap.add_argument("--other-ctrl-ratio", type=float, default=0.001, help="다른 로봇 Ctrl NOTIFY 비율")
+    ap.add_argument("--cam-ratio", type=float, default=0.2, help="Cam CIN NOTIFY 비율 (나머지는 센서)")
+    ap.add_argument("--ae", default="Meta-Sejong")
+    ap.add_argument("--robot", default="Robot1")
+    ap.add_argument("--ctrl", default="Ctrl")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="", help="JSON 결과 파일 (미지정 시 stdout)")
+    opts = ap.parse_args()
+
+    msgs = make_traffic(opts)
+    results = []
+    for prefilter in (False, True):
+        r = run_mode(opts, msgs, prefilter)
+        results.append(r)
+        print(f"[BENCH] prefilter={'on' if prefilter else 'off'} msgs={r['messages']} "
+              f"parsed={r['parsed']} filtered={r['filtered']} triggers={r['triggers']} "
+              f"rate={r['msgs_per_sec']}/s p50/p99={r['per_msg_us']['p50']}/{r['per_msg_us']['p99']}us",
+              file=sys.stderr)
+    if results[0]["triggers"] != results[1]["triggers"]:
+        print("[WARN] trigger counts differ between modes", file=sys.stderr)
+
+    report = {"bench": "t3_prefilter", "python": sys.version.split()[0],
+              "mix": {"ctrl": opts.ctrl_ratio, "other_ctrl": opts.other_ctrl_ratio, "cam": opts.cam_ratio},
+              "modes": results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[OK] wrote {opts.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
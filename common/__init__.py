@@ -0,0 +1 @@
+"""T2/T3 공용 런타임 도우미 (메트릭, 로깅 등)."""
@@ -0,0 +1,167 @@
+"""
+놓친 센서 CIN 따라잡기 (시작/재접속 시).
+
+- Cursor: 센서별 마지막으로 처리한 CIN 의 ct(high-water mark)/ri 와 컨테이너 경로. JSON 파일로 저장(임시 파일 + rename).
+  claim(sensor, ct, ri) 로 라이브/따라잡기 양쪽이 같은 CIN 을 한 번만 처리하도록 최근 ri 를 센서별로 기억한다
+  (--dedup-ttl-sec 설정과 무관).
+- fetch_cins: {센서}/data 를 rcn=4 로 조회. cra(이후)/crb(이전) 로 구간을 자르고
+  lim/ofst 로 페이지를 넘긴다. 결과는 (ct, ri) 오름차순.
+- fetch_all: 센서 여러 개를 concurrency 개씩 동시에 조회.
+ct 는 Mobius 형식(UTC, YYYYMMDDTHHMMSS)이라 문자열 비교로 순서를 판단한다.
+"""
+import collections, glob, json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+CT_FMT = "%Y%m%dT%H%M%S"
+
+
+def ct_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime(CT_FMT)
+
+
+class Cursor:
+    def __init__(self, recent: int = 4096):
+        self.by_sensor: Dict[int, Dict[str, Optional[str]]] = {}
+        self.recent = max(1, recent)
+        self._seen: Dict[int, "collections.OrderedDict[str, None]"] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.dirty = False
+
+    def claim(self, sensor: int, ct: Optional[str], ri: Optional[str] = None, path: Optional[str] = None) -> bool:
+        """
+        이 CIN 을 처리해도 되면 True (기록까지 원자적으로). 같은 ri 를 이미 처리했으면 False.
+        ct 는 최댓값(high-water mark)만 남긴다. 센서당 최근 recent 개 ri 까지 기억.
+        """
+        with self._lock:
+            if ri:
+                seen = self._seen.get(sensor)
+                if seen is None:
+                    seen = self._seen[sensor] = collections.OrderedDict()
+                if ri in seen:
+                    return False
+                seen[ri] = None
+                if len(seen) > self.recent:
+                    seen.popitem(last=False)
+            if ct:
+                self._advance(sensor, ct, ri, path)
+            return True
+
+    def _advance(self, sensor: int, ct: str, ri: Optional[str], path: Optional[str]) -> None:
+        cur = self.by_sensor.get(sensor)
+        if cur is None:
+            self.by_sensor[sensor] = {"ct": ct, "ri": ri, "path": path}
+        elif ct >= (cur.get("ct") or ""):
+            cur["ct"], cur["ri"] = ct, ri
+            if path:
+                cur["path"] = path
+        else:
+            return
+        self.dirty = True
+
+    def get(self, sensor: int) -> Optional[Dict[str, Optional[str]]]:
+        return self.by_sensor.get(sensor)
+
+    def load(self, path: str) -> int:
+        """파일 내용을 합친다 (센서별로 더 나중 ct 유지). 여러 번 불러 워커별 파일을 합칠 수 있다."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            for k, v in (data.get("sensors") or {}).items():
+                if isinstance(v, dict) and v.get("ct"):
+                    no, ri = int(k), v.get("ri")
+                    self._advance(no, v["ct"], ri, v.get("path"))
+                    if ri:
+                        self._seen.setdefault(no, collections.OrderedDict())[ri] = None
+            self.dirty = False
+        return len(self.by_sensor)
+
+    def save(self, path: str) -> None:
+        with self._save_lock:
+            with self._lock:
+                data = {"saved_at": ct_of(time.time()),
+                        "sensors": {str(k): dict(v) for k, v in sorted(self.by_sensor.items())}}
+                self.dirty = False
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, path)
+
+
+def worker_state_path(path: str, worker: int) -> str:
+    """클러스터 워커별 커서 파일 (t2-catchup.json → t2-catchup.w1.json)"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.w{worker}{ext}"
+
+
+def worker_state_paths(path: str) -> List[str]:
+    root, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{glob.escape(root)}.w*{ext}"))
+
+
+def _cin_list(data: Any) -> List[Dict[str, Any]]:
+    """rcn=4 응답에서 CIN 목록 (m2m:cnt / m2m:rsp 래핑 모두)"""
+    if not isinstance(data, dict):
+        return []
+    if isinstance(data.get("m2m:cin"), list):
+        return data["m2m:cin"]
+    for v in data.values():
+        if isinstance(v, dict) and isinstance(v.get("m2m:cin"), list):
+            return v["m2m:cin"]
+    return []
+
+
+def fetch_cins(client, data_path: str, cra: str, crb: Optional[str] = None, *,
+               page: int = 200, limit: int = 3600) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    ofst = 0
+    while len(out) < limit:
+        params: Dict[str, Any] = {"rcn": 4, "ty": 4, "cra": cra, "lim": min(page, limit - len(out)), "ofst": ofst}
+        if crb:
+            params["crb"] = crb
+        resp = client.get(data_path, params=params)
+        if resp.status_code == 404:
+            break
+        if not resp.ok:
+            raise RuntimeError(f"GET {data_path} status={resp.status_code}")
+        batch = _cin_list(resp.json())
+        out.extend(batch)
+        if len(batch) < params["lim"]:
+            break
+        ofst += len(batch)
+    out.sort(key=lambda c: (str(c.get("ct") or ""), str(c.get("ri") or "")))
+    return out
+
+
+def fetch_all(client, targets: List[Tuple[int, str, str]], crb: Optional[str] = None, *,
+              page: int = 200, limit: int = 3600, concurrency: int = 4) -> Dict[int, Any]:
+    """targets: [(sensor, data_path, cra)]. 센서별 CIN 목록 또는 예외."""
+    results: Dict[int, Any] = {}
+    if not targets:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="catchup") as pool:
+        futs = {sensor: pool.submit(fetch_cins, client, path, cra, crb, page=page, limit=limit)
+                for sensor, path, cra in targets}
+        for sensor, fut in futs.items():
+            try:
+                results[sensor] = fut.result()
+            except Exception as e:
+                results[sensor] = e
+    return results
+
+
+def add_catchup_args(ap) -> None:
+    ap.add_argument("--catchup-sec", type=float, default=float(os.getenv("CATCHUP_SEC", "0")),
+                    help="시작/재접속 시 놓친 센서 CIN 을 최대 이만큼(초) 거슬러 조회해 처리. 0이면 끔. "
+                         "--share-group 이면 워커 0 만 시작 시 한 번 조회 (재접속 때는 다른 워커가 계속 받음).")
+    ap.add_argument("--catchup-state", default=os.getenv("CATCHUP_STATE_FILE", "t2-catchup.json"),
+                    help="센서별 마지막 처리 CIN(ct/ri) 저장 파일")
+    ap.add_argument("--catchup-cnt", default="data", help="센서 컨테이너 아래 측정값 컨테이너 이름")
+    ap.add_argument("--catchup-page", type=int, default=200, help="조회 페이지 크기 (lim)")
+    ap.add_argument("--catchup-max", type=int, default=3600, help="센서당 최대 조회 CIN 수")
+    ap.add_argument("--catchup-concurrency", type=int, default=4, help="동시에 조회할 센서 수")
@@ -0,0 +1,87 @@
+"""
+중복 NOTIFY 제거 (표준/역순 두 토픽 구독 + QoS 1 재전송 대비).
+
+JSON 디코딩 전에 원본 바이트에서 키만 뽑는다.
+- CIN ri → 없으면 요청 rqi. 둘 다 없으면 판정하지 않는다(통과).
+  hash_fallback=True(--dedup-hash)일 때만 페이로드 해시(blake2b 16바이트)로 판정하는데,
+  같은 값을 연속으로 보내는 센서의 정상 측정값도 ttl 안에서는 중복으로 버려지므로 기본은 끔.
+- con 안의 값은 문자열로 한 번 더 감싸져 있어(\\"ri\\") 바깥 키와 섞이지 않는다.
+기억은 시간 제한 LRU: 처음 본 뒤 ttl_sec 동안만, 최대 max_entries 개 (넘치면 오래된 것부터 잊음).
+토픽별 수신/중복 수는 stats() 로 본다.
+"""
+import collections, hashlib, os, re, threading, time
+from typing import Dict, Optional
+
+_RI = re.compile(rb'"ri"\s*:\s*"([^"]+)"')
+_RQI = re.compile(rb'"rqi"\s*:\s*"([^"]+)"')
+
+
+def dedup_key(payload: bytes, hash_fallback: bool = False) -> Optional[bytes]:
+    m = _RI.search(payload)
+    if m:
+        return b"ri:" + m.group(1)
+    m = _RQI.search(payload)
+    if m:
+        return b"rqi:" + m.group(1)
+    if hash_fallback:
+        return b"h:" + hashlib.blake2b(payload, digest_size=16).digest()
+    return None
+
+
+class Deduper:
+    def __init__(self, ttl_sec: float = 30.0, max_entries: int = 16384, *, hash_fallback: bool = False):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, max_entries)
+        self.hash_fallback = hash_fallback
+        self._seen: "collections.OrderedDict[bytes, float]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.counts: Dict[str, list] = {}  # topic -> [수신, 중복]
+
+    def is_dup(self, topic: str, payload: bytes, now: Optional[float] = None) -> bool:
+        return self.check(topic, dedup_key(payload, self.hash_fallback), now)
+
+    def check(self, topic: str, key: Optional[bytes], now: Optional[float] = None) -> bool:
+        """이미 뽑아 둔 키로 판정. key 가 None 이면 수신만 세고 통과"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            c = self.counts.get(topic)
+            if c is None:
+                c = self.counts[topic] = [0, 0]
+            c[0] += 1
+            if key is None:
+                return False
+            seen = self._seen
+            # 삽입 순서 = 시간 순서라 앞에서부터 만료 제거
+            limit = now - self.ttl_sec
+            while seen:
+                k, t = next(iter(seen.items()))
+                if t > limit:
+                    break
+                seen.popitem(last=False)
+            if key in seen:
+                c[1] += 1
+                return True
+            seen[key] = now
+            if len(seen) > self.max_entries:
+                seen.popitem(last=False)
+            return False
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {t: {"seen": n, "dup": d, "rate": round(d / n, 4) if n else 0.0}
+                    for t, (n, d) in self.counts.items()}
+
+
+def add_dedup_args(ap) -> None:
+    ap.add_argument("--dedup-ttl-sec", type=float, default=float(os.getenv("DEDUP_TTL_SEC", "30")),
+                    help="같은 NOTIFY(ri/rqi)를 무시할 시간(초). 0이면 중복 제거 안 함.")
+    ap.add_argument("--dedup-max", type=int, default=16384, help="중복 판정용으로 기억할 최대 키 수")
+    ap.add_argument("--dedup-hash", action="store_true",
+                    help="ri/rqi 가 없는 메시지도 내용 해시로 중복 판정. 같은 값이 반복되는 정상 측정값도 버려질 수 있음.")
+
+
+def from_args(args) -> Optional[Deduper]:
+    ttl = getattr(args, "dedup_ttl_sec", 0.0)
+    if not ttl or ttl <= 0:
+        return None
+    return Deduper(ttl, args.dedup_max, hash_fallback=getattr(args, "dedup_hash", False))
@@ -0,0 +1,241 @@
+"""
+다중 로봇 출동: 알람 위치에서 가장 가까운 가용 로봇 선택.
+
+- GridIndex: 균일 격자 공간 인덱스. 점 추가/이동/삭제는 O(1), 최근접 조회는
+  질의 칸에서 링을 넓혀 가며 찾고, 남은 링이 현재 최단 거리보다 멀면 멈춘다.
+- RobotDispatcher: 로봇 위치(마지막 보고 또는 마지막 명령 좌표)는 GridIndex에,
+  센서 위치(lbl 의 x/y/z)는 센서 번호 dict 에 둔다 (센서는 번호로만 찾으므로).
+  출동시킨 로봇은 busy_sec 동안 가용 목록에서 빠지고, 전송 실패 시 되돌린다.
+
+로봇 스펙(--robots):
+- 인라인: "Robot1=10,0;Robot2=40,5"
+- JSON : [{"robot": "Robot1", "x": 10, "y": 0}]
+- CSV  : robot,x,y 헤더
+"""
+import csv, json, math, os, threading, time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Point = Tuple[float, float]
+
+
+class GridIndex:
+    def __init__(self, cell: float = 10.0):
+        self.cell = float(cell) if cell > 0 else 10.0
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._pos: Dict[str, Point] = {}
+        self._lo = [0, 0]
+        self._hi = [0, 0]
+
+    def _key(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell)), int(math.floor(y / self.cell))
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pos
+
+    def get(self, key: str) -> Optional[Point]:
+        return self._pos.get(key)
+
+    def items(self) -> Iterable[Tuple[str, Point]]:
+        return self._pos.items()
+
+    def put(self, key: str, x: float, y: float) -> None:
+        """추가 또는 이동"""
+        old = self._pos.get(key)
+        ck = self._key(x, y)
+        if old is not None:
+            ok = self._key(*old)
+            if ok == ck:
+                self._pos[key] = (x, y)
+                return
+            bucket = self._cells.get(ok)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._cells[ok]
+        self._cells.setdefault(ck, set()).add(key)
+        if not self._pos:
+            self._lo, self._hi = [ck[0], ck[1]], [ck[0], ck[1]]
+        else:
+            self._lo = [min(self._lo[0], ck[0]), min(self._lo[1], ck[1])]
+            self._hi = [max(self._hi[0], ck[0]), max(self._hi[1], ck[1])]
+        self._pos[key] = (x, y)
+
+    def remove(self, key: str) -> None:
+        old = self._pos.pop(key, None)
+        if old is None:
+            return
+        ok = self._key(*old)
+        bucket = self._cells.get(ok)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[ok]
+
+    def nearest(self, x: float, y: float,
+                accept: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[str, float]]:
+        """(key, 거리). accept(key)가 False인 점은 건너뛴다. 없으면 None."""
+        if not self._pos:
+            return None
+        cx, cy = self._key(x, y)
+        (lx, ly), (hx, hy) = self._lo, self._hi
+        # 점이 있는 칸 범위(축소하지 않는 상한)와 겹치는 링만 본다
+        rmin = max(0, lx - cx, cx - hx, ly - cy, cy - hy)
+        rmax = max(abs(cx - lx), abs(cx - hx), abs(cy - ly), abs(cy - hy))
+        best: Optional[str] = None
+        best_d2 = math.inf
+        cells = self._cells
+        pos = self._pos
+        for r in range(rmin, rmax + 1):
+            if r == 0:
+                ring: Iterable[Tuple[int, int]] = ((cx, cy),)
+            else:
+                x0, x1 = max(cx - r, lx), min(cx + r, hx)
+                y0, y1 = max(cy - r + 1, ly), min(cy + r - 1, hy)
+                ring = []
+                if ly <= cy - r <= hy:
+                    ring += [(i, cy - r) for i in range(x0, x1 + 1)]
+                if ly <= cy + r <= hy:
+                    ring += [(i, cy + r) for i in range(x0, x1 + 1)]
+                if lx <= cx - r <= hx:
+                    ring += [(cx - r, j) for j in range(y0, y1 + 1)]
+                if lx <= cx + r <= hx:
+                    ring += [(cx + r, j) for j in range(y0, y1 + 1)]
+            for ck in ring:
+                bucket = cells.get(ck)
+                if not bucket:
+                    continue
+                for key in bucket:
+                    px, py = pos[key]
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 < best_d2 and (accept is None or accept(key)):
+                        best, best_d2 = key, d2
+            # 다음 링의 점은 최소 r*cell 떨어져 있다
+            if best is not None and best_d2 <= (r * self.cell) ** 2:
+                break
+        return (best, math.sqrt(best_d2)) if best is not None else None
+
+
+class RobotDispatcher:
+    def __init__(self, *, cell: float = 10.0, busy_sec: float = 60.0):
+        self.busy_sec = busy_sec
+        self.robots = GridIndex(cell)
+        self.sensor_pos: Dict[int, Tuple[float, float, float]] = {}
+        self._busy_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    # -------------------- 갱신 --------------------
+    def update_robot(self, robot: str, x: float, y: float) -> None:
+        """로봇 위치 보고 (마지막으로 알려진 좌표)"""
+        with self._lock:
+            self.robots.put(robot, float(x), float(y))
+
+    def remove_robot(self, robot: str) -> None:
+        with self._lock:
+            self.robots.remove(robot)
+            self._busy_until.pop(robot, None)
+
+    def update_sensor(self, sensor: int, pose: Dict[str, Any]) -> None:
+        """parse_pose_from_labels 결과에서 센서 좌표(sx/sy/sz) 반영"""
+        sx, sy = pose.get("sx"), pose.get("sy")
+        if sx is None or sy is None:
+            return
+        self.sensor_pos[sensor] = (sx, sy, pose.get("sz") or 0.0)
+
+    def alarm_point(self, sensor: int, fallback: Point) -> Point:
+        """알람 위치: 센서 좌표가 있으면 그것, 없으면 목표 좌표(adjx/adjy)"""
+        p = self.sensor_pos.get(sensor)
+        return (p[0], p[1]) if p is not None else fallback
+
+    # -------------------- 배정 --------------------
+    def assign(self, sensor: int, target: Point, now: Optional[float] = None) -> Optional[Tuple[str, Optional[Point], bool]]:
+        """
+        가장 가까운 가용 로봇을 골라 busy 로 표시하고 목표 좌표로 옮긴다.
+        반환: (robot, 이전 좌표, 가용 로봇이었는지). 모두 busy면 가장 가까운 로봇을 재배정.
+        """
+        now = time.monotonic() if now is None else now
+        x, y = self.alarm_point(sensor, target)
+        with self._lock:
+            busy = self._busy_until
+            hit = self.robots.nearest(x, y, lambda r: busy.get(r, 0.0) <= now)
+            free = hit is not None
+            if hit is None:
+                hit = self.robots.nearest(x, y)
+                if hit is None:
+                    return None
+            robot = hit[0]
+            prev = self.robots.get(robot)
+            busy[robot] = now + self.busy_sec
+            # 명령 좌표를 새 위치로 (다음 알람부터 반영)
+            self.robots.put(robot, target[0], target[1])
+        return robot, prev, free
+
+    def cancel(self, robot: str, prev: Optional[Point]) -> None:
+        """전송 실패: busy 해제 + 위치 되돌리기"""
+        with self._lock:
+            self._busy_until.pop(robot, None)
+            if prev is not None and robot in self.robots:
+                self.robots.put(robot, prev[0], prev[1])
+
+    def release(self, robot: str) -> None:
+        """임무 완료 보고 시 즉시 가용으로"""
+        with self._lock:
+            self._busy_until.pop(robot, None)
+
+    def export(self) -> List[Tuple[str, float, float, float]]:
+        """스냅샷용 (robot, x, y, 남은 busy 초). busy 는 monotonic 기준이라 남은 시간으로 바꿔 둔다."""
+        now = time.monotonic()
+        with self._lock:
+            return [(r, x, y, max(0.0, self._busy_until.get(r, 0.0) - now)) for r, (x, y) in self.robots.items()]
+
+    def restore(self, rows: Iterable[Tuple[str, float, float, float]], elapsed: float = 0.0) -> int:
+        """export() 결과 반영. 설정에 있는 로봇만, busy 는 elapsed(스냅샷 이후 흐른 초)만큼 줄인다."""
+        now = time.monotonic()
+        n = 0
+        with self._lock:
+            for robot, x, y, left in rows:
+                if robot not in self.robots:
+                    continue
+                self.robots.put(robot, x, y)
+                if left - elapsed > 0:
+                    self._busy_until[robot] = now + left - elapsed
+                n += 1
+        return n
+
+    def stats(self) -> Dict[str, int]:
+        now = time.monotonic()
+        return {"robots": len(self.robots), "busy": sum(1 for t in self._busy_until.values() if t > now),
+                "sensors": len(self.sensor_pos)}
+
+
+# -------------------- 스펙 --------------------
+def load_robots(disp: RobotDispatcher, spec: str) -> int:
+    """--robots 인라인/JSON/CSV 로 로봇 등록. 등록한 로봇 수 반환."""
+    rows: List[Dict[str, Any]]
+    if os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            if spec.lower().endswith(".json"):
+                rows = json.load(f)
+            else:
+                rows = list(csv.DictReader(f))
+    else:
+        rows = []
+        for part in spec.split(";"):
+            name, sep, xy = part.strip().partition("=")
+            if not sep:
+                continue
+            x, _, y = xy.partition(",")
+            rows.append({"robot": name.strip(), "x": x, "y": y})
+    for row in rows:
+        disp.update_robot(str(row["robot"]), float(row["x"]), float(row["y"]))
+    return len(rows)
+
+
+def add_dispatch_args(ap) -> None:
+    ap.add_argument("--robots", default=os.getenv("ROBOTS", ""),
+                    help="다중 로봇 출동: 'Robot1=10,0;Robot2=40,5' 또는 JSON/CSV 파일. 비우면 --robot 하나로 전송.")
+    ap.add_argument("--robot-busy-sec", type=float, default=60.0,
+                    help="출동한 로봇을 가용 목록에서 빼 두는 시간(초)")
+    ap.add_argument("--grid-cell", type=float, default=10.0, help="로봇 공간 인덱스 격자 크기(좌표 단위)")
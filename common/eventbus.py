@@ -0,0 +1,33 @@
+"""
+프로세스 내 이벤트 버스 (통합 런타임에서 T2 → T3 직접 전달용).
+
+publish는 구독 함수를 호출 스레드에서 바로 실행한다. 구독 함수는 짧게 끝나야 하며
+(Streamer.start처럼 작업 스레드만 띄우고 반환), 예외는 로그만 남기고 삼킨다.
+"""
+import logging, threading
+from typing import Any, Callable, Dict, List
+
+log = logging.getLogger("bus")
+
+Handler = Callable[[Any, Any], None]  # (event, ref)
+
+
+class EventBus:
+    def __init__(self):
+        self._subs: Dict[str, List[Handler]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, fn: Handler) -> None:
+        with self._lock:
+            # 복사 후 교체: publish는 잠금 없이 목록을 읽는다
+            self._subs[topic] = self._subs.get(topic, []) + [fn]
+
+    def publish(self, topic: str, event: Any, ref: Any = None) -> int:
+        """전달한 구독자 수 반환"""
+        subs = self._subs.get(topic, ())
+        for fn in subs:
+            try:
+                fn(event, ref)
+            except Exception:
+                log.exception("[ERR] bus handler failed topic=%s", topic)
+        return len(subs)
@@ -0,0 +1,174 @@
+"""
+우선순위 레인: 알람/이상 메시지가 일반 측정값 뒤에서 기다리지 않도록 분리 처리.
+
+- high: 큐 하나 + 전용 스레드. 들어온 순서대로 하나씩 처리. 알람은 버리지 않는다:
+  high_max 는 경고 기준일 뿐이고 넘으면 큐가 그대로 늘어나며 over_max 로 센다.
+- low : 큐 하나 + 전용 스레드. 최대 low_batch 개씩 묶어 처리.
+  큐가 절반 이상 차면 low_sample 개 중 1개만 받고(sampled), 가득 차면 가장 오래된 항목을 버린다(full).
+각 레인의 대기+처리 지연과 버린(low)/한도 초과(high) 개수는 stats() 및 on_* 훅으로 보고한다.
+두 레인은 서로 다른 스레드라 레인 사이의 처리 순서는 보장하지 않는다 (레인 안에서는 들어온 순서).
+"""
+import collections, threading, time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+HIGH, LOW = "high", "low"
+
+
+class _Lane:
+    def __init__(self, name: str, maxlen: int):
+        self.name = name
+        self.maxlen = max(1, maxlen)
+        self.q: Deque[Tuple[float, Any]] = collections.deque()
+        self.cv = threading.Condition()
+        self.accepted = 0
+        self.processed = 0
+        self.shed: Dict[str, int] = {"full": 0, "sampled": 0}
+        self.over = 0
+        # 최근 지연(초) 표본. 보고 시 백분위 계산용
+        self.lat: Deque[float] = collections.deque(maxlen=2048)
+
+
+class PriorityLanes:
+    def __init__(self, process_high: Callable[[Any], None], process_low: Callable[[List[Any]], None], *,
+                 high_max: int = 1000, low_max: int = 10000, low_batch: int = 100, low_sample: int = 10,
+                 on_shed: Optional[Callable[[str, str, int], None]] = None,
+                 on_latency: Optional[Callable[[str, float], None]] = None,
+                 on_error: Optional[Callable[[str, BaseException], None]] = None):
+        self.process_high = process_high
+        self.process_low = process_low
+        self.low_batch = max(1, low_batch)
+        self.low_sample = max(1, low_sample)
+        self.on_shed = on_shed
+        self.on_latency = on_latency
+        self.on_error = on_error
+        self.high = _Lane(HIGH, high_max)
+        self.low = _Lane(LOW, low_max)
+        self._low_seen = 0
+        self._stop = False
+        self._threads = [
+            threading.Thread(target=self._run_high, name="lane-high", daemon=True),
+            threading.Thread(target=self._run_low, name="lane-low", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    # -------------------- 입력 (paho 스레드) --------------------
+    def submit(self, lane: str, item: Any, t_recv: Optional[float] = None) -> bool:
+        """False면 버려진 것 (low 레인만 버린다)"""
+        t = t_recv if t_recv is not None else time.perf_counter()
+        if lane == HIGH:
+            ln = self.high
+            with ln.cv:
+                # paho 스레드를 막지 않도록 기다리지 않고 큐를 늘린다
+                if len(ln.q) >= ln.maxlen:
+                    ln.over += 1
+                ln.q.append((t, item)); ln.accepted += 1
+                ln.cv.notify()
+            return True
+
+        ln = self.low
+        with ln.cv:
+            depth = len(ln.q)
+            if depth * 2 >= ln.maxlen and self.low_sample > 1:
+                self._low_seen += 1
+                if self._low_seen % self.low_sample:
+                    ln.shed["sampled"] += 1
+                    self._shed(LOW, "sampled")
+                    return False
+            if depth >= ln.maxlen:
+                ln.q.popleft()
+                ln.shed["full"] += 1
+                self._shed(LOW, "full")
+            ln.q.append((t, item)); ln.accepted += 1
+            ln.cv.notify()
+        return True
+
+    def _shed(self, lane: str, reason: str) -> None:
+        if self.on_shed:
+            self.on_shed(lane, reason, 1)
+
+    # -------------------- 처리 스레드 --------------------
+    def _done(self, ln: _Lane, stamps: List[float]) -> None:
+        now = time.perf_counter()
+        for t in stamps:
+            d = now - t
+            ln.lat.append(d)
+            if self.on_latency:
+                self.on_latency(ln.name, d)
+        ln.processed += len(stamps)
+
+    def _run_high(self) -> None:
+        ln = self.high
+        while True:
+            with ln.cv:
+                while not ln.q and not self._stop:
+                    ln.cv.wait()
+                if not ln.q:
+                    return
+                t, item = ln.q.popleft()
+            try:
+                self.process_high(item)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(HIGH, e)
+            self._done(ln, [t])
+
+    def _run_low(self) -> None:
+        ln = self.low
+        while True:
+            with ln.cv:
+                while not ln.q and not self._stop:
+                    ln.cv.wait()
+                if not ln.q:
+                    return
+                n = min(self.low_batch, len(ln.q))
+                batch = [ln.q.popleft() for _ in range(n)]
+            # 알람이 밀려 있으면 양보 (GIL 경쟁에서 high 스레드가 먼저 돌도록)
+            if self.high.q:
+                time.sleep(0)
+            try:
+                self.process_low([item for _, item in batch])
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(LOW, e)
+            self._done(ln, [t for t, _ in batch])
+
+    @property
+    def closed(self) -> bool:
+        return self._stop
+
+    def close(self, timeout: float = 2.0) -> None:
+        """남은 항목을 처리하고 스레드 종료"""
+        self._stop = True
+        for ln in (self.high, self.low):
+            with ln.cv:
+                ln.cv.notify_all()
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+    # -------------------- 보고 --------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for ln in (self.high, self.low):
+            lat = sorted(ln.lat)
+
+            def pct(p: float) -> Optional[float]:
+                if not lat:
+                    return None
+                return round(lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))] * 1000.0, 2)
+
+            out[ln.name] = {"depth": len(ln.q), "accepted": ln.accepted, "processed": ln.processed,
+                            "shed_full": ln.shed["full"], "shed_sampled": ln.shed["sampled"], "over_max": ln.over,
+                            "p50_ms": pct(50), "p99_ms": pct(99)}
+        return out
+
+
+def add_lane_args(ap) -> None:
+    ap.add_argument("--lanes", action="store_true",
+                    help="우선순위 레인 사용: 알람/이상 메시지는 high, 일반 측정값은 low (묶음/샘플링/버림)")
+    ap.add_argument("--high-max", type=int, default=1000, help="high 레인 경고 기준. 넘어도 버리지 않고 over_max 로 셈")
+    ap.add_argument("--low-max", type=int, default=10000, help="low 레인 큐 한도 (초과 시 오래된 것부터 버림)")
+    ap.add_argument("--low-batch", type=int, default=100, help="low 레인 한 번에 처리할 최대 개수")
+    ap.add_argument("--low-sample", type=int, default=10,
+                    help="low 큐가 절반 이상 차면 N개 중 1개만 받음. 1이면 샘플링 안 함.")
+    ap.add_argument("--lane-report-sec", type=float, default=30.0, help="[LANES] 상태 로그 주기(초). 0이면 끔.")
@@ -0,0 +1,178 @@
+"""
+메시지 경로용 로깅 설정.
+
+- text/json 포맷 (json은 한 줄에 레코드 하나)
+- 큐 기반 비동기 출력: paho 콜백 스레드는 큐에 넣기만 하고, 출력은 백그라운드 스레드가 담당.
+  큐가 가득 차면 블로킹 대신 버리고 개수를 센다.
+- 키별 속도 제한: extra의 rl_key가 같은 레코드는 rate_sec 동안 1건만 출력하고
+  나머지는 다음 출력 시 suppressed=N 으로 합산.
+
+사용:
+    log = logging.getLogger("t2")
+    listener = logutil.setup("t2", level="INFO", fmt="text", async_=True, rate_sec=1.0)
+    event(log, logging.INFO, "[SKIP] sensor %s: cooldown", 1, rl_key="skip:1", sensor=1)
+    ...
+    logutil.shutdown(listener)
+"""
+import json, logging, logging.handlers, queue, sys, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+
+def event(logger: logging.Logger, level: int, msg: str, *args: Any,
+          rl_key: Optional[str] = None, **fields: Any) -> None:
+    """레벨이 꺼져 있으면 포맷팅 없이 바로 반환. fields는 json 포맷에서 개별 키로 출력."""
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, msg, *args, extra={"fields": fields, "rl_key": rl_key})
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            out["suppressed"] = suppressed
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """기존 print 출력과 같은 '[TAG] ...' 형태. 억제된 건수가 있으면 뒤에 붙인다."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        s = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{s} (suppressed={suppressed})" if suppressed else s
+
+
+class RateLimitFilter(logging.Filter):
+    """rl_key 별로 rate_sec 동안 1건만 통과"""
+
+    def __init__(self, rate_sec: float):
+        super().__init__()
+        self.rate_sec = rate_sec
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "rl_key", None)
+        if not key or self.rate_sec <= 0:
+            return True
+        now = record.created
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.rate_sec:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            record.suppressed = self._suppressed.pop(key, 0)
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 호출 스레드를 막지 않고 버린다."""
+
+    def __init__(self, q: "queue.Queue"):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 포맷팅은 백그라운드 스레드에서. args 평가만 미리 해 둔다.
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_text = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _MaxLevel(logging.Filter):
+    def __init__(self, below: int):
+        super().__init__()
+        self.below = below
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno < self.below
+
+
+def setup(name: str, *, level: str = "INFO", fmt: str = "text", async_: bool = True,
+          rate_sec: float = 1.0, queue_size: int = 10000) -> Optional[logging.handlers.QueueListener]:
+    """
+    name 로거 설정. WARNING 미만은 stdout, 이상은 stderr.
+    async_=True면 QueueListener를 반환 (종료 시 shutdown()으로 flush).
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    logger.propagate = False
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+
+    formatter: logging.Formatter = JsonFormatter() if fmt == "json" else TextFormatter("%(message)s")
+    out = logging.StreamHandler(sys.stdout)
+    out.addFilter(_MaxLevel(logging.WARNING))
+    err = logging.StreamHandler(sys.stderr)
+    err.setLevel(logging.WARNING)
+    for h in (out, err):
+        h.setFormatter(formatter)
+
+    rl = RateLimitFilter(rate_sec)
+    if not async_:
+        for h in (out, err):
+            logger.addHandler(h)
+        logger.addFilter(rl)
+        return None
+
+    q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    qh = DroppingQueueHandler(q)
+    # 속도 제한은 큐에 넣기 전에 적용해 큐/포맷팅 비용 자체를 줄인다
+    qh.addFilter(rl)
+    logger.addHandler(qh)
+    listener = logging.handlers.QueueListener(q, out, err, respect_handler_level=True)
+    listener.start()
+    listener.queue_handler = qh  # type: ignore[attr-defined]
+    return listener
+
+
+def shutdown(listener: Optional[logging.handlers.QueueListener]) -> None:
+    if listener is None:
+        return
+    try:
+        listener.stop()
+    except Exception:
+        pass
+    qh = getattr(listener, "queue_handler", None)
+    if qh is not None and qh.dropped:
+        print(f"[WARN] log queue full: dropped {qh.dropped} records", file=sys.stderr)
+
+
+def add_log_args(ap) -> None:
+    """T2/T3 공통 로깅 CLI 인자"""
+    ap.add_argument("--log-level", default="INFO", help="DEBUG/INFO/WARNING/ERROR")
+    ap.add_argument("--log-format", default="text", choices=["text", "json"])
+    ap.add_argument("--log-sync", action="store_true", help="큐 없이 호출 스레드에서 바로 출력")
+    ap.add_argument("--log-rate-sec", type=float, default=1.0,
+                    help="반복 로그([SKIP]/[RAW] 등) 키별 최소 출력 간격(초). 0이면 제한 없음.")
+    ap.add_argument("--log-queue-size", type=int, default=10000)
+
+
+def setup_from_args(name: str, args) -> Optional[logging.handlers.QueueListener]:
+    return setup(name, level=args.log_level, fmt=args.log_format, async_=not args.log_sync,
+                 rate_sec=args.log_rate_sec, queue_size=args.log_queue_size)
@@ -0,0 +1,159 @@
+"""
+Prometheus 텍스트 포맷 메트릭 (외부 의존성 없음).
+
+비활성 시 비용을 없애기 위해 호출부는 `metrics`가 None인지 먼저 확인한다.
+    m = self.metrics
+    if m: m.messages.inc(topic, shape)
+"""
+import bisect, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, help_: str, labels: Sequence[str] = ()):
+        self.name = name; self.help = help_; self.labels = tuple(labels)
+        self._vals: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._vals[key] = self._vals.get(key, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._vals.get(tuple(str(v) for v in label_values), 0.0)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._vals.items())
+        for key, v in items:
+            out.append(f"{self.name}{_fmt_labels(self.labels, key)} {_fmt_num(v)}")
+        return out
+
+
+class Gauge(Counter):
+    def set(self, value: float, *label_values) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._vals[key] = float(value)
+
+    def render(self) -> List[str]:
+        out = super().render()
+        out[1] = f"# TYPE {self.name} gauge"
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help_: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name; self.help = help_; self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._vals: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        key = tuple(str(v) for v in label_values)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._vals.get(key)
+            if row is None:
+                row = self._vals[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._vals.items())
+        for key, row in items:
+            acc = 0.0
+            for b, c in zip(self.buckets + (float("inf"),), row[:-1]):
+                acc += c
+                le = f'le="{_fmt_num(b)}"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {_fmt_num(acc)}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_num(row[-1])}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {_fmt_num(acc)}")
+        return out
+
+
+class Registry:
+    """메트릭 모음. namespace가 있으면 이름 앞에 '{namespace}_' 를 붙인다."""
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        self._metrics: List = []
+        self._lock = threading.Lock()
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def _add(self, m):
+        with self._lock:
+            self._metrics.append(m)
+        return m
+
+    def counter(self, name: str, help_: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self._name(name), help_, labels))
+
+    def gauge(self, name: str, help_: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(self._name(name), help_, labels))
+
+    def histogram(self, name: str, help_: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(self._name(name), help_, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+def serve(registry: Union[Registry, Sequence[Registry]], port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """GET /metrics 를 데몬 스레드에서 제공. 레지스트리 여러 개면 이어 붙여 출력."""
+    registries = list(registry) if isinstance(registry, (list, tuple)) else [registry]
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_response(404); self.end_headers(); return
+            body = "".join(r.render() for r in registries).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
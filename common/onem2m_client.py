@@ -0,0 +1,135 @@
+"""
+Mobius(oneM2M) HTTP 클라이언트 (keep-alive 커넥션 풀 + CIN 일괄 생성).
+
+- post_cin(path, con)          : CIN 1건
+- post_cin_async(path, con)    : 풀 스레드에서 전송하고 Future 반환
+- post_cin_batch([(path, con)]): 여러 CIN을 풀의 keep-alive 커넥션에 동시에 실어 보냄.
+  requests는 HTTP/1.1 파이프라이닝을 지원하지 않으므로 커넥션 여러 개로 병렬 전송한다.
+  같은 컨테이너(path)의 CIN은 입력 순서대로 한 줄로 보내고(ct 순서 유지), 컨테이너끼리만 병렬.
+  CSE가 동시 요청을 거부하면(연결 오류, 429/503) 그 줄을 멈추고, serial_sec 동안 일괄 전송을
+  순차 전송으로 낮춘 뒤 멈춘 항목(한 번 재시도)부터 순서대로 마저 보낸다.
+"""
+import json, threading, time, uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (ok, HTTP status(예외면 0), 응답 본문 또는 오류 문자열)
+CinResult = Tuple[bool, int, str]
+
+# 동시 요청 미지원으로 보고 순차 전송으로 폴백할 상태 코드
+_BATCH_REJECT = (429, 503)
+
+
+class Onem2mClient:
+    transport = "http"
+
+    def __init__(self, base: str, origin: str, *, timeout: float = 10.0, rvi: str = "3",
+                 pool_size: int = 8, max_inflight: int = 4, serial_sec: float = 30.0):
+        self.base = base.rstrip("/")
+        self.origin = origin
+        self.timeout = timeout
+        self.rvi = rvi
+        self.max_inflight = max(1, max_inflight)
+        self.serial_sec = serial_sec
+        # 동시 전송 거부 후 이 시각(monotonic)까지는 순차 전송
+        self._serial_until = 0.0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, self.max_inflight),
+                              pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # -------------------- 헤더 --------------------
+    def headers(self, ty: Optional[int] = None, *, include_rvi: bool = True) -> Dict[str, str]:
+        h = {"X-M2M-Origin": self.origin, "X-M2M-RI": str(uuid.uuid4()), "Accept": "application/json"}
+        if include_rvi:
+            h["X-M2M-RVI"] = self.rvi
+        h["Content-Type"] = f"application/json;ty={ty}" if ty is not None else "application/json"
+        return h
+
+    def url(self, path: str) -> str:
+        if not path.startswith("/"):
+            path = "/" + path
+        if path.startswith("/Mobius/"):
+            path = path[len("/Mobius"):]
+        return f"{self.base}{path}"
+
+    # -------------------- 요청 --------------------
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        return self.session.get(self.url(path), params=params, timeout=self.timeout,
+                                headers=self.headers())
+
+    def post_cin(self, path: str, con: Any, *, stringify: bool = True) -> CinResult:
+        body = {"m2m:cin": {"cnf": "application/json",
+                            "con": json.dumps(con, ensure_ascii=False) if stringify else con}}
+        try:
+            resp = self.session.post(self.url(path) + "?ty=4", headers=self.headers(ty=4), json=body,
+                                     timeout=self.timeout)
+        except Exception as e:
+            return False, 0, str(e)
+        return resp.status_code in (200, 201), resp.status_code, resp.text
+
+    def post_cin_async(self, path: str, con: Any, *, stringify: bool = True) -> Future:
+        """풀 스레드에서 post_cin 실행 (Onem2mMqttTransport.post_cin_async 와 같은 모양)"""
+        return self._executor().submit(self.post_cin, path, con, stringify=stringify)
+
+    @property
+    def batch_ok(self) -> bool:
+        """지금 컨테이너끼리 병렬 전송해도 되는지"""
+        return self.max_inflight > 1 and time.monotonic() >= self._serial_until
+
+    def post_cin_batch(self, items: List[Tuple[str, Any]], *, stringify: bool = True) -> List[CinResult]:
+        """입력 순서대로 결과 반환"""
+        lanes: Dict[str, List[int]] = {}
+        for i, (p, _) in enumerate(items):
+            lanes.setdefault(p, []).append(i)
+        if len(lanes) <= 1 or not self.batch_ok:
+            return [self.post_cin(p, c, stringify=stringify) for p, c in items]
+
+        results: List[Optional[CinResult]] = [None] * len(items)
+
+        def run(idx: List[int]) -> int:
+            """한 컨테이너를 순서대로. 거부로 보이는 실패에서 멈추고 그 위치 반환 (다 보냈으면 len)"""
+            for n, i in enumerate(idx):
+                p, c = items[i]
+                r = results[i] = self.post_cin(p, c, stringify=stringify)
+                if not r[0] and (r[1] in _BATCH_REJECT or r[1] == 0):
+                    return n
+            return len(idx)
+
+        pool = self._executor()
+        futs = [(idx, pool.submit(run, idx)) for idx in lanes.values()]
+        stops = [(idx, f.result()) for idx, f in futs]
+
+        # 일부만 연결 실패한 경우도 동시 요청 거부로 본다 (전부 실패면 CSE 자체 장애)
+        any_ok = any(r is not None and r[0] for r in results)
+        for idx, stop in stops:
+            if stop >= len(idx):
+                continue
+            status = results[idx[stop]][1]
+            if status in _BATCH_REJECT or (status == 0 and any_ok):
+                # 동시 전송 거부로 보고 한동안 순차 전송, 멈춘 항목부터 다시
+                self._serial_until = time.monotonic() + self.serial_sec
+            else:
+                stop += 1
+            for i in idx[stop:]:
+                p, c = items[i]
+                results[i] = self.post_cin(p, c, stringify=stringify)
+        return results  # type: ignore[return-value]
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_inflight,
+                                                thread_name_prefix="onem2m-http")
+            return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,153 @@
+"""
+oneM2M MQTT 바인딩 요청 전송 (기존 paho 연결 재사용).
+
+- 요청: /oneM2M/req/{origin}/{cse_id}/json 에 {op, to, fr, rqi, rvi, ty, pc} 발행
+- 응답: /oneM2M/resp/{origin}/{cse_id}/json 을 구독해 rqi로 Future와 짝지음
+- 한 연결에서 여러 요청을 동시에 보낼 수 있고, 요청마다 timeout 초가 지나면
+  Future는 (False, 0, "timeout") 으로 끝난다.
+
+주의: paho 콜백(네트워크 루프) 스레드에서 결과를 기다리면 응답을 받을 스레드가
+막혀 교착된다. 콜백 안에서는 *_async + add_done_callback 을 쓰고, 블로킹 메서드는
+다른 스레드(Streamer 등)에서만 호출한다.
+"""
+import collections, json, os, threading, time, uuid
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from common.onem2m_client import CinResult
+
+OP_CREATE, OP_RETRIEVE, OP_UPDATE, OP_DELETE, OP_NOTIFY = 1, 2, 3, 4, 5
+
+
+class Onem2mMqttTransport:
+    transport = "mqtt"
+
+    def __init__(self, client, origin: str, cse_id: str, *, cb_name: str = "Mobius",
+                 qos: int = 1, timeout: float = 10.0, rvi: str = "3"):
+        self.client = client
+        self.origin = origin
+        self.cse_id = cse_id
+        self.cb_name = cb_name.strip("/")
+        self.qos = qos
+        self.timeout = timeout
+        self.rvi = rvi
+        self.req_topic = f"/oneM2M/req/{origin}/{cse_id}/json"
+        self.resp_topic = f"/oneM2M/resp/{origin}/{cse_id}/json"
+        self._pending: Dict[str, Future] = {}
+        self._deadlines: Deque[Tuple[float, str]] = collections.deque()
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        client.message_callback_add(self.resp_topic, self._on_response)
+
+    # -------------------- 연결 --------------------
+    def subscribe(self) -> None:
+        """on_connect 에서 호출 (재접속 시 재구독)"""
+        self.client.subscribe(self.resp_topic, qos=self.qos)
+
+    def _on_loop_thread(self) -> bool:
+        t = getattr(self.client, "_thread", None)
+        return t is not None and t is threading.current_thread()
+
+    # -------------------- 요청 --------------------
+    def to_path(self, path: str) -> str:
+        if not path.startswith("/"):
+            path = "/" + path
+        if not path.startswith(f"/{self.cb_name}/"):
+            path = f"/{self.cb_name}{path}"
+        return path
+
+    def request(self, op: int, path: str, *, ty: Optional[int] = None, pc: Any = None) -> Future:
+        rqi = str(uuid.uuid4())
+        req: Dict[str, Any] = {"op": op, "to": self.to_path(path), "fr": self.origin,
+                               "rqi": rqi, "rvi": self.rvi}
+        if ty is not None:
+            req["ty"] = ty
+        if pc is not None:
+            req["pc"] = pc
+        fut: Future = Future()
+        with self._lock:
+            self._pending[rqi] = fut
+            self._deadlines.append((time.monotonic() + self.timeout, rqi))
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="onem2m-mqtt-reaper", daemon=True)
+                self._reaper.start()
+        info = self.client.publish(self.req_topic, json.dumps(req, ensure_ascii=False), qos=self.qos)
+        if getattr(info, "rc", 0) != 0:
+            self._finish(rqi, None, f"publish rc={info.rc}")
+        return fut
+
+    def _on_response(self, client, userdata, msg) -> None:
+        try:
+            obj = json.loads(msg.payload)
+        except Exception:
+            return
+        if isinstance(obj, dict) and isinstance(obj.get("m2m:rsp"), dict):
+            obj = obj["m2m:rsp"]
+        if isinstance(obj, dict) and obj.get("rqi"):
+            self._finish(str(obj["rqi"]), obj, None)
+
+    def _finish(self, rqi: str, rsp: Optional[Dict[str, Any]], err: Optional[str]) -> None:
+        with self._lock:
+            fut = self._pending.pop(rqi, None)
+        if fut is None or fut.done():
+            return
+        if rsp is None:
+            fut.set_result((False, 0, err or "timeout"))
+            return
+        try:
+            rsc = int(rsp.get("rsc", 0))
+        except Exception:
+            rsc = 0
+        text = json.dumps(rsp.get("pc"), ensure_ascii=False) if "pc" in rsp else ""
+        fut.set_result((rsc in (2000, 2001, 2002, 2004), rsc, text))
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(0.05)
+            now = time.monotonic()
+            expired: List[str] = []
+            with self._lock:
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    _, rqi = self._deadlines.popleft()
+                    if rqi in self._pending:
+                        expired.append(rqi)
+            for rqi in expired:
+                self._finish(rqi, None, "timeout")
+
+    # -------------------- CIN (Onem2mClient 와 같은 모양) --------------------
+    def post_cin_async(self, path: str, con: Any, *, stringify: bool = True) -> Future:
+        pc = {"m2m:cin": {"cnf": "application/json",
+                          "con": json.dumps(con, ensure_ascii=False) if stringify else con}}
+        return self.request(OP_CREATE, path, ty=4, pc=pc)
+
+    def post_cin(self, path: str, con: Any, *, stringify: bool = True) -> CinResult:
+        if self._on_loop_thread():
+            raise RuntimeError("blocking MQTT request on the paho loop thread; use post_cin_async")
+        return self.post_cin_async(path, con, stringify=stringify).result()
+
+    def post_cin_batch(self, items: List[Tuple[str, Any]], *, stringify: bool = True) -> List[CinResult]:
+        """모든 요청을 먼저 발행하고 응답을 기다린다 (한 연결에서 동시 진행)"""
+        if self._on_loop_thread():
+            raise RuntimeError("blocking MQTT request on the paho loop thread; use post_cin_async")
+        futs = [self.post_cin_async(p, c, stringify=stringify) for p, c in items]
+        return [f.result() for f in futs]
+
+    def retrieve(self, path: str) -> Future:
+        return self.request(OP_RETRIEVE, path)
+
+
+def add_transport_args(ap, *ops: str) -> None:
+    """--transport-{op} http|mqtt (작업별 선택) + MQTT 요청 대상 CSE 인자"""
+    for op in ops:
+        ap.add_argument(f"--transport-{op}", choices=["http", "mqtt"],
+                        default=os.getenv(f"{op.upper()}_TRANSPORT", "http"),
+                        help=f"{op} CIN 전송 경로. mqtt면 /oneM2M/req/{{origin}}/{{req-cse-id}}/json 으로 발행.")
+    ap.add_argument("--req-cse-id", default=os.getenv("ONEM2M_REQ_CSE_ID", "Mobius2"),
+                    help="MQTT 요청 토픽의 수신 CSE-ID")
+    ap.add_argument("--req-cb", default=os.getenv("ONEM2M_CB", "Mobius"),
+                    help="MQTT 요청 to 경로 앞에 붙일 CSEBase 이름")
+
+
+def from_args(client, args) -> Onem2mMqttTransport:
+    return Onem2mMqttTransport(client, args.origin, args.req_cse_id, cb_name=args.req_cb,
+                               qos=args.qos, timeout=args.timeout)
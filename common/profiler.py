@@ -0,0 +1,214 @@
+"""
+실행 중인 T2/T3 프로세스용 통계적(샘플링) 프로파일러.
+
+별도 스레드가 주기적으로 sys._current_frames()를 읽어 모든 스레드(paho 콜백,
+Streamer, 워커 등)의 스택을 수집한다. 대상 코드에는 아무 훅도 걸지 않으므로
+꺼져 있을 때 비용이 없고, 켜져 있을 때도 샘플 주기만큼만 GIL을 잠깐 잡는다.
+
+출력 (out_dir/profile-<시각>.*):
+- .collapsed          : flamegraph.pl / speedscope 호환 folded stack
+- .speedscope.json    : speedscope 스레드별 sampled 프로파일
+- .summary.txt        : 함수별 self/inclusive 시간 + 관심 함수(파서/라벨/CIN/JSON/정규식) 요약
+
+트리거:
+- --profile SEC        : 시작 직후 SEC초 동안 수집
+- SIGUSR1              : --profile-sec 초 동안 수집 (이미 수집 중이면 무시)
+"""
+import json, os, signal, sys, threading, time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+FrameKey = Tuple[str, str, int]  # (파일, 함수, 첫 줄)
+
+# 요약에 따로 묶어 보여줄 관심 함수. 값은 함수명 접두어.
+WATCH = {
+    "parse_notification": ("parse_notification",),
+    "extract_fields": ("extract_fields",),
+    "get_cnt_labels": ("get_cnt_labels",),
+    "post_cin_*": ("post_cin_",),
+    # 정규식 위주 함수. 컴파일된 패턴의 search()는 C 함수라 호출한 파이썬 함수로 잡힌다.
+    "sensor_no/path regex": ("guess_sensor_no", "derive_sensor_cnt_paths", "extract_sensor_no_from_sid"),
+}
+
+
+def _category(key: FrameKey) -> Optional[str]:
+    path, func, _ = key
+    norm = path.replace("\\", "/")
+    if "/json/" in norm:
+        return "json"
+    if norm.endswith(("/re.py", "/sre_compile.py", "/sre_parse.py")) or "/re/" in norm:
+        return "regex"
+    for name, prefixes in WATCH.items():
+        if func.startswith(prefixes):
+            return name
+    return None
+
+
+def _label(key: FrameKey) -> str:
+    path, func, line = key
+    return f"{func} ({os.path.basename(path)}:{line})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        # (스레드 이름, 루트→리프 프레임 튜플) -> 샘플 수
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.started_at = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self.stacks.clear(); self.samples = 0
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack: List[FrameKey] = []
+                f = frame
+                while f is not None:
+                    co = f.f_code
+                    stack.append((co.co_filename, co.co_name, co.co_firstlineno))
+                    f = f.f_back
+                stack.reverse()
+                self.stacks[(names.get(ident, str(ident)), tuple(stack))] += 1
+            self.samples += 1
+
+    # -------------------- 출력 --------------------
+    def collapsed(self) -> str:
+        lines = []
+        for (tname, stack), n in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+            lines.append(";".join([tname] + [_label(k) for k in stack]) + f" {n}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> Dict:
+        frames: List[Dict] = []
+        index: Dict[FrameKey, int] = {}
+        by_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+        for (tname, stack), n in self.stacks.items():
+            ids = []
+            for k in stack:
+                if k not in index:
+                    index[k] = len(frames)
+                    frames.append({"name": k[1], "file": k[0], "line": k[2]})
+                ids.append(index[k])
+            samples, weights = by_thread.setdefault(tname, ([], []))
+            samples.append(ids); weights.append(n * self.interval)
+        profiles = []
+        for tname, (samples, weights) in sorted(by_thread.items()):
+            profiles.append({"type": "sampled", "name": tname, "unit": "seconds",
+                             "startValue": 0, "endValue": sum(weights),
+                             "samples": samples, "weights": weights})
+        return {"$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": name, "exporter": "common.profiler",
+                "shared": {"frames": frames}, "profiles": profiles}
+
+    def summary(self, top: int = 30) -> str:
+        self_cnt: Counter = Counter()
+        incl_cnt: Counter = Counter()
+        cat_cnt: Counter = Counter()
+        for (_, stack), n in self.stacks.items():
+            if not stack:
+                continue
+            self_cnt[stack[-1]] += n
+            for k in set(stack):
+                incl_cnt[k] += n
+            for c in {c for c in map(_category, stack) if c}:
+                cat_cnt[c] += n
+        ms = self.interval * 1000.0
+        out = [f"# samples={self.samples} interval={self.interval * 1000:.1f}ms "
+               f"elapsed={self.elapsed:.1f}s threads={len({t for t, _ in self.stacks})}",
+               "",
+               "## watched (inclusive, all threads)"]
+        for c in list(WATCH) + ["json", "regex"]:
+            out.append(f"{c:<22} {cat_cnt.get(c, 0) * ms:>10.1f} ms  ({cat_cnt.get(c, 0)} samples)")
+        out += ["", f"## top {top} by self time", f"{'self_ms':>10} {'incl_ms':>10}  function"]
+        for k, n in self_cnt.most_common(top):
+            out.append(f"{n * ms:>10.1f} {incl_cnt[k] * ms:>10.1f}  {_label(k)}")
+        out += ["", f"## top {top} by inclusive time", f"{'incl_ms':>10} {'self_ms':>10}  function"]
+        for k, n in incl_cnt.most_common(top):
+            out.append(f"{n * ms:>10.1f} {self_cnt.get(k, 0) * ms:>10.1f}  {_label(k)}")
+        return "\n".join(out) + "\n"
+
+    def write(self, out_dir: str, name: str) -> str:
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.join(out_dir, f"profile-{name}-{datetime.now().strftime('%Y%m%dT%H%M%S')}")
+        with open(stem + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        with open(stem + ".speedscope.json", "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(name), f)
+        with open(stem + ".summary.txt", "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        return stem
+
+
+class ProfileTrigger:
+    """--profile / SIGUSR1 로 SamplingProfiler를 N초 동안 돌리고 결과를 파일로 남긴다."""
+
+    def __init__(self, name: str, out_dir: str, *, hz: float = 100.0,
+                 on_done: Optional[Callable[[str], None]] = None):
+        self.name = name; self.out_dir = out_dir
+        self.prof = SamplingProfiler(interval=1.0 / max(1.0, hz))
+        self.on_done = on_done
+        self._lock = threading.Lock()
+
+    def run_for(self, seconds: float) -> bool:
+        with self._lock:
+            if self.prof.running:
+                return False
+            self.prof.start()
+        t = threading.Timer(seconds, self._finish)
+        t.daemon = True
+        t.start()
+        return True
+
+    def _finish(self) -> None:
+        self.prof.stop()
+        stem = self.prof.write(self.out_dir, self.name)
+        if self.on_done:
+            self.on_done(stem)
+
+
+def add_profile_args(ap) -> None:
+    ap.add_argument("--profile", type=float, default=0.0,
+                    help="시작 직후 N초 동안 샘플링 프로파일 수집 (0이면 끔)")
+    ap.add_argument("--profile-sec", type=float, default=30.0, help="SIGUSR1 수신 시 수집 시간(초)")
+    ap.add_argument("--profile-hz", type=float, default=100.0, help="초당 샘플 수")
+    ap.add_argument("--profile-dir", default=os.getenv("PROFILE_DIR", "profiles"))
+
+
+def install(name: str, args, *, on_start: Optional[Callable[[float], None]] = None,
+            on_done: Optional[Callable[[str], None]] = None) -> ProfileTrigger:
+    """--profile 즉시 실행 + SIGUSR1 핸들러 등록 (메인 스레드에서 호출)"""
+    trig = ProfileTrigger(name, args.profile_dir, hz=args.profile_hz, on_done=on_done)
+
+    def _start(sec: float) -> None:
+        if trig.run_for(sec) and on_start:
+            on_start(sec)
+
+    if args.profile > 0:
+        _start(args.profile)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: _start(args.profile_sec))
+    return trig
@@ -0,0 +1,165 @@
+"""
+센서별 구간 집계(rollup): 측정값이 들어올 때마다 창별 누적값만 갱신하고,
+창이 끝나면 CIN 하나(min/max/mean/rate-of-rise/alarm 수)로 묶어 일괄 전송.
+
+- 창 경계는 수신 시각(clock(), 기본 time.time()) 기준 floor(t / w) * w. 센서 ts 문자열은 형식이 제각각이라 쓰지 않는다.
+- 같은 센서의 다음 창 값이 오면 이전 창을 닫고, 값이 끊긴 센서는 창 끝 + grace 초가 지나면 닫는다.
+- 닫힌 창은 flush_sec 마다 post_batch([(path, con), ...]) 로 한 번에 보낸다 (Onem2mClient.post_cin_batch).
+- rate-of-rise(ror)는 창 안 첫 값→마지막 값 기울기(°C/분). 값이 하나면 0.
+"""
+import math, os, threading, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from common.onem2m_client import CinResult
+
+Item = Tuple[str, Dict[str, Any]]
+
+
+class _Window:
+    __slots__ = ("start", "n", "lo", "hi", "total", "t_first", "v_first", "t_last", "v_last", "alarms")
+
+    def __init__(self, start: float, t: float, v: float, fire: int):
+        self.start = start
+        self.n = 1
+        self.lo = self.hi = self.total = v
+        self.t_first = self.t_last = t
+        self.v_first = self.v_last = v
+        self.alarms = fire
+
+    def add(self, t: float, v: float, fire: int) -> None:
+        self.n += 1
+        if v < self.lo:
+            self.lo = v
+        if v > self.hi:
+            self.hi = v
+        self.total += v
+        self.t_last, self.v_last = t, v
+        self.alarms += fire
+
+
+def _iso(t: float) -> str:
+    return datetime.fromtimestamp(t, tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+
+class RollupAggregator:
+    """
+    sensor 는 센서 상태 key (T2 는 SensorRecord.key). CIN 의 "sensor" 에는 add(no=) 로 받은 번호를 쓴다.
+    path_for(sensor, window) -> 대상 컨테이너 경로
+    post_batch(items) -> [CinResult]  (items: [(path, con)])
+    on_result(ok, err, seconds): 전송 결과 훅 (메트릭/로그용)
+    clock: 창 경계/마감 판단용 시각 함수 (기본 time.time, 테스트에서 주입)
+    """
+
+    def __init__(self, windows: Sequence[int], path_for: Callable[[int, int], str],
+                 post_batch: Callable[[List[Item]], List[CinResult]], *,
+                 flush_sec: float = 5.0, grace_sec: float = 2.0,
+                 on_result: Optional[Callable[[int, int, float], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.windows = tuple(sorted({int(w) for w in windows if int(w) > 0}))
+        self.path_for = path_for
+        self.post_batch = post_batch
+        self.flush_sec = flush_sec
+        self.grace_sec = grace_sec
+        self.on_result = on_result
+        self.clock = clock
+        self._open: Dict[Tuple[int, int], _Window] = {}
+        self._sid: Dict[int, str] = {}
+        self._no: Dict[int, int] = {}
+        self._closed: List[Item] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.posted = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="rollup-flush", daemon=True)
+        self._thread.start()
+
+    # -------------------- 누적 (O(창 개수)) --------------------
+    def add(self, sensor: int, temp: float, fire: int, *, sid: Optional[str] = None,
+            no: Optional[int] = None, now: Optional[float] = None) -> None:
+        t = self.clock() if now is None else now
+        with self._lock:
+            if sid:
+                self._sid[sensor] = sid
+            if no is not None:
+                self._no[sensor] = no
+            for w in self.windows:
+                start = math.floor(t / w) * w
+                key = (sensor, w)
+                win = self._open.get(key)
+                if win is not None and win.start == start:
+                    win.add(t, temp, fire)
+                    continue
+                if win is not None:
+                    self._closed.append(self._item(sensor, w, win, partial=False))
+                self._open[key] = _Window(start, t, temp, fire)
+
+    def _item(self, sensor: int, w: int, win: _Window, *, partial: bool) -> Item:
+        dt = win.t_last - win.t_first
+        con: Dict[str, Any] = {
+            "sensor": self._no.get(sensor, sensor), "w": w, "t0": _iso(win.start), "n": win.n,
+            "min": round(win.lo, 1), "max": round(win.hi, 1), "mean": round(win.total / win.n, 2),
+            "ror": round((win.v_last - win.v_first) / dt * 60.0, 2) if dt > 0 else 0.0,
+            "alarms": win.alarms,
+        }
+        sid = self._sid.get(sensor)
+        if sid:
+            con["sid"] = sid
+        if partial:
+            con["partial"] = True
+        return self.path_for(sensor, w), con
+
+    # -------------------- 전송 --------------------
+    def _collect(self, now: float, *, everything: bool = False) -> List[Item]:
+        with self._lock:
+            out, self._closed = self._closed, []
+            for key, win in list(self._open.items()):
+                sensor, w = key
+                ended = now >= win.start + w + self.grace_sec
+                if ended or everything:
+                    out.append(self._item(sensor, w, win, partial=not ended))
+                    del self._open[key]
+        return out
+
+    def flush(self, *, everything: bool = False) -> int:
+        items = self._collect(self.clock(), everything=everything)
+        if not items:
+            return 0
+        t0 = time.perf_counter()
+        try:
+            results = self.post_batch(items)
+            ok = sum(1 for r in results if r[0])
+        except Exception:
+            ok = 0
+        err = len(items) - ok
+        self.posted += ok
+        self.failed += err
+        if self.on_result:
+            self.on_result(ok, err, time.perf_counter() - t0)
+        return len(items)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_sec):
+            self.flush()
+
+    def close(self) -> None:
+        """진행 중 창까지 partial 로 보내고 종료"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.flush_sec + 1.0)
+        self.flush(everything=True)
+
+
+def add_rollup_args(ap) -> None:
+    ap.add_argument("--rollup-windows", default=os.getenv("ROLLUP_WINDOWS", ""),
+                    help="센서별 집계 창(초, 콤마 구분. 예: 10,60). 비우면 집계 안 함.")
+    ap.add_argument("--rollup-path", default=os.getenv("ROLLUP_PATH", "{sensor_path}/rollup"),
+                    help="집계 CIN 컨테이너 경로 템플릿. {ae} {sensor} {sensor_path} {window} 사용 가능.")
+    ap.add_argument("--rollup-flush-sec", type=float, default=5.0, help="닫힌 창 일괄 전송 주기(초)")
+    ap.add_argument("--rollup-grace-sec", type=float, default=2.0,
+                    help="값이 끊긴 센서의 창을 창 끝 이후 이만큼 기다렸다 닫음(초)")
+
+
+def parse_windows(spec: str) -> List[int]:
+    return [int(float(v)) for v in spec.split(",") if v.strip()]
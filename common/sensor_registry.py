@@ -0,0 +1,308 @@
+"""
+센서 라우팅 테이블: topic / sur / sid → 센서 레코드.
+
+시작 시 프로비저닝 스펙(--sensor-spec) 또는 Mobius 라벨 조회(--sensor-discover)로
+채워 두고, 메시지마다 정규식 대신 dict/트라이 조회로 센서를 찾는다.
+- sur: 정확한 문자열 dict → 없으면 컨테이너 경로 트라이(경로 깊이만큼) → 없으면 정규식 폴백
+- sid: dict → 없으면 정규식 폴백
+- 폴백으로 찾은 결과(못 찾은 것 포함)는 학습해 다음부터 dict 한 번으로 끝난다.
+  학습 항목은 max_learned 개까지만 (임의 sur/sid 로 무한히 커지지 않도록).
+조회 비용은 센서/리전 수와 무관하다.
+
+센서 식별은 번호가 아니라 정규화된 컨테이너 경로다. 리전/홀이 달라 번호가 같은 센서(예: Hall/Sensor1,
+Lab/Sensor1)는 서로 다른 레코드이고, rec.key(sensor_key: 경로 crc32 + 번호)로 라벨/쿨다운/출동/커서
+상태도 따로 둔다. 경로를 모르는 센서(sid 폴백 등)는 key == no.
+
+스펙 형식:
+- JSON: [{"sensor": 1, "sid": "C-S1", "path": "/Meta-Sejong/Chungmu-hall/Sensor1", "topics": [...]}]
+- CSV : sensor,sid,path 헤더
+- YAML: fd 의 dt-bootstrap.yaml (ae.rn / tree 의 rn, lbl, nu 만 읽음. PyYAML 불필요)
+"""
+import csv, json, os, re, sys, threading, zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_SENSOR_RN = re.compile(r"^Sensor(\d+)$")
+_LBL_SID = re.compile(r"\bsid\s*[:=]\s*([A-Za-z0-9._\-]+)", re.I)
+_NU_ID = re.compile(r"^mqtts?://[^/]+/([^?]+)")
+
+_MISS = object()  # 학습된 "없음"
+
+
+def sensor_key(no: int, path: Optional[str]) -> int:
+    """
+    센서 상태 키 (shared_state/dispatch/catchup/rollup 에 넘기는 정수).
+    경로가 있으면 (경로 crc32 << 24) | 번호 라 프로세스/재시작이 달라도 같은 값이고 int64 안에 들어간다.
+    """
+    if not path:
+        return no
+    return (zlib.crc32(path.encode("utf-8")) << 24) | (no & 0xFFFFFF)
+
+
+class SensorRecord:
+    __slots__ = ("no", "key", "sid", "path", "lbl", "_cnt_paths")
+
+    def __init__(self, no: int, sid: Optional[str] = None, path: Optional[str] = None,
+                 lbl: Optional[List[str]] = None):
+        self.no = no
+        self.sid = sys.intern(sid) if sid else None
+        self.path = sys.intern(path) if path else None
+        self.key = sensor_key(no, self.path)
+        self.lbl = lbl
+        self._cnt_paths: Optional[Tuple[str, List[str]]] = None
+
+    def cnt_paths(self, ae: str) -> List[str]:
+        """라벨 GET 후보 경로 (derive_sensor_cnt_paths 와 같은 순서, 1회 계산)"""
+        cached = self._cnt_paths
+        if cached is not None and cached[0] == ae:
+            return cached[1]
+        paths = [f"/{ae}/Sensor{self.no}"]
+        if self.path and self.path != paths[0]:
+            paths.insert(0, self.path)
+        self._cnt_paths = (ae, paths)
+        return paths
+
+    def __repr__(self) -> str:
+        return f"SensorRecord(no={self.no}, key={self.key}, sid={self.sid!r}, path={self.path!r})"
+
+
+def _segments(path: str) -> List[str]:
+    return [s for s in path.split("/") if s]
+
+
+class SensorRegistry:
+    """
+    sur_fallback(sur) -> (sensor_no, container_path|None) | None
+    sid_fallback(sid) -> sensor_no | None
+    """
+
+    def __init__(self, *, sur_fallback: Optional[Callable[[str], Optional[Tuple[int, Optional[str]]]]] = None,
+                 sid_fallback: Optional[Callable[[str], Optional[int]]] = None,
+                 max_learned: int = 4096):
+        self.sur_fallback = sur_fallback
+        self.sid_fallback = sid_fallback
+        self.max_learned = max_learned
+        self.records: List[SensorRecord] = []
+        # 번호 → 그 번호의 레코드들 (경로가 다르면 여러 개). 상태 조회는 by_key 로.
+        self.by_no: Dict[int, List[SensorRecord]] = {}
+        self.by_key: Dict[int, SensorRecord] = {}
+        self.by_path: Dict[str, SensorRecord] = {}
+        self.by_sur: Dict[str, Any] = {}
+        self.by_sid: Dict[str, Any] = {}
+        self.by_topic_id: Dict[str, SensorRecord] = {}
+        self._trie: Dict[str, Any] = {}
+        self._learned = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+
+    # -------------------- 등록 --------------------
+    def add(self, no: int, *, sid: Optional[str] = None, path: Optional[str] = None,
+            lbl: Optional[List[str]] = None, topic_ids: Iterable[str] = ()) -> SensorRecord:
+        if path:
+            segs = _segments(path)
+            if segs and segs[0] == "Mobius":
+                segs = segs[1:]
+            path = "/" + "/".join(segs)
+        with self._lock:
+            # 경로가 없으면 같은 번호의 경로 없는 레코드(key == no)와 합친다
+            rec = self.by_path.get(path) if path else self.by_key.get(no)
+            if rec is None:
+                rec = SensorRecord(no, sid, path, lbl)
+                self.records.append(rec)
+                self.by_key[rec.key] = rec
+                self.by_no.setdefault(no, []).append(rec)
+                if path:
+                    self.by_path[rec.path] = rec
+                    node = self._trie
+                    for s in _segments(path):
+                        node = node.setdefault(s, {})
+                    node["$"] = rec
+            else:
+                rec.sid = rec.sid or (sys.intern(sid) if sid else None)
+                rec.lbl = lbl or rec.lbl
+            if rec.sid:
+                self.by_sid[rec.sid] = rec
+            for t in topic_ids:
+                self.by_topic_id[sys.intern(t)] = rec
+        return rec
+
+    def one(self, no: int) -> Optional[SensorRecord]:
+        """번호만 알 때: 그 번호의 레코드가 하나뿐이면 그것, 없거나 여러 리전에 있으면 None (추측하지 않음)"""
+        recs = self.by_no.get(no)
+        return recs[0] if recs and len(recs) == 1 else None
+
+    def _learn(self, table: Dict[str, Any], key: str, val: Any) -> None:
+        if self._learned < self.max_learned:
+            table[sys.intern(key)] = val
+            self._learned += 1
+
+    # -------------------- 조회 --------------------
+    def _walk(self, sur: str) -> Optional[SensorRecord]:
+        node = self._trie
+        segs = _segments(sur)
+        # 앞의 CSEBase 이름(Mobius 등)은 건너뛴다
+        if segs and segs[0] not in node:
+            segs = segs[1:]
+        for s in segs:
+            node = node.get(s)
+            if node is None:
+                return None
+            rec = node.get("$")
+            if rec is not None:
+                return rec
+        return None
+
+    def from_sur(self, sur: Optional[str]) -> Optional[SensorRecord]:
+        if not sur:
+            return None
+        v = self.by_sur.get(sur)
+        if v is not None:
+            self.hits += 1
+            return None if v is _MISS else v
+        rec = self._walk(sur)
+        if rec is None and self.sur_fallback is not None:
+            self.fallbacks += 1
+            found = self.sur_fallback(sur)
+            if found:
+                no, path = found
+                rec = self.add(no, path=path) if path else self.one(no) or self.add(no)
+        self._learn(self.by_sur, sur, rec if rec is not None else _MISS)
+        return rec
+
+    def from_sid(self, sid: Optional[str]) -> Optional[SensorRecord]:
+        if not sid:
+            return None
+        v = self.by_sid.get(sid)
+        if v is not None:
+            self.hits += 1
+            return None if v is _MISS else v
+        rec = None
+        if self.sid_fallback is not None:
+            self.fallbacks += 1
+            no = self.sid_fallback(sid)
+            if no is not None:
+                # 번호가 여러 리전에 있으면 경로 없는 레코드(key == no)로 따로 둔다
+                rec = self.one(no) or self.add(no)
+        self._learn(self.by_sid, sid, rec if rec is not None else _MISS)
+        return rec
+
+    def from_topic(self, topic: Optional[str]) -> Optional[SensorRecord]:
+        """/oneM2M/req/{a}/{b}/json 의 a/b 중 구독 nu ID 와 일치하는 센서"""
+        if not topic or not self.by_topic_id:
+            return None
+        parts = topic.split("/")
+        if len(parts) >= 5:
+            return self.by_topic_id.get(parts[3]) or self.by_topic_id.get(parts[4])
+        return self.by_topic_id.get(topic.strip("/"))
+
+    def stats(self) -> Dict[str, int]:
+        return {"sensors": len(self.records), "hits": self.hits, "fallbacks": self.fallbacks,
+                "learned": self._learned}
+
+
+# -------------------- 스펙 / 조회로 채우기 --------------------
+def _sid_from_lbl(lbl: Optional[List[str]]) -> Optional[str]:
+    for item in lbl or ():
+        if isinstance(item, str):
+            m = _LBL_SID.search(item)
+            if m:
+                return m.group(1)
+    return None
+
+
+def _load_bootstrap_yaml(path: str) -> List[Dict[str, Any]]:
+    """dt-bootstrap.yaml 의 '- rn:' 계층과 같은 블록의 lbl/nu 만 읽는다"""
+    rows: List[Dict[str, Any]] = []
+    stack: List[Tuple[int, str]] = []  # (들여쓰기, rn)
+    ae = ""
+    cur: Optional[Dict[str, Any]] = None
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.split("#", 1)[0].rstrip()
+            if not line.strip():
+                continue
+            indent = len(line) - len(line.lstrip())
+            body = line.strip()
+            m = re.match(r"^(-\s+)?rn:\s*([^\s,}]+)$", body)
+            if m:
+                if indent == 2 and not m.group(1) and not stack:
+                    ae = m.group(2)  # ae.rn
+                    continue
+                while stack and stack[-1][0] >= indent:
+                    stack.pop()
+                stack.append((indent, m.group(2)))
+                sm = _SENSOR_RN.match(m.group(2))
+                cur = None
+                if sm:
+                    cur = {"sensor": int(sm.group(1)), "path": "/" + "/".join([ae] + [rn for _, rn in stack]),
+                           "topics": []}
+                    rows.append(cur)
+                continue
+            if cur is None:
+                continue
+            if body.startswith("lbl:"):
+                try:
+                    cur["lbl"] = json.loads(body[len("lbl:"):].strip())
+                except Exception:
+                    pass
+            for nu in re.findall(r'"(mqtts?://[^"]+)"', body):
+                nm = _NU_ID.match(nu)
+                if nm:
+                    cur["topics"].append(nm.group(1))
+    return rows
+
+
+def load_spec(reg: SensorRegistry, path: str) -> int:
+    """스펙 파일로 레지스트리 채우기. 등록한 센서 수 반환."""
+    low = path.lower()
+    if low.endswith((".yaml", ".yml")):
+        rows = _load_bootstrap_yaml(path)
+    elif low.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    n = 0
+    for row in rows:
+        lbl = row.get("lbl")
+        topics = row.get("topics") or []
+        if isinstance(topics, str):
+            topics = [t for t in topics.split(";") if t]
+        reg.add(int(row["sensor"]), sid=row.get("sid") or _sid_from_lbl(lbl), path=row.get("path") or None,
+                lbl=lbl, topic_ids=topics)
+        n += 1
+    return n
+
+
+def discover(reg: SensorRegistry, client, ae: str) -> int:
+    """
+    Mobius 라벨 조회: AE 아래 type=sensor 컨테이너(fu=1 discovery)를 찾아 lbl을 읽어 등록.
+    client는 Onem2mClient. 등록한 센서 수 반환.
+    """
+    resp = client.get(f"/{ae}", params={"fu": 1, "ty": 3, "lbl": "type=sensor"})
+    if not resp.ok:
+        raise RuntimeError(f"discovery status={resp.status_code}")
+    uris = (resp.json() or {}).get("m2m:uril") or []
+    n = 0
+    for uri in uris:
+        segs = _segments(uri)
+        sm = _SENSOR_RN.match(segs[-1]) if segs else None
+        if not sm:
+            continue
+        r = client.get(uri)
+        lbl = None
+        if r.ok:
+            cnt = (r.json() or {}).get("m2m:cnt") or {}
+            lbl = cnt.get("lbl") if isinstance(cnt.get("lbl"), list) else None
+        reg.add(int(sm.group(1)), sid=_sid_from_lbl(lbl), path="/" + "/".join(segs), lbl=lbl)
+        n += 1
+    return n
+
+
+def add_registry_args(ap, *, discover_flag: bool = False) -> None:
+    ap.add_argument("--sensor-spec", default=os.getenv("SENSOR_SPEC_FILE", ""),
+                    help="센서 라우팅 스펙(JSON/CSV 또는 fd dt-bootstrap.yaml)")
+    if discover_flag:
+        ap.add_argument("--sensor-discover", action="store_true",
+                        help="시작 시 Mobius에서 type=sensor 컨테이너 lbl을 조회해 등록 (라벨 캐시도 채움)")
@@ -0,0 +1,219 @@
+"""
+T2 쿨다운/라벨 상태 저장소 (여러 워커 프로세스가 같은 상태를 보도록).
+
+인터페이스 (StateStore):
+- try_acquire(sensor, now, cooldown) -> bool : 쿨다운이 지났으면 now로 잡고 True (원자적).
+  여러 워커 중 한 곳만 True를 받으므로 쿨다운 창마다 출동은 정확히 1회.
+- release(sensor, stamp)   : 전송 실패 등으로 잡은 쿨다운 되돌리기 (아직 stamp일 때만)
+- get_label(sensor) -> (ts, pose) | None,  put_label(sensor, ts, pose)
+
+백엔드 (--state-backend):
+- local : 프로세스 내 dict (기본, 기존 동작과 같음)
+- file  : --state-file 의 mmap 고정 크기 테이블. 같은 호스트의 워커끼리 공유하며
+          슬롯별 fcntl.lockf 로 check-and-set 을 원자적으로 처리 (POSIX 전용).
+다른 저장소(Redis 등)는 StateStore 를 구현해 BACKENDS 에 등록하면 된다.
+"""
+import abc, math, mmap, os, struct, threading
+from typing import Any, Dict, Optional, Tuple
+
+Pose = Dict[str, Any]
+LabelEntry = Tuple[float, Pose]
+
+
+class StateStore(abc.ABC):
+    @abc.abstractmethod
+    def try_acquire(self, sensor: int, now: float, cooldown: float) -> bool: ...
+
+    @abc.abstractmethod
+    def release(self, sensor: int, stamp: float) -> None: ...
+
+    @abc.abstractmethod
+    def get_label(self, sensor: int) -> Optional[LabelEntry]: ...
+
+    @abc.abstractmethod
+    def put_label(self, sensor: int, ts: float, pose: Pose) -> None: ...
+
+    def close(self) -> None:
+        pass
+
+
+class LocalStore(StateStore):
+    """프로세스 내 dict. label_cache/last_sent_at 을 그대로 노출한다."""
+
+    def __init__(self):
+        self.label_cache: Dict[int, LabelEntry] = {}
+        self.last_sent_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, sensor: int, now: float, cooldown: float) -> bool:
+        with self._lock:
+            if now - self.last_sent_at.get(sensor, 0.0) < cooldown:
+                return False
+            self.last_sent_at[sensor] = now
+            return True
+
+    def release(self, sensor: int, stamp: float) -> None:
+        with self._lock:
+            if self.last_sent_at.get(sensor) == stamp:
+                del self.last_sent_at[sensor]
+
+    def get_label(self, sensor: int) -> Optional[LabelEntry]:
+        return self.label_cache.get(sensor)
+
+    def put_label(self, sensor: int, ts: float, pose: Pose) -> None:
+        self.label_cache[sensor] = (ts, pose)
+
+
+# -------------------- mmap 파일 테이블 --------------------
+_MAGIC = b"T2ST"
+_HEADER = struct.Struct("<4sII4x")                # magic, version, nslots
+_SLOT = struct.Struct("<qddddddddd32s")           # key(sensor+1, 0=빈 슬롯), last_sent, label_ts, x, y, oz, ow, sx, sy, sz, sid
+_VERSION = 2
+_POSE = ("x", "y", "oz", "ow", "sx", "sy", "sz")
+_NAN = float("nan")
+
+
+def _num(v: Optional[float]) -> float:
+    return _NAN if v is None else float(v)
+
+
+def _opt(v: float) -> Optional[float]:
+    return None if math.isnan(v) else v
+
+
+class FileStore(StateStore):
+    """
+    고정 슬롯 해시 테이블(선형 탐사, 삭제 없음). 슬롯 하나 = 센서 하나.
+    프로세스 간에는 슬롯 바이트 범위 lockf, 프로세스 안에서는 threading.Lock 으로 보호.
+    """
+
+    def __init__(self, path: str, nslots: int = 4096):
+        import fcntl  # POSIX 전용
+        self._fcntl = fcntl
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._fd = fd
+        fcntl.lockf(fd, fcntl.LOCK_EX, _HEADER.size, 0)
+        try:
+            if os.fstat(fd).st_size < _HEADER.size:
+                os.ftruncate(fd, _HEADER.size + nslots * _SLOT.size)
+                os.pwrite(fd, _HEADER.pack(_MAGIC, _VERSION, nslots), 0)
+            magic, version, n = _HEADER.unpack(os.pread(fd, _HEADER.size, 0))
+            if magic != _MAGIC:
+                raise ValueError(f"{path}: not a T2 state file")
+            if version != _VERSION:
+                raise ValueError(f"{path}: state file v{version}, expected v{_VERSION} (remove it to recreate)")
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN, _HEADER.size, 0)
+        self.nslots = n
+        self._mm = mmap.mmap(fd, _HEADER.size + n * _SLOT.size)
+        self._tlock = threading.Lock()
+        # sensor -> 슬롯 번호 (한 번 찾으면 고정)
+        self._index: Dict[int, int] = {}
+
+    def _off(self, slot: int) -> int:
+        return _HEADER.size + slot * _SLOT.size
+
+    def _lock(self, slot: int) -> None:
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, _SLOT.size, self._off(slot))
+
+    def _unlock(self, slot: int) -> None:
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, _SLOT.size, self._off(slot))
+
+    def _slot(self, sensor: int) -> int:
+        """sensor 슬롯을 찾거나 첫 빈 슬롯을 차지. 같은 탐사 순서라 워커끼리 결과가 같다."""
+        s = self._index.get(sensor)
+        if s is not None:
+            return s
+        key = sensor + 1
+        start = sensor % self.nslots
+        for i in range(self.nslots):
+            slot = (start + i) % self.nslots
+            off = self._off(slot)
+            self._lock(slot)
+            try:
+                k = struct.unpack_from("<q", self._mm, off)[0]
+                if k == 0:
+                    _SLOT.pack_into(self._mm, off, key, 0.0, 0.0, *(_NAN,) * len(_POSE), b"")
+                    k = key
+            finally:
+                self._unlock(slot)
+            if k == key:
+                self._index[sensor] = slot
+                return slot
+        raise RuntimeError(f"{self.path}: state table full ({self.nslots} slots)")
+
+    def try_acquire(self, sensor: int, now: float, cooldown: float) -> bool:
+        with self._tlock:
+            slot = self._slot(sensor)
+            off = self._off(slot) + 8
+            self._lock(slot)
+            try:
+                last = struct.unpack_from("<d", self._mm, off)[0]
+                if now - last < cooldown:
+                    return False
+                struct.pack_into("<d", self._mm, off, now)
+                return True
+            finally:
+                self._unlock(slot)
+
+    def release(self, sensor: int, stamp: float) -> None:
+        with self._tlock:
+            slot = self._slot(sensor)
+            off = self._off(slot) + 8
+            self._lock(slot)
+            try:
+                if struct.unpack_from("<d", self._mm, off)[0] == stamp:
+                    struct.pack_into("<d", self._mm, off, 0.0)
+            finally:
+                self._unlock(slot)
+
+    def get_label(self, sensor: int) -> Optional[LabelEntry]:
+        with self._tlock:
+            slot = self._slot(sensor)
+            self._lock(slot)
+            try:
+                row = _SLOT.unpack_from(self._mm, self._off(slot))
+            finally:
+                self._unlock(slot)
+        ts, sid = row[2], row[-1]
+        if ts <= 0:
+            return None
+        pose: Pose = {k: _opt(v) for k, v in zip(_POSE, row[3:-1])}
+        pose["sid"] = sid.rstrip(b"\0").decode("utf-8", "replace") or None
+        return ts, pose
+
+    def put_label(self, sensor: int, ts: float, pose: Pose) -> None:
+        sid = (pose.get("sid") or "").encode("utf-8")[:32]
+        with self._tlock:
+            slot = self._slot(sensor)
+            off = self._off(slot)
+            self._lock(slot)
+            try:
+                key, last = struct.unpack_from("<qd", self._mm, off)
+                _SLOT.pack_into(self._mm, off, key, last, ts, *(_num(pose.get(k)) for k in _POSE), sid)
+            finally:
+                self._unlock(slot)
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+
+
+BACKENDS = {"local": LocalStore, "file": FileStore}
+
+
+def add_state_args(ap) -> None:
+    ap.add_argument("--state-backend", default=os.getenv("T2_STATE_BACKEND", "local"), choices=sorted(BACKENDS),
+                    help="쿨다운/라벨 상태 저장소. 여러 워커면 file 사용.")
+    ap.add_argument("--state-file", default=os.getenv("T2_STATE_FILE", "t2-state.bin"),
+                    help="--state-backend file 의 mmap 테이블 경로")
+    ap.add_argument("--state-slots", type=int, default=4096, help="file 백엔드 센서 슬롯 수 (생성 시)")
+
+
+def open_store(args) -> StateStore:
+    if args.state_backend == "file":
+        return FileStore(args.state_file, nslots=args.state_slots)
+    return BACKENDS[args.state_backend]()
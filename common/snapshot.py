@@ -0,0 +1,123 @@
+"""
+런타임 상태 스냅샷 (재시작 시 라벨/쿨다운/프레임 인덱스 등을 바로 복구).
+
+파일 형식 (little-endian):
+- 헤더: magic "RSNP", version u16, kind 2바이트(b"T2"/b"T3"), saved_at f64(time.time()), 섹션 수 u32
+- 섹션: tag 4바이트 + 길이 u32 + 본문 (본문은 각 프로세스가 struct 로 채움)
+- 끝: crc32 u32 (헤더~마지막 섹션)
+쓰기는 임시 파일 + fsync + os.replace 라 읽는 쪽은 완전한 이전 파일이나 새 파일만 본다.
+읽기는 magic/version/kind/crc 가 맞지 않거나 max_age 초보다 오래됐으면 버린다 (이유 문자열 반환).
+"""
+import os, struct, time, zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_MAGIC = b"RSNP"
+_VERSION = 2                                 # 2: T2 LBLS/COOL 센서 key 를 int64 로
+_HEADER = struct.Struct("<4sH2sdI")
+_SECTION = struct.Struct("<4sI")
+_CRC = struct.Struct("<I")
+_STRLEN = struct.Struct("<H")
+
+
+class Snapshot:
+    __slots__ = ("saved_at", "sections", "size")
+
+    def __init__(self, saved_at: float, sections: Dict[bytes, bytes], size: int):
+        self.saved_at = saved_at
+        self.sections = sections
+        self.size = size
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.saved_at
+
+
+def write(path: str, kind: bytes, sections: Dict[bytes, bytes], *, now: Optional[float] = None) -> int:
+    """스냅샷 파일 교체. 쓴 바이트 수 반환."""
+    parts = [_HEADER.pack(_MAGIC, _VERSION, kind, time.time() if now is None else now, len(sections))]
+    for tag, body in sections.items():
+        parts.append(_SECTION.pack(tag, len(body)))
+        parts.append(body)
+    data = b"".join(parts)
+    data += _CRC.pack(zlib.crc32(data))
+    tmp = f"{path}.{os.getpid()}.tmp"  # --workers 로 여러 프로세스가 같은 경로에 써도 섞이지 않게
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(data)
+
+
+def read(path: str, kind: bytes, *, max_age: float = 0.0,
+         now: Optional[float] = None) -> Tuple[Optional[Snapshot], str]:
+    """(Snapshot, "") 또는 (None, 이유). max_age <= 0 이면 나이 확인 안 함."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None, "missing"
+    if len(data) < _HEADER.size + _CRC.size:
+        return None, "truncated"
+    body, (crc,) = data[:-_CRC.size], _CRC.unpack(data[-_CRC.size:])
+    if zlib.crc32(body) != crc:
+        return None, "bad crc"
+    magic, version, k, saved_at, n = _HEADER.unpack_from(body, 0)
+    if magic != _MAGIC or version != _VERSION:
+        return None, f"unknown format {magic!r} v{version}"
+    if k != kind:
+        return None, f"kind {k!r} != {kind!r}"
+    snap = Snapshot(saved_at, {}, len(data))
+    if max_age > 0 and snap.age(now) > max_age:
+        return None, f"stale {snap.age(now):.0f}s > {max_age:.0f}s"
+    off = _HEADER.size
+    for _ in range(n):
+        tag, size = _SECTION.unpack_from(body, off)
+        off += _SECTION.size
+        snap.sections[tag] = body[off:off + size]
+        off += size
+    return snap, ""
+
+
+# -------------------- 섹션 본문 도우미 --------------------
+def pack_rows(st: struct.Struct, rows: Iterable[tuple]) -> bytes:
+    return b"".join(st.pack(*r) for r in rows)
+
+
+def unpack_rows(st: struct.Struct, body: bytes) -> List[tuple]:
+    return list(st.iter_unpack(body)) if body else []
+
+
+def pack_str(s: Optional[str]) -> bytes:
+    b = (s or "").encode("utf-8")[:0xFFFF]
+    return _STRLEN.pack(len(b)) + b
+
+
+class Reader:
+    """가변 길이 섹션을 앞에서부터 읽는 커서"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.off = 0
+
+    def more(self) -> bool:
+        return self.off < len(self.body)
+
+    def take(self, st: struct.Struct) -> tuple:
+        v = st.unpack_from(self.body, self.off)
+        self.off += st.size
+        return v
+
+    def text(self) -> str:
+        (n,) = _STRLEN.unpack_from(self.body, self.off)
+        self.off += _STRLEN.size
+        s = self.body[self.off:self.off + n].decode("utf-8", "replace")
+        self.off += n
+        return s
+
+
+def add_snapshot_args(ap, env: str = "SNAPSHOT_FILE") -> None:
+    ap.add_argument("--snapshot-file", default=os.getenv(env, ""),
+                    help="런타임 상태 스냅샷 파일. 지정 시 주기적으로 저장하고 시작할 때 복구. 비우면 끔.")
+    ap.add_argument("--snapshot-sec", type=float, default=10.0, help="스냅샷 저장 주기(초)")
+    ap.add_argument("--snapshot-max-age", type=float, default=600.0,
+                    help="이보다 오래된 스냅샷은 복구하지 않음(초). 0이면 나이 확인 안 함.")
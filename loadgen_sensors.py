@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+합성 센서 트래픽 생성기 (여러 프로세스 → MQTT 브로커).
+
+T2 parse_notification 이 받는 형태(notify/sgn/create/cin/raw)로 가상 센서 수천 개의
+측정값을 발행한다.
+- 온도 곡선: logs/sensor*.csv 의 연속 측정값 변화량을 센서마다 다른 위치/오프셋으로 재생 + 잡음
+- 화재: 센서당 시간당 --fire-per-hour 회(포아송) 발생. 발생하면 --fire-ror °C/s 로 오르며
+  fire_alarm=1 을 --fire-sec 초 유지 (0이면 CSV의 fire_alarm=1 연속 길이 중앙값)
+- con 에 run/seq/sent(전송 시각, epoch 초)를 넣어 수신 측이 지연과 손실을 계산할 수 있게 한다.
+  --record DIR 이면 프로세스별 전송 기록(sent-N.csv)과 summary.json 도 남긴다.
+
+예)
+  python loadgen_sensors.py run --broker 127.0.0.1 --cse-id Mobius2 --origin-mqtt SZlK9SDKWNx \
+      --sensors 3000 --rate 1 --procs 4 --duration 60 --shape mix --record ./loadgen-out
+  python loadgen_sensors.py recv --broker 127.0.0.1 --cse-id Mobius2 --origin-mqtt SZlK9SDKWNx \
+      --duration 70 --record ./loadgen-out
+"""
+import argparse, csv, glob, heapq, json, math, multiprocessing as mp, os, random, statistics, sys, time, uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+SHAPES = ("notify", "sgn", "create", "cin", "raw")
+
+
+# -------------------- 시드 (logs/sensor*.csv) --------------------
+def load_seeds(pattern: str) -> Tuple[List[List[float]], List[int]]:
+    """(센서별 온도 변화량 목록, fire_alarm=1 연속 길이 목록)"""
+    curves: List[List[float]] = []
+    fire_runs: List[int] = []
+    for path in sorted(glob.glob(pattern)):
+        temps: List[float] = []
+        run = 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        temps.append(float(row["temp"]))
+                        fire = int(row.get("fire_alarm") or 0)
+                    except (KeyError, ValueError):
+                        continue
+                    if fire == 1:
+                        run += 1
+                    elif run:
+                        fire_runs.append(run); run = 0
+        except OSError as e:
+            print(f"[WARN] seed {path}: {e}", file=sys.stderr)
+            continue
+        if run:
+            fire_runs.append(run)
+        if len(temps) >= 2:
+            curves.append([round(b - a, 2) for a, b in zip(temps, temps[1:])])
+    if not curves:
+        curves = [[0.1, 0.1, -0.1, -0.1]]
+    return curves, fire_runs
+
+
+class VirtualSensor:
+    __slots__ = ("no", "deltas", "pos", "base", "temp", "seq", "fire_left", "next_fire")
+
+    def __init__(self, no: int, deltas: List[float], rng: random.Random, base: float):
+        self.no = no
+        self.deltas = deltas
+        self.pos = rng.randrange(len(deltas))
+        self.base = base
+        self.temp = base
+        self.seq = 0
+        self.fire_left = 0.0
+        self.next_fire = math.inf
+
+    def step(self, rng: random.Random, dt: float, args: argparse.Namespace) -> Tuple[float, int]:
+        now = time.time()
+        if self.fire_left <= 0 and now >= self.next_fire:
+            self.fire_left = args.fire_sec
+            self.next_fire = now + rng.expovariate(args.fire_per_hour / 3600.0) if args.fire_per_hour > 0 else math.inf
+        if self.fire_left > 0:
+            self.fire_left -= dt
+            self.temp = min(args.fire_peak, self.temp + args.fire_ror * dt)
+            return round(self.temp, 1), 1
+        # 평상시: 시드 변화량 재생 + 기준값으로 천천히 복귀
+        self.pos = (self.pos + 1) % len(self.deltas)
+        self.temp += self.deltas[self.pos] + rng.gauss(0.0, args.noise)
+        self.temp += (self.base - self.temp) * min(1.0, 0.05 * dt)
+        return round(self.temp, 1), 0
+
+
+# -------------------- 페이로드 (parse_notification 형태) --------------------
+def build_payload(shape: str, args: argparse.Namespace, n: int, con: Dict[str, Any]) -> bytes:
+    data_path = f"{args.ae}/{args.region}/Sensor{n}/data"
+    con_s = json.dumps(con, separators=(",", ":"))
+    if shape == "raw":
+        obj: Any = con
+    elif shape == "cin":
+        obj = {"m2m:cin": {"cnf": "application/json", "con": con_s}}
+    elif shape == "create":
+        obj = {"op": 1, "to": f"/Mobius/{data_path}", "fr": args.origin_mqtt, "rqi": uuid.uuid4().hex,
+               "ty": 4, "pc": {"m2m:cin": {"cnf": "application/json", "con": con_s}}}
+    else:
+        sgn = {"sur": f"Mobius/{data_path}/L-S{n}-sub",
+               "nev": {"net": 3, "rep": {"m2m:cin": {"cnf": "application/json", "con": con_s}}}}
+        obj = {"m2m:sgn": sgn} if shape == "sgn" else {"op": 5, "rqi": uuid.uuid4().hex, "pc": {"m2m:sgn": sgn}}
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def topic_for(args: argparse.Namespace, n: int) -> str:
+    return args.topic.format(cse_id=args.cse_id, origin=args.origin_mqtt, sensor=n)
+
+
+def sub_topic(args: argparse.Namespace) -> str:
+    if args.topic_sub:
+        return args.topic_sub
+    return args.topic.replace("{sensor}", "+").format(cse_id=args.cse_id, origin=args.origin_mqtt)
+
+
+# -------------------- 발행 프로세스 --------------------
+def publisher(idx: int, args: argparse.Namespace, sensor_nos: List[int], run_id: str,
+              start_at: float, out_q) -> None:
+    rng = random.Random(args.seed * 1000 + idx)
+    curves, _ = load_seeds(args.seed_glob)
+    sensors = []
+    for n in sensor_nos:
+        vs = VirtualSensor(n, curves[n % len(curves)], rng, args.base_temp + rng.uniform(-args.spread, args.spread))
+        if args.fire_per_hour > 0:
+            vs.next_fire = start_at + rng.expovariate(args.fire_per_hour / 3600.0)
+        sensors.append(vs)
+    shapes = SHAPES if args.shape == "mix" else (args.shape,)
+    period = 1.0 / args.rate
+
+    cli = mqtt.Client(client_id=f"loadgen-{run_id}-{idx}")
+    cli.max_inflight_messages_set(max(20, args.inflight))
+    cli.connect(args.broker, args.port, keepalive=30)
+    cli.loop_start()
+
+    record = None
+    if args.record:
+        record = open(os.path.join(args.record, f"sent-{idx}.csv"), "w", newline="", encoding="utf-8")
+        rec_w = csv.writer(record)
+        rec_w.writerow(["sensor", "seq", "sent", "fire_alarm", "shape"])
+
+    # (예정 시각, 센서 인덱스). 시작 위상은 센서마다 분산
+    heap = [(start_at + rng.uniform(0, period), i) for i in range(len(sensors))]
+    heapq.heapify(heap)
+    end_at = start_at + args.duration
+    sent = fires = late = errors = 0
+    info = None
+    while heap:
+        due, i = heap[0]
+        if due >= end_at:
+            break
+        now = time.time()
+        if due > now:
+            time.sleep(due - now)
+        elif now - due > 1.0:
+            late += 1
+        heapq.heapreplace(heap, (due + period, i))
+        vs = sensors[i]
+        temp, fire = vs.step(rng, period, args)
+        sent_at = time.time()
+        shape = shapes[(vs.no + vs.seq) % len(shapes)]
+        con = {"temp": temp, "fire_alarm": fire, "ts": datetime.now(timezone.utc).isoformat(),
+               "sid": f"L-S{vs.no}", "run": run_id, "seq": vs.seq, "sent": round(sent_at, 6)}
+        info = cli.publish(topic_for(args, vs.no), build_payload(shape, args, vs.no, con), qos=args.qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            errors += 1
+        if record is not None:
+            rec_w.writerow([vs.no, vs.seq, con["sent"], fire, shape])
+        vs.seq += 1
+        sent += 1
+        fires += fire
+
+    # 큐에 남은 발행을 내보낸 뒤 끊는다
+    if info is not None:
+        try:
+            info.wait_for_publish(timeout=5.0)
+        except (RuntimeError, ValueError):
+            pass
+    cli.disconnect()
+    cli.loop_stop()
+    if record is not None:
+        record.close()
+    elapsed = max(1e-9, min(time.time(), end_at) - start_at)
+    out_q.put({"proc": idx, "sensors": len(sensors), "sent": sent, "fire_msgs": fires, "late": late,
+               "publish_errors": errors, "achieved_rate": round(sent / elapsed, 1)})
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    _, fire_runs = load_seeds(args.seed_glob)
+    if args.fire_sec <= 0:
+        args.fire_sec = float(statistics.median(fire_runs)) if fire_runs else 10.0
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    run_id = uuid.uuid4().hex[:8]
+    procs = max(1, min(args.procs, args.sensors))
+    groups = [list(range(args.first_sensor + p, args.first_sensor + args.sensors, procs)) for p in range(procs)]
+    start_at = time.time() + 1.0  # 모든 프로세스가 연결을 마치고 같이 시작
+    out_q: "mp.Queue[Dict[str, Any]]" = mp.Queue()
+    workers = [mp.Process(target=publisher, args=(i, args, g, run_id, start_at, out_q), daemon=True)
+               for i, g in enumerate(groups)]
+    print(f"[LOADGEN] run={run_id} sensors={args.sensors} rate={args.rate:g}/s procs={procs} "
+          f"shape={args.shape} fire_sec={args.fire_sec:g}", file=sys.stderr)
+    for w in workers:
+        w.start()
+    stats = [out_q.get() for _ in workers]
+    for w in workers:
+        w.join()
+    stats.sort(key=lambda s: s["proc"])
+    summary = {
+        "run": run_id, "started_at": datetime.fromtimestamp(start_at, tz=timezone.utc).isoformat(),
+        "duration_sec": args.duration, "sensors": args.sensors, "rate_per_sensor": args.rate,
+        "target_rate": args.sensors * args.rate, "shape": args.shape, "qos": args.qos,
+        "sent": sum(s["sent"] for s in stats),
+        "achieved_rate": round(sum(s["achieved_rate"] for s in stats), 1),
+        "late": sum(s["late"] for s in stats), "procs": stats,
+    }
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.record:
+        with open(os.path.join(args.record, "summary.json"), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+# -------------------- 수신 측 (지연/손실) --------------------
+def cmd_recv(args: argparse.Namespace) -> int:
+    from T2_anomaly_detection import parse_notification
+
+    lat: List[float] = []
+    seen: Dict[Tuple[str, str], set] = {}
+    bad = [0]
+
+    def on_message(client, userdata, msg):
+        now = time.time()
+        _, con, _ = parse_notification(msg.payload.decode("utf-8", errors="replace"))
+        if not isinstance(con, dict) or "sent" not in con or (args.run and con.get("run") != args.run):
+            bad[0] += 1
+            return
+        lat.append(now - float(con["sent"]))
+        seen.setdefault((str(con.get("run")), str(con.get("sid"))), set()).add(int(con["seq"]))
+
+    cli = mqtt.Client(client_id=f"loadgen-recv-{os.getpid()}")
+    cli.on_connect = lambda c, u, f, rc: c.subscribe(sub_topic(args), qos=args.qos)
+    cli.on_message = on_message
+    cli.connect(args.broker, args.port, keepalive=30)
+    cli.loop_start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    cli.loop_stop()
+    cli.disconnect()
+
+    # 기대 수: --record 의 summary 가 있으면 그 sent, 없으면 센서별 (최대 seq + 1) 합
+    received = sum(len(v) for v in seen.values())
+    expected = sum(max(v) + 1 for v in seen.values()) if seen else 0
+    summ_path = os.path.join(args.record, "summary.json") if args.record else ""
+    if summ_path and os.path.exists(summ_path):
+        with open(summ_path, "r", encoding="utf-8") as f:
+            expected = json.load(f).get("sent", expected)
+    lat.sort()
+
+    def pct(p: float) -> Optional[float]:
+        return round(lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))] * 1000.0, 2) if lat else None
+
+    report = {"received": received, "duplicates": len(lat) - received, "expected": expected,
+              "lost": max(0, expected - received),
+              "loss_ratio": round(max(0, expected - received) / expected, 5) if expected else None,
+              "foreign": bad[0], "sensors": len(seen),
+              "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99), "max": pct(100)}}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+# -------------------- 인자 --------------------
+def build_arg_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--broker", default=os.getenv("MQTT_BROKER", "127.0.0.1"))
+    common.add_argument("--port", type=int, default=int(os.getenv("MQTT_PORT", "1883")))
+    common.add_argument("--qos", type=int, default=0, choices=[0, 1, 2])
+    common.add_argument("--cse-id", default=os.getenv("ONEM2M_CSE_ID", "Mobius2"))
+    common.add_argument("--origin-mqtt", default=os.getenv("ONEM2M_ORIGIN", "loadgen"))
+    common.add_argument("--topic", default="/oneM2M/req/{cse_id}/{origin}/json",
+                        help="발행 토픽 템플릿. {cse_id} {origin} {sensor} 사용 가능.")
+    common.add_argument("--record", default="", help="전송 기록/summary.json 디렉터리")
+    common.add_argument("--duration", type=float, default=30.0, help="실행 시간(초)")
+
+    ap = argparse.ArgumentParser(description="Synthetic oneM2M sensor load generator")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", parents=[common], help="가상 센서 발행")
+    r.add_argument("--sensors", type=int, default=1000, help="가상 센서 수")
+    r.add_argument("--first-sensor", type=int, default=1, help="첫 센서 번호 (Sensor{n})")
+    r.add_argument("--rate", type=float, default=1.0, help="센서당 msg/s")
+    r.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="발행 프로세스 수")
+    r.add_argument("--shape", default="notify", choices=SHAPES + ("mix",), help="페이로드 형태 (mix: 번갈아)")
+    r.add_argument("--ae", default=os.getenv("MOBIUS_AE", "Meta-Sejong"))
+    r.add_argument("--region", default="Loadgen-hall")
+    r.add_argument("--seed-glob", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "sensor*.csv"),
+                   help="온도 곡선 시드 CSV (ts,temp,fire_alarm)")
+    r.add_argument("--seed", type=int, default=1, help="난수 시드")
+    r.add_argument("--base-temp", type=float, default=27.5)
+    r.add_argument("--spread", type=float, default=2.0, help="센서별 기준 온도 편차(±)")
+    r.add_argument("--noise", type=float, default=0.05, help="측정 잡음 표준편차")
+    r.add_argument("--fire-per-hour", type=float, default=0.5, help="센서당 시간당 화재 횟수")
+    r.add_argument("--fire-sec", type=float, default=0.0, help="화재 지속(초). 0이면 시드 CSV에서 추정.")
+    r.add_argument("--fire-ror", type=float, default=1.5, help="화재 시 온도 상승률(°C/s)")
+    r.add_argument("--fire-peak", type=float, default=85.0, help="화재 최고 온도")
+    r.add_argument("--inflight", type=int, default=1000, help="QoS>0 동시 전송 한도")
+
+    v = sub.add_parser("recv", parents=[common], help="수신해 지연/손실 계산")
+    v.add_argument("--run", default="", help="이 run ID 만 집계")
+    v.add_argument("--topic-sub", default="", help="구독 토픽 (기본: --topic, {sensor}는 +)")
+    return ap
+
+
+def main():
+    args = build_arg_parser().parse_args()
+    if args.cmd == "run":
+        if args.rate <= 0 or args.sensors <= 0:
+            print("[ERR] --sensors and --rate must be positive.", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(cmd_run(args))
+    sys.exit(cmd_recv(args))
+
+
+if __name__ == "__main__":
+    main()
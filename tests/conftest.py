@@ -0,0 +1,4 @@
+import os, sys
+
+# 저장소 루트의 스크립트(T2_anomaly_detection 등)를 import 할 수 있게
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
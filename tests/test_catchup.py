@@ -0,0 +1,56 @@
+import json, threading
+
+from common import catchup
+
+from test_t2_dedup import Msg, detector, notify
+
+
+def test_live_after_catchup_processed_once_without_dedup():
+    det = detector("--dedup-ttl-sec", "0", "--catchup-sec", "60")
+    processed = []
+    det.process = lambda item, **_kw: processed.append(item)
+    key = det.sensors.from_sur("Mobius/Meta-Sejong/Hall/Sensor1/data/sub").key
+    # 따라잡기가 먼저 잡은 CIN
+    assert det.cursor.claim(key, "20260101T000000", "4-0001")
+    det.on_message(None, None, Msg("t", notify("4-0001")))
+    det.on_message(None, None, Msg("t", notify("4-0002")))
+    det.on_message(None, None, Msg("t", notify("4-0002")))
+    assert len(processed) == 1
+    assert det.cursor.get(key)["ri"] == "4-0002"
+
+
+def test_high_water_mark_keeps_latest_ct():
+    cur = catchup.Cursor()
+    assert cur.claim(1, "20260101T000010", "b")
+    assert cur.claim(1, "20260101T000005", "a")
+    assert cur.get(1)["ct"] == "20260101T000010"
+
+
+def test_concurrent_saves_and_worker_merge(tmp_path):
+    path = str(tmp_path / "t2-catchup.json")
+    cur = catchup.Cursor()
+    cur.claim(1, "20260101T000000", "a")
+    errors = []
+
+    def save():
+        try:
+            for _ in range(50):
+                cur.save(path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not errors and json.load(open(path))["sensors"]["1"]["ri"] == "a"
+
+    other = catchup.Cursor()
+    other.claim(1, "20260101T000009", "z")
+    other.claim(2, "20260101T000001", "y")
+    cur.save(catchup.worker_state_path(path, 0))
+    other.save(catchup.worker_state_path(path, 1))
+    merged = catchup.Cursor()
+    for p in catchup.worker_state_paths(path):
+        merged.load(p)
+    assert merged.get(1)["ri"] == "z" and merged.get(2)["ri"] == "y"
+    assert not merged.claim(1, "20260101T000009", "z")
@@ -0,0 +1,112 @@
+import math, random
+
+import pytest
+
+from common import dispatch
+
+
+def brute(points, x, y, accept=None):
+    best = None
+    for k, (px, py) in points.items():
+        if accept is not None and not accept(k):
+            continue
+        d = math.hypot(px - x, py - y)
+        if best is None or d < best[1]:
+            best = (k, d)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_matches_brute_force(seed):
+    rnd = random.Random(seed)
+    cell = 10.0
+    ix = dispatch.GridIndex(cell)
+    points = {}
+    for i in range(60):
+        # 절반은 칸 경계 위(정수 배) 좌표
+        if i % 2:
+            x, y = rnd.randint(-8, 8) * cell, rnd.randint(-8, 8) * cell
+        else:
+            x, y = rnd.uniform(-90, 90), rnd.uniform(-90, 90)
+        points[f"r{i}"] = (x, y)
+        ix.put(f"r{i}", x, y)
+    # 일부 이동/삭제
+    for i in range(0, 60, 7):
+        x, y = rnd.uniform(-200, 200), rnd.uniform(-200, 200)
+        points[f"r{i}"] = (x, y)
+        ix.put(f"r{i}", x, y)
+    for i in range(3, 60, 11):
+        del points[f"r{i}"]
+        ix.remove(f"r{i}")
+    odd = lambda k: int(k[1:]) % 2 == 1
+    for _ in range(300):
+        if rnd.random() < 0.3:
+            q = (rnd.randint(-25, 25) * cell, rnd.randint(-25, 25) * cell)
+        else:
+            q = (rnd.uniform(-250, 250), rnd.uniform(-250, 250))
+        for accept in (None, odd):
+            got, want = ix.nearest(*q, accept), brute(points, *q, accept)
+            assert got[1] == pytest.approx(want[1]), (q, got, want)
+
+
+def test_nearest_empty_and_all_rejected():
+    ix = dispatch.GridIndex(5.0)
+    assert ix.nearest(0, 0) is None
+    ix.put("a", 1, 1)
+    assert ix.nearest(0, 0, lambda k: False) is None
+
+
+def dispatcher():
+    d = dispatch.RobotDispatcher(cell=10.0, busy_sec=60.0)
+    dispatch.load_robots(d, "R1=0,0;R2=100,0")
+    return d
+
+
+def test_assign_prefers_free_robot_then_falls_back_to_busy():
+    d = dispatcher()
+    robot, prev, free = d.assign(1, (5.0, 0.0), now=0.0)
+    assert (robot, prev, free) == ("R1", (0.0, 0.0), True)
+    # R1 은 busy → 더 먼 R2
+    robot, _, free = d.assign(2, (6.0, 0.0), now=1.0)
+    assert (robot, free) == ("R2", True)
+    # 모두 busy → 가장 가까운 로봇 재배정 (R2 는 명령 좌표 (6, 0) 로 옮겨져 있음)
+    robot, prev, free = d.assign(3, (7.0, 0.0), now=2.0)
+    assert (robot, prev, free) == ("R2", (6.0, 0.0), False)
+    # busy_sec 지나면 다시 가용
+    robot, _, free = d.assign(4, (7.0, 0.0), now=100.0)
+    assert free is True
+
+
+def test_sensor_position_used_as_alarm_point():
+    d = dispatcher()
+    d.update_sensor(9, {"sx": 95.0, "sy": 0.0})
+    assert d.assign(9, (0.0, 0.0), now=0.0)[0] == "R2"
+
+
+def test_cancel_releases_and_restores_position():
+    d = dispatcher()
+    robot, prev, _ = d.assign(1, (40.0, 0.0), now=0.0)
+    assert d.robots.get(robot) == (40.0, 0.0)
+    d.cancel(robot, prev)
+    assert d.robots.get(robot) == prev
+    assert d.stats()["busy"] == 0
+    assert d.assign(1, (1.0, 0.0))[2] is True
+
+
+def test_export_restore_round_trip():
+    d = dispatcher()
+    d.assign(1, (30.0, 0.0))
+    rows = d.export()
+    busy = {r: left for r, _, _, left in rows}
+    assert busy["R1"] == pytest.approx(60.0, abs=1.0) and busy["R2"] == 0.0
+
+    d2 = dispatcher()
+    assert d2.restore(rows + [("R9", 1.0, 1.0, 5.0)], elapsed=10.0) == 2
+    assert d2.robots.get("R1") == (30.0, 0.0)
+    assert d2.stats()["busy"] == 1
+    left = {r: l for r, _, _, l in d2.export()}
+    assert left["R1"] == pytest.approx(50.0, abs=1.0)
+    # 남은 시간보다 오래 지났으면 가용
+    d3 = dispatcher()
+    d3.restore(rows, elapsed=120.0)
+    assert d3.stats()["busy"] == 0
@@ -0,0 +1,8 @@
+import T3_robot_control as t3
+
+
+def test_find_past_last_frame_returns_len():
+    ix = t3.FrameIndex(0, ["a", "b", "c"], [10.0, 11.0, 12.0])
+    assert ix.find(9.0) == 0
+    assert ix.find(11.0) == 1
+    assert ix.find(12.5) == 3
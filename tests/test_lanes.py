@@ -0,0 +1,29 @@
+import threading
+
+from common.lanes import HIGH, LOW, PriorityLanes
+
+
+def test_high_lane_never_sheds():
+    gate = threading.Event()
+    done = []
+    shed = []
+    lanes = PriorityLanes(lambda item: (gate.wait(), done.append(item)), lambda items: None,
+                          high_max=2, on_shed=lambda lane, reason, n: shed.append((lane, reason)))
+    assert all(lanes.submit(HIGH, i) for i in range(10))
+    gate.set()
+    lanes.close()
+    st = lanes.stats()[HIGH]
+    assert done == list(range(10)) and not shed
+    assert st["shed_full"] == 0 and st["over_max"] > 0
+
+
+def test_low_lane_still_sheds_oldest():
+    gate = threading.Event()
+    got = []
+    lanes = PriorityLanes(lambda item: None, lambda items: (gate.wait(), got.extend(items)),
+                          low_max=4, low_batch=1, low_sample=1)
+    for i in range(10):
+        lanes.submit(LOW, i)
+    gate.set()
+    lanes.close()
+    assert lanes.stats()[LOW]["shed_full"] > 0 and got[-1] == 9
@@ -0,0 +1,53 @@
+import json, logging
+
+from common import logutil
+
+
+def record(key, created, msg="m"):
+    r = logging.LogRecord("t", logging.INFO, __file__, 1, msg, None, None)
+    r.created = created
+    if key is not None:
+        r.rl_key = key
+    return r
+
+
+def test_rate_limit_per_key_and_suppressed_count():
+    f = logutil.RateLimitFilter(1.0)
+    assert f.filter(record("a", 100.0))
+    assert not f.filter(record("a", 100.3))
+    assert not f.filter(record("a", 100.9))
+    assert f.filter(record("b", 100.5))  # 키마다 따로
+    r = record("a", 101.0)
+    assert f.filter(r) and r.suppressed == 2
+    r = record("a", 102.5)
+    assert f.filter(r) and r.suppressed == 0
+
+
+def test_rate_limit_passes_unkeyed_and_disabled():
+    f = logutil.RateLimitFilter(1.0)
+    assert all(f.filter(record(None, 100.0)) for _ in range(3))
+    off = logutil.RateLimitFilter(0.0)
+    assert all(off.filter(record("a", 100.0)) for _ in range(3))
+
+
+def test_sync_setup_splits_levels_and_formats_json(capsys):
+    logutil.setup("test-logutil", fmt="json", async_=False, rate_sec=60.0)
+    log = logging.getLogger("test-logutil")
+    for _ in range(3):
+        logutil.event(log, logging.INFO, "[SKIP] sensor %s", 1, rl_key="skip:1", sensor=1)
+    log.warning("[WARN] x")
+    out, err = capsys.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 1
+    rec = json.loads(lines[0])
+    assert rec["msg"] == "[SKIP] sensor 1" and rec["sensor"] == 1 and rec["level"] == "INFO"
+    assert json.loads(err)["msg"] == "[WARN] x"
+
+
+def test_async_setup_flushes_on_shutdown(capsys):
+    listener = logutil.setup("test-logutil-q", async_=True, rate_sec=0.0)
+    log = logging.getLogger("test-logutil-q")
+    for i in range(5):
+        log.info("[OK] %s", i)
+    logutil.shutdown(listener)
+    assert capsys.readouterr().out.splitlines() == [f"[OK] {i}" for i in range(5)]
@@ -0,0 +1,72 @@
+import urllib.error, urllib.request
+
+import pytest
+
+from common import metrics
+
+
+def test_counter_gauge_render_and_label_escaping():
+    reg = metrics.Registry("t2")
+    c = reg.counter("messages_total", "Messages received", ("topic", "shape"))
+    g = reg.gauge("ready_seconds", "Ready")
+    c.inc('a"b\\c\nd', "notify")
+    c.inc('a"b\\c\nd', "notify", amount=2)
+    c.inc("/x", "cin")
+    g.set(0.25)
+    assert reg.render().splitlines() == [
+        "# HELP t2_messages_total Messages received",
+        "# TYPE t2_messages_total counter",
+        't2_messages_total{topic="/x",shape="cin"} 1.0',
+        't2_messages_total{topic="a\\"b\\\\c\\nd",shape="notify"} 3.0',
+        "# HELP t2_ready_seconds Ready",
+        "# TYPE t2_ready_seconds gauge",
+        "t2_ready_seconds 0.25",
+    ]
+    assert c.value('a"b\\c\nd', "notify") == 3.0
+
+
+def test_histogram_buckets_sum_count():
+    reg = metrics.Registry()
+    h = reg.histogram("http_seconds", "HTTP latency", ("op",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):  # 경계값 0.1 은 le="0.1" 에 포함
+        h.observe(v, "ctrl")
+    h.observe(0.2, "cam")
+    assert reg.render().splitlines() == [
+        "# HELP http_seconds HTTP latency",
+        "# TYPE http_seconds histogram",
+        'http_seconds_bucket{op="cam",le="0.1"} 0.0',
+        'http_seconds_bucket{op="cam",le="1.0"} 1.0',
+        'http_seconds_bucket{op="cam",le="+Inf"} 1.0',
+        'http_seconds_sum{op="cam"} 0.2',
+        'http_seconds_count{op="cam"} 1.0',
+        'http_seconds_bucket{op="ctrl",le="0.1"} 2.0',
+        'http_seconds_bucket{op="ctrl",le="1.0"} 3.0',
+        'http_seconds_bucket{op="ctrl",le="+Inf"} 4.0',
+        'http_seconds_sum{op="ctrl"} 3.65',
+        'http_seconds_count{op="ctrl"} 4.0',
+    ]
+
+
+def test_empty_metric_renders_only_header():
+    reg = metrics.Registry("t3")
+    reg.histogram("on_message_seconds", "on_message duration")
+    assert reg.render() == ("# HELP t3_on_message_seconds on_message duration\n"
+                            "# TYPE t3_on_message_seconds histogram\n")
+
+
+def test_serve_concatenates_registries():
+    r2, r3 = metrics.Registry("t2"), metrics.Registry("t3")
+    r2.counter("a_total", "A").inc()
+    r3.gauge("b", "B").set(2)
+    srv = metrics.serve([r2, r3], 0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{srv.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = resp.read().decode()
+        assert body == r2.render() + r3.render()
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url + "/nope", timeout=5)
+        assert e.value.code == 404
+    finally:
+        srv.shutdown()
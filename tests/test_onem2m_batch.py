@@ -0,0 +1,44 @@
+import threading, time
+
+from common.onem2m_client import Onem2mClient
+
+
+class FakeClient(Onem2mClient):
+    """post_cin 만 바꿔 보낸 순서/동시성을 기록"""
+
+    def __init__(self, reject=(), **kw):
+        super().__init__("http://127.0.0.1:1/Mobius", "S", **kw)
+        self.sent = []
+        self.reject = set(reject)
+        self._mu = threading.Lock()
+
+    def post_cin(self, path, con, *, stringify=True):
+        time.sleep(0.01)
+        with self._mu:
+            self.sent.append((path, con))
+            if (path, con) in self.reject:
+                self.reject.discard((path, con))
+                return False, 503, "busy"
+        return True, 201, "{}"
+
+
+def test_order_kept_per_container():
+    cl = FakeClient(max_inflight=2)
+    items = [(p, k) for k in range(5) for p in ("/a/Cam1", "/a/Cam2")]
+    res = cl.post_cin_batch(items)
+    assert all(r[0] for r in res)
+    for p in ("/a/Cam1", "/a/Cam2"):
+        assert [c for q, c in cl.sent if q == p] == list(range(5))
+    cl.close()
+
+
+def test_reject_retries_in_order_and_fallback_expires():
+    cl = FakeClient(reject={("/a/Cam1", 1)}, max_inflight=2, serial_sec=0.05)
+    items = [(p, k) for k in range(3) for p in ("/a/Cam1", "/a/Cam2")]
+    res = cl.post_cin_batch(items)
+    assert all(r[0] for r in res)
+    assert [c for q, c in cl.sent if q == "/a/Cam1"] == [0, 1, 1, 2]
+    assert not cl.batch_ok
+    time.sleep(0.06)
+    assert cl.batch_ok
+    cl.close()
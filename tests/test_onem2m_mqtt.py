@@ -0,0 +1,119 @@
+import json, threading, time
+
+import pytest
+
+from common import onem2m_mqtt
+
+
+class Msg:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class FakeClient:
+    """paho Client 대역. mode(to) -> "ok" | "drop" | 지연 초(float) 로 응답 방식을 정한다."""
+
+    def __init__(self, mode=lambda to: "ok", rc=0):
+        self.mode = mode
+        self.rc = rc
+        self.callbacks = {}
+        self.published = []
+        self.subscribed = []
+        self._thread = None
+
+    def message_callback_add(self, topic, cb):
+        self.callbacks[topic] = cb
+
+    def subscribe(self, topic, qos=0):
+        self.subscribed.append((topic, qos))
+
+    def publish(self, topic, payload, qos=0):
+        req = json.loads(payload)
+        self.published.append((topic, req))
+        how = self.mode(req["to"])
+        if how != "drop":
+            rsp = {"m2m:rsp": {"rqi": req["rqi"], "rsc": 2001, "pc": {"to": req["to"]}}}
+            delay = 0.0 if how == "ok" else how
+            threading.Timer(delay, self.deliver, args=(rsp,)).start()
+
+        class Info:
+            rc = self.rc
+        return Info()
+
+    def deliver(self, obj):
+        for topic, cb in self.callbacks.items():
+            cb(self, None, Msg(json.dumps(obj).encode()))
+
+
+def transport(client, timeout=2.0):
+    return onem2m_mqtt.Onem2mMqttTransport(client, "S-T3", "Mobius2", timeout=timeout)
+
+
+def test_request_shape_and_subscribe():
+    cl = FakeClient()
+    tr = transport(cl)
+    tr.subscribe()
+    assert cl.subscribed == [("/oneM2M/resp/S-T3/Mobius2/json", 1)]
+    assert tr.post_cin("Meta-Sejong/Robot1/Cam1", {"url": "u"}) == (True, 2001, '{"to": "/Mobius/Meta-Sejong/Robot1/Cam1"}')
+    topic, req = cl.published[0]
+    assert topic == "/oneM2M/req/S-T3/Mobius2/json"
+    assert req["op"] == onem2m_mqtt.OP_CREATE and req["ty"] == 4 and req["fr"] == "S-T3"
+    assert json.loads(req["pc"]["m2m:cin"]["con"]) == {"url": "u"}
+
+
+def test_responses_matched_by_rqi_out_of_order():
+    # 먼저 보낸 요청의 응답이 나중에 와도 각자의 Future 로
+    cl = FakeClient(mode=lambda to: 0.2 if to.endswith("Cam1") else 0.0)
+    tr = transport(cl)
+    res = tr.post_cin_batch([("/A/Cam1", {"n": 1}), ("/A/Cam2", {"n": 2})])
+    assert [json.loads(text)["to"] for _, _, text in res] == ["/Mobius/A/Cam1", "/Mobius/A/Cam2"]
+    assert not tr._pending
+
+
+def test_unknown_and_duplicate_responses_ignored():
+    cl = FakeClient(mode=lambda to: "drop")
+    tr = transport(cl)
+    fut = tr.post_cin_async("/A/Cam1", {})
+    rqi = cl.published[0][1]["rqi"]
+    cl.deliver({"rqi": "other", "rsc": 2001})
+    cl.callbacks[tr.resp_topic](cl, None, Msg(b"not json"))
+    assert not fut.done()
+    cl.deliver({"rqi": rqi, "rsc": 4004, "pc": "nope"})
+    cl.deliver({"rqi": rqi, "rsc": 2001})
+    assert fut.result(timeout=1) == (False, 4004, '"nope"')
+
+
+def test_reaper_times_out_dropped_requests():
+    cl = FakeClient(mode=lambda to: "drop" if to.endswith("Cam2") else "ok")
+    tr = transport(cl, timeout=0.2)
+    t0 = time.monotonic()
+    ok, lost = tr.post_cin_batch([("/A/Cam1", {}), ("/A/Cam2", {})])
+    assert ok[0] is True and lost == (False, 0, "timeout")
+    assert 0.2 <= time.monotonic() - t0 < 2.0
+    assert not tr._pending
+
+
+def test_publish_failure_finishes_immediately():
+    tr = transport(FakeClient(mode=lambda to: "drop", rc=4))
+    assert tr.post_cin("/A/Cam1", {}) == (False, 0, "publish rc=4")
+
+
+def test_blocking_call_on_loop_thread_rejected():
+    cl = FakeClient()
+    tr = transport(cl)
+    out = []
+
+    def loop():
+        cl._thread = threading.current_thread()
+        for call in (lambda: tr.post_cin("/A/Cam1", {}), lambda: tr.post_cin_batch([("/A/Cam1", {})])):
+            with pytest.raises(RuntimeError):
+                call()
+        # 콜백 스레드에서는 async 로
+        out.append(tr.post_cin_async("/A/Cam1", {}))
+
+    th = threading.Thread(target=loop)
+    th.start()
+    th.join()
+    assert out[0].result(timeout=1)[0] is True
+    # 다른 스레드에서는 블로킹 호출 허용
+    assert tr.post_cin("/A/Cam1", {})[0] is True
@@ -0,0 +1,86 @@
+import pytest
+
+from common import rollup
+
+
+class Clock:
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def agg():
+    clock = Clock(1000.0)
+    sent = []
+
+    def post(items):
+        sent.extend(items)
+        return [(True, 201, "")] * len(items)
+
+    a = rollup.RollupAggregator([10, 60], lambda s, w: f"/s{s}/w{w}", post,
+                                flush_sec=3600, grace_sec=2.0, clock=clock)
+    a.clock_, a.sent = clock, sent
+    yield a
+    a._stop.set()
+
+
+def by_window(sent, w):
+    return [con for path, con in sent if con["w"] == w]
+
+
+def test_window_bucketing_and_ror(agg):
+    # 1000 은 10초 창 [1000,1010), 60초 창 [960,1020)
+    for t, v in ((1001.0, 20.0), (1004.0, 23.0), (1007.0, 26.0)):
+        agg.clock_.t = t
+        agg.add(3, v, 0, sid="C-S3", no=3)
+    agg.clock_.t = 1011.0
+    agg.add(3, 30.0, 1)  # 다음 10초 창 → 이전 10초 창은 바로 닫힘
+    assert agg.flush() == 1
+    ((path, con),) = agg.sent
+    assert path == "/s3/w10"
+    assert con == {"sensor": 3, "w": 10, "t0": "19700101T001640", "n": 3, "min": 20.0, "max": 26.0,
+                   "mean": 23.0, "ror": 60.0, "alarms": 0, "sid": "C-S3"}
+
+
+def test_idle_window_closes_after_grace(agg):
+    agg.clock_.t = 1005.0
+    agg.add(1, 10.0, 0)
+    agg.clock_.t = 1011.9  # 창 끝(1010) + grace(2) 전
+    assert agg.flush() == 0
+    agg.clock_.t = 1012.0
+    assert agg.flush() == 1
+    con = by_window(agg.sent, 10)[0]
+    assert con["n"] == 1 and con["ror"] == 0.0 and "partial" not in con
+    assert by_window(agg.sent, 60) == []  # 60초 창은 아직 열려 있음
+
+
+def test_close_flushes_partial_windows(agg):
+    agg.clock_.t = 1021.0
+    agg.add(5, 40.0, 1, no=2)
+    agg.add(5, 41.0, 1)
+    agg.close()
+    assert sorted(con["w"] for _, con in agg.sent) == [10, 60]
+    for con in (c for _, c in agg.sent):
+        assert con["partial"] is True and con["alarms"] == 2 and con["sensor"] == 2
+    assert agg.posted == 2 and agg.failed == 0
+    agg.close()  # 두 번 닫아도 다시 보내지 않음
+    assert len(agg.sent) == 2
+
+
+def test_failed_post_counted():
+    def post(items):
+        raise OSError("down")
+
+    results = []
+    a = rollup.RollupAggregator([10], lambda s, w: "/x", post, flush_sec=3600,
+                                on_result=lambda ok, err, sec: results.append((ok, err)), clock=lambda: 50.0)
+    a.add(1, 1.0, 0)
+    a.close()
+    assert a.failed == 1 and results == [(0, 1)]
+
+
+def test_parse_windows():
+    assert rollup.parse_windows("10, 60,,5.0") == [10, 60, 5]
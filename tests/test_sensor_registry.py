@@ -0,0 +1,128 @@
+import json
+
+import T2_anomaly_detection as t2
+from common import sensor_registry as sr
+
+BOOTSTRAP = "fd/src/main/resources/dt-bootstrap.yaml"
+
+
+def registry(**kw):
+    return sr.SensorRegistry(sur_fallback=t2.sensor_from_sur, sid_fallback=t2.sensor_no_from_sid, **kw)
+
+
+def test_from_sur_walks_trie_with_and_without_csebase():
+    reg = registry()
+    rec = reg.add(1, sid="C-S1", path="/Mobius/Meta-Sejong/Chungmu-hall/Sensor1")
+    assert rec.path == "/Meta-Sejong/Chungmu-hall/Sensor1"
+    for sur in ("Mobius/Meta-Sejong/Chungmu-hall/Sensor1/data/sub", "/Meta-Sejong/Chungmu-hall/Sensor1/data/sub",
+                "Meta-Sejong/Chungmu-hall/Sensor1"):
+        assert reg.from_sur(sur) is rec
+    assert reg.fallbacks == 0
+    # 두 번째부터는 학습된 dict 조회
+    reg.from_sur("Mobius/Meta-Sejong/Chungmu-hall/Sensor1/data/sub")
+    assert reg.hits == 1
+
+
+def test_same_number_in_two_regions_is_two_sensors():
+    reg = registry()
+    a = reg.add(1, path="/Meta-Sejong/Chungmu-hall/Sensor1")
+    b = reg.from_sur("Mobius/Meta-Sejong/Gwanggaeto-hall/Sensor1/data/sub")
+    assert b is not a and b.no == a.no == 1
+    assert a.key != b.key and a.key != 1
+    assert reg.by_key[a.key] is a and reg.by_key[b.key] is b
+    assert reg.one(1) is None
+    # 키는 경로만으로 정해져 프로세스가 달라도 같다
+    assert sr.sensor_key(1, "/Meta-Sejong/Gwanggaeto-hall/Sensor1") == b.key
+
+
+def test_from_sid_direct_fallback_and_ambiguous_number():
+    reg = registry()
+    rec = reg.add(2, sid="C-S2", path="/Meta-Sejong/Chungmu-hall/Sensor2")
+    assert reg.from_sid("C-S2") is rec
+    # 정규식 폴백: 번호가 하나뿐이면 그 레코드를 학습
+    assert reg.from_sid("S-2") is rec and reg.fallbacks == 1
+    assert reg.from_sid("S-2") is rec and reg.fallbacks == 1
+    # 번호가 두 리전에 있으면 추측하지 않고 경로 없는 레코드
+    reg.add(2, path="/Meta-Sejong/Lab/Sensor2")
+    other = reg.from_sid("L-S2")
+    assert other.path is None and other.key == 2
+    assert reg.from_sid("no-digits") is None
+    assert reg.from_sid("no-digits") is None and reg.hits >= 2
+
+
+def test_learned_entries_capped():
+    reg = registry(max_learned=3)
+    for i in range(10):
+        reg.from_sur(f"Mobius/Meta-Sejong/R{i}/Sensor{i}/data/sub")
+    assert reg.stats()["learned"] == 3 and len(reg.by_sur) == 3
+    # 학습 안 된 것도 다시 찾을 수는 있다 (트라이에 등록됨)
+    assert reg.from_sur("Mobius/Meta-Sejong/R9/Sensor9/data/sub").no == 9
+
+
+def test_load_bootstrap_yaml():
+    reg = registry()
+    assert sr.load_spec(reg, BOOTSTRAP) == 3
+    rec = reg.from_sid("C-S3")
+    assert rec.no == 3 and rec.path == "/Meta-Sejong/Chungmu-hall/Sensor3"
+    assert "sid=C-S3" in rec.lbl
+    assert reg.from_topic("/oneM2M/req/Mobius2/MetaSejongChungmuHallSensor3Data/json") is rec
+
+
+def test_load_json_and_csv_spec(tmp_path):
+    js = tmp_path / "s.json"
+    js.write_text(json.dumps([{"sensor": 4, "sid": "L-S4", "path": "/Meta-Sejong/Lab/Sensor4", "topics": ["T4"]}]))
+    cs = tmp_path / "s.csv"
+    cs.write_text("sensor,sid,path\n5,L-S5,/Meta-Sejong/Lab/Sensor5\n")
+    reg = registry()
+    assert sr.load_spec(reg, str(js)) == 1 and sr.load_spec(reg, str(cs)) == 1
+    assert reg.from_topic("T4").no == 4
+    assert reg.from_sur("Mobius/Meta-Sejong/Lab/Sensor5/data/x").sid == "L-S5"
+
+
+class Resp:
+    def __init__(self, data, status=200):
+        self.data, self.status_code, self.ok = data, status, status == 200
+
+    def json(self):
+        return self.data
+
+
+class DiscoveryClient:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, path, params=None):
+        self.calls.append((path, params))
+        if params:
+            return Resp({"m2m:uril": ["Meta-Sejong/Chungmu-hall/Sensor1", "Meta-Sejong/Lab/Sensor1",
+                                      "Meta-Sejong/Robot1/Cam1"]})
+        region = path.split("/")[1]
+        return Resp({"m2m:cnt": {"lbl": ["type=sensor", f"sid={region[0]}-S1", "x=1", "y=2"]}})
+
+
+def test_discover_registers_each_region_separately():
+    reg = registry()
+    cl = DiscoveryClient()
+    assert sr.discover(reg, cl, "Meta-Sejong") == 2
+    assert cl.calls[0][1] == {"fu": 1, "ty": 3, "lbl": "type=sensor"}
+    c, l = reg.from_sid("C-S1"), reg.from_sid("L-S1")
+    assert c.path == "/Meta-Sejong/Chungmu-hall/Sensor1" and l.path == "/Meta-Sejong/Lab/Sensor1"
+    assert c.key != l.key
+
+
+def test_t2_cooldown_and_labels_per_region(monkeypatch):
+    args = t2.build_arg_parser().parse_args(["--topics", "x"])
+    reg = registry()
+    a = reg.add(1, path="/Meta-Sejong/Chungmu-hall/Sensor1", lbl=["adjx=1", "adjy=2"])
+    b = reg.add(1, path="/Meta-Sejong/Lab/Sensor1", lbl=["adjx=50", "adjy=60"])
+    det = t2.AnomalyDetector(args, {}, sensors=reg)
+    sent = []
+    monkeypatch.setattr(t2, "post_cin_pose", lambda **kw: (sent.append((kw["x"], kw["y"])), (True, "ok"))[1])
+
+    class M:
+        topic = "t"
+
+    for rec in (a, b, a):
+        det.process((M(), {"sid": None}, rec.path + "/data", rec, (99.0, 1, "ts")))
+    # 리전이 달라 쿨다운/라벨이 따로: a, b 는 각각 전송, 두 번째 a 는 쿨다운
+    assert sent == [(1.0, 2.0), (50.0, 60.0)]
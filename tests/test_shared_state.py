@@ -0,0 +1,38 @@
+import struct
+
+import pytest
+
+from common import shared_state
+
+
+def test_file_store_keeps_sensor_coords(tmp_path):
+    path = str(tmp_path / "state.bin")
+    a = shared_state.FileStore(path, nslots=8)
+    a.put_label(3, 100.0, {"x": 1.0, "y": 2.0, "oz": 0.5, "ow": None, "sx": 10.0, "sy": 20.0, "sz": None,
+                           "sid": "S3"})
+    b = shared_state.FileStore(path)
+    ts, pose = b.get_label(3)
+    assert ts == 100.0
+    assert pose == {"x": 1.0, "y": 2.0, "oz": 0.5, "ow": None, "sx": 10.0, "sy": 20.0, "sz": None, "sid": "S3"}
+    assert b.try_acquire(3, 200.0, 30.0) and not a.try_acquire(3, 210.0, 30.0)
+    a.close(); b.close()
+
+
+def test_file_store_rejects_old_version(tmp_path):
+    path = tmp_path / "old.bin"
+    path.write_bytes(shared_state._HEADER.pack(b"T2ST", 1, 4) + b"\0" * 4 * struct.calcsize("<qdddddd32s"))
+    with pytest.raises(ValueError, match="v1"):
+        shared_state.FileStore(str(path))
+
+
+def test_state_store_is_abstract():
+    with pytest.raises(TypeError):
+        shared_state.StateStore()
+
+    class Partial(shared_state.StateStore):
+        def try_acquire(self, sensor, now, cooldown):
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert isinstance(shared_state.LocalStore(), shared_state.StateStore)
@@ -0,0 +1,131 @@
+import os, time
+
+import T2_anomaly_detection as t2
+import T3_robot_control as t3
+from common import dispatch, snapshot
+
+PATH = "/Meta-Sejong/Chungmu-hall/Sensor1"
+
+
+def detector(with_robots=False):
+    args = t2.build_arg_parser().parse_args(["--topics", "x", "--cooldown-sec", "30"])
+    disp = None
+    if with_robots:
+        disp = dispatch.RobotDispatcher(cell=10.0, busy_sec=60.0)
+        dispatch.load_robots(disp, "R1=0,0;R2=100,0")
+    return t2.AnomalyDetector(args, {}, dispatcher=disp)
+
+
+def test_t2_round_trip(tmp_path):
+    now = time.time()
+    det = detector(with_robots=True)
+    rec = det.sensors.add(1, sid="C-S1", path=PATH)
+    det.sensors.add(7)
+    det.state.put_label(rec.key, now - 5, {"x": 1.5, "y": -2.0, "oz": None, "ow": 1.0,
+                                           "sx": None, "sy": None, "sz": None, "sid": "C-S1"})
+    det.state.last_sent_at[rec.key] = now - 10
+    det.state.last_sent_at[7] = now - 100  # 쿨다운 끝남 → 복구 안 함
+    det.dispatcher.assign(rec.key, (90.0, 0.0), now=now)
+    f = str(tmp_path / "t2.snap")
+    snapshot.write(f, b"T2", det.snapshot_sections(), now=now)
+
+    snap, why = snapshot.read(f, b"T2", max_age=60, now=now + 1)
+    assert why == "" and set(snap.sections) == {b"SENS", b"ROBO", b"LBLS", b"COOL"}
+    det2 = detector(with_robots=True)
+    res = det2.restore(snap, now=now + 1)
+    assert res == {"sensors": 2, "labels": 1, "cooldowns": 1, "robots": 2}
+    rec2 = det2.sensors.by_path[PATH]
+    assert rec2.key == rec.key and rec2.sid == "C-S1" and 7 in det2.sensors.by_key
+    ts, pose = det2.state.get_label(rec.key)
+    assert ts == now - 5 and pose == {"x": 1.5, "y": -2.0, "oz": None, "ow": 1.0,
+                                      "sx": None, "sy": None, "sz": None, "sid": "C-S1"}
+    assert det2.state.last_sent_at == {rec.key: now - 10}
+    assert det2.dispatcher.export() and det2.dispatcher.robots.get("R2") == det.dispatcher.robots.get("R2")
+    # 같은 스냅샷을 다시 반영해도 더 새 라벨/이미 있는 센서는 건드리지 않는다
+    assert det2.restore(snap, now=now + 1)["sensors"] == 0
+    assert det2.restore(snap, now=now + 1)["labels"] == 0
+
+
+def test_read_rejects_bad_crc_stale_and_kind(tmp_path):
+    f = str(tmp_path / "s.snap")
+    snapshot.write(f, b"T2", {b"SENS": b"abc"}, now=1000.0)
+    assert snapshot.read(f, b"T2", now=1001.0)[0].sections == {b"SENS": b"abc"}
+    assert snapshot.read(f, b"T3")[1].startswith("kind")
+    snap, why = snapshot.read(f, b"T2", max_age=30, now=1100.0)
+    assert snap is None and why.startswith("stale")
+    # max_age <= 0 이면 나이를 보지 않음
+    assert snapshot.read(f, b"T2", max_age=0, now=1e9)[0] is not None
+    data = bytearray(open(f, "rb").read())
+    data[-6] ^= 0xFF
+    open(f, "wb").write(bytes(data))
+    assert snapshot.read(f, b"T2") == (None, "bad crc")
+    open(f, "wb").write(bytes(data[:10]))
+    assert snapshot.read(f, b"T2") == (None, "truncated")
+    assert snapshot.read(str(tmp_path / "none"), b"T2") == (None, "missing")
+
+
+class Client:
+    transport = "http"
+
+    def __init__(self):
+        self.items = []
+
+    def post_cin_batch(self, items):
+        self.items += items
+        return [(True, 201, "")] * len(items)
+
+
+def streamer(root, frames=5):
+    return t3.Streamer(base="http://x", origin="S", ae="Meta-Sejong", robot="Robot1", cam1="Cam1", cam2="Cam2",
+                       media_root=str(root), media_base_url="http://m", frames=frames, timeout=1.0,
+                       client=Client())
+
+
+def make_frames(root, n=5):
+    for view in ("birdeye_view", "egocentric_view"):
+        d = root / "sensor1" / view
+        d.mkdir(parents=True)
+        for i in range(n):
+            (d / f"20250916T0742{i:02d}.jpg").write_bytes(b"")
+
+
+def test_t3_index_and_cursor_round_trip(tmp_path):
+    make_frames(tmp_path)
+    s = streamer(tmp_path)
+    assert s.warm() == 10
+    s.cursor = (1, "C-S1", 1758008522.0, 1758008522.0, 2, 1000.0)
+    f = str(tmp_path / "t3.snap")
+    snapshot.write(f, b"T3", s.snapshot_sections())
+    snap, _ = snapshot.read(f, b"T3")
+
+    s2 = streamer(tmp_path)
+    assert s2.restore(snap) == {"indexes": 2, "frames": 10, "stale": 0, "cursor": 1}
+    be = str(tmp_path / "sensor1" / "birdeye_view")
+    assert s2.index[be].files == s.index[be].files and s2.index[be].ts == s.index[be].ts
+    assert s2.cursor == s.cursor
+    # 디렉터리가 바뀌면(mtime) 인덱스는 버린다
+    (tmp_path / "sensor1" / "birdeye_view" / "20250916T074299.jpg").write_bytes(b"")
+    os.utime(be, ns=(0, 0))
+    assert streamer(tmp_path).restore(snap)["stale"] == 1
+
+
+def test_t3_resume_sends_remaining_frames_only(tmp_path):
+    make_frames(tmp_path)
+    s = streamer(tmp_path, frames=5)
+    s.cursor = (1, "C-S1", 1758008523.0, 1758008523.0, 3, 1000.0)
+    assert s.resume(now=1001.0)
+    s._thread.join(timeout=5)
+    names = [os.path.basename(con["url"]) for _, con in s.client.items]
+    assert names == ["20250916T074203.jpg"] * 2 + ["20250916T074204.jpg"] * 2
+    assert s.cursor is None
+
+
+def test_t3_resume_skips_finished_or_old_stream(tmp_path):
+    make_frames(tmp_path)
+    s = streamer(tmp_path, frames=5)
+    s.cursor = (1, "C-S1", 1758008523.0, 1758008523.0, 3, 1000.0)
+    assert not s.resume(now=1000.0 + 3)  # 남은 2프레임(2초)이 이미 지났음
+    assert s.cursor is None
+    s.cursor = (1, "C-S1", 1758008523.0, 1758008523.0, 5, 1000.0)
+    assert not s.resume(now=1000.0)
+    assert s.client.items == []
@@ -0,0 +1,83 @@
+import argparse, json, random, threading, time
+
+import pytest
+
+import T1_create_remove_Mobius_AE as t1
+
+
+def line_parser():
+    ap = argparse.ArgumentParser(prog="batch-line", add_help=False)
+    t1.add_cmd_parsers(ap.add_subparsers(dest="cmd", required=True))
+    return ap
+
+
+def batch_args(tmp_path, lines, conc=4):
+    src = tmp_path / "cmds.txt"
+    src.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return argparse.Namespace(base_url="http://127.0.0.1:1/Mobius", origin="S", timeout=1.0, concurrency=conc,
+                              file=str(src), out=str(tmp_path / "out.ndjson"), include_body=False)
+
+
+def results(tmp_path):
+    return [json.loads(l) for l in (tmp_path / "out.ndjson").read_text(encoding="utf-8").splitlines()]
+
+
+def test_parse_batch_line_ndjson_and_cli():
+    ap = line_parser()
+    spec = t1.parse_batch_line('{"cmd": "create", "rn": "A", "rr": "false", "poa": "http://h:1, http://h:2", "id": 7}', ap)
+    assert spec["rr"] is False and spec["poa"] == ["http://h:1", "http://h:2"]
+    assert spec["api"] == "app.fire.detection" and spec["id"] == 7
+    spec = t1.parse_batch_line("create --rn B --api x.y --poa http://h:1", ap)
+    assert (spec["cmd"], spec["rn"], spec["api"], spec["rr"], spec["poa"]) == ("create", "B", "x.y", True, ["http://h:1"])
+    assert t1.parse_batch_line("delete --rn C", ap)["cmd"] == "delete"
+
+
+@pytest.mark.parametrize("line", ['{"cmd": "drop", "rn": "A"}', '{"cmd": "get"}', "[1, 2]", "frobnicate --rn A"])
+def test_parse_batch_line_rejects(line):
+    with pytest.raises(ValueError):
+        t1.parse_batch_line(line, line_parser())
+
+
+def test_same_rn_runs_in_input_order(tmp_path, monkeypatch):
+    order = {}
+    lock = threading.Lock()
+
+    def fake_run(spec, base, origin, timeout, http):
+        time.sleep(random.uniform(0, 0.005))
+        with lock:
+            order.setdefault(spec["rn"], []).append(spec["id"])
+        return {"cmd": spec["cmd"], "rn": spec["rn"], "ok": True, "status": 200}
+
+    monkeypatch.setattr(t1, "run_spec", fake_run)
+    cmds = ["create", "delete", "create", "get"]
+    lines = [json.dumps({"cmd": cmds[i % 4], "rn": f"AE{i % 5}", "id": i}) for i in range(60)]
+    assert t1.run_batch(batch_args(tmp_path, lines, conc=4)) == 0
+    for k in range(5):
+        assert order[f"AE{k}"] == [i for i in range(60) if i % 5 == k]
+    assert sorted(r["seq"] for r in results(tmp_path)) == list(range(1, 61))
+
+
+def test_read_ahead_bounded_by_concurrency(tmp_path, monkeypatch):
+    state = {"parsed": 0, "done": 0, "max_ahead": 0}
+    lock = threading.Lock()
+    real_parse = t1.parse_batch_line
+
+    def counting_parse(line, ap):
+        with lock:
+            state["parsed"] += 1
+            state["max_ahead"] = max(state["max_ahead"], state["parsed"] - state["done"])
+        return real_parse(line, ap)
+
+    def slow_run(spec, base, origin, timeout, http):
+        time.sleep(0.002)
+        with lock:
+            state["done"] += 1
+        return {"cmd": spec["cmd"], "rn": spec["rn"], "ok": spec["rn"] != "bad", "status": 200}
+
+    monkeypatch.setattr(t1, "parse_batch_line", counting_parse)
+    monkeypatch.setattr(t1, "run_spec", slow_run)
+    lines = [f"get --rn AE{i}" for i in range(40)] + ["get --rn bad", "not a command"]
+    assert t1.run_batch(batch_args(tmp_path, lines, conc=3)) == 1
+    # 읽은 줄(파싱 중 1줄 포함) - 끝난 명령 <= 동시 실행 수 + 1
+    assert state["max_ahead"] <= 3 + 1
+    assert len(results(tmp_path)) == 42
@@ -0,0 +1,25 @@
+import json
+
+import T23_combined_runtime as t23
+from test_t2_dedup import Msg
+
+
+def runtime():
+    args = t23.build_arg_parser().parse_args(["--topics", "x", "--ae", "Meta-Sejong", "--robot", "Robot1"])
+    rt = t23.CombinedRuntime(args)
+    routed = []
+    rt.listener.on_message = lambda c, u, msg: routed.append("t3")
+    rt.detector.on_message = lambda c, u, msg: routed.append("t2")
+    return rt, routed
+
+
+def test_ctrl_notify_routed_to_t3_with_or_without_escapes():
+    rt, routed = runtime()
+    sgn = {"m2m:sgn": {"sur": "Meta-Sejong/Robot1/Ctrl/sub", "nev": {"rep": {}}}}
+    plain = json.dumps(sgn).encode()
+    escaped = plain.replace(b"/", b"\\/")
+    sensor = json.dumps({"m2m:sgn": {"sur": "Meta-Sejong/Hall/Sensor1/data/sub"}}).encode()
+    for payload in (plain, escaped, sensor):
+        rt.on_message(None, None, Msg("t", payload))
+    rt.close()
+    assert routed == ["t3", "t3", "t2"]
@@ -0,0 +1,67 @@
+import json
+
+import T2_anomaly_detection as t2
+from common import dedup
+
+
+class Msg:
+    def __init__(self, topic: str, payload: bytes):
+        self.topic = topic
+        self.payload = payload
+
+
+def notify(ri: str, temp: float = 25.0) -> bytes:
+    con = {"temp": temp, "fire_alarm": 0, "ts": "2026-01-01T00:00:00Z", "sid": "S1"}
+    return json.dumps({"op": 5, "rqi": "rq-" + ri, "pc": {"m2m:sgn": {
+        "sur": "Mobius/Meta-Sejong/Hall/Sensor1/data/sub",
+        "nev": {"net": 3, "rep": {"m2m:cin": {"ri": ri, "ct": "20260101T000000", "con": json.dumps(con)}}}}}}).encode()
+
+
+def detector(*argv: str) -> t2.AnomalyDetector:
+    args = t2.build_arg_parser().parse_args(["--topics", "x", *argv])
+    return t2.AnomalyDetector(args, {})
+
+
+def test_dedup_args_registered():
+    args = t2.build_arg_parser().parse_args(["--topics", "x", "--dedup-ttl-sec", "5"])
+    assert args.dedup_ttl_sec == 5.0
+    assert detector().dedup is not None
+
+
+def test_same_notification_on_both_topics_processed_once():
+    det = detector()
+    processed = []
+    det.process = lambda item, **_kw: processed.append(item)
+    payload = notify("4-0001")
+    det.on_message(None, None, Msg("/oneM2M/req/Mobius2/origin/json", payload))
+    det.on_message(None, None, Msg("/oneM2M/req/origin/Mobius2/json", payload))
+    assert len(processed) == 1
+    det.on_message(None, None, Msg("/oneM2M/req/Mobius2/origin/json", notify("4-0002")))
+    assert len(processed) == 2
+
+
+def test_dedup_disabled_with_zero_ttl():
+    det = detector("--dedup-ttl-sec", "0")
+    processed = []
+    det.process = lambda item, **_kw: processed.append(item)
+    payload = notify("4-0001")
+    det.on_message(None, None, Msg("t", payload))
+    det.on_message(None, None, Msg("t", payload))
+    assert det.dedup is None and len(processed) == 2
+
+
+def test_repeated_readings_without_ids_kept_unless_hash_enabled():
+    # ri/rqi 없는 같은 내용(값이 안 바뀐 센서)은 기본으로는 중복 아님
+    reading = json.dumps({"temp": 25.0, "fire_alarm": 0}).encode()
+    d = dedup.Deduper(30.0)
+    assert dedup.dedup_key(reading) is None
+    assert not d.is_dup("t", reading, now=1.0) and not d.is_dup("t", reading, now=2.0)
+    assert d.stats()["t"] == {"seen": 2, "dup": 0, "rate": 0.0}
+    h = dedup.Deduper(30.0, hash_fallback=True)
+    assert not h.is_dup("t", reading, now=1.0) and h.is_dup("t", reading, now=2.0)
+    assert not h.is_dup("t", reading, now=40.0)  # ttl 지나면 다시 받음
+
+
+def test_dedup_hash_flag():
+    assert detector().dedup.hash_fallback is False
+    assert detector("--dedup-hash").dedup.hash_fallback is True
@@ -0,0 +1,29 @@
+import T3_robot_control as t3
+
+
+class Recorder:
+    def __init__(self):
+        self.started = []
+
+    def start(self, **kw):
+        self.started.append(kw)
+
+
+def listener(*argv: str):
+    args = t3.build_arg_parser().parse_args(["--topics", "x", *argv])
+    streamer = Recorder()
+    return t3.CtrlListener(args, streamer), streamer
+
+
+def test_local_trigger_for_other_robot_is_ignored():
+    lst, streamer = listener("--robot", "Robot1")
+    lst.trigger_local({"sensor": 1, "sid": "S1", "robot": "Robot2"})
+    assert streamer.started == [] and not lst._echo
+
+
+def test_local_trigger_for_this_robot_streams():
+    lst, streamer = listener("--robot", "Robot1")
+    lst.trigger_local({"sensor": 1, "sid": "S1", "robot": "Robot1"})
+    lst.trigger_local({"sensor": 2, "sid": "S2", "robot": None})
+    assert [s["sensor_no"] for s in streamer.started] == [1, 2]
+    assert set(lst._echo) == {"S1", "S2"}